@@ -0,0 +1,72 @@
+##########################
+# ANALYZE DEPENDENCIES
+##########################
+# Select the armature, run
+# Builds the bone -> constraint / driver / parent -> target graph of the armature, the objects parented to it and
+# every object those point at (physics meshes, Child Of targets...), then logs:
+#   cycles                   bones / objects waiting on each other, Blender has to break these somewhere
+#   cross object edges       armature -> mesh -> armature round trips are what stall the depsgraph
+#   longest chains           the layers (DEF -> ORG -> FK -> PHYS -> mesh...) worth flattening first
+#   fan in                   bones the most things wait on
+# Set JSON_PATH to also write the report out, // is relative to the blend file
+
+import bpy
+import json
+import os
+import sys
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import dependency_graph, instrument
+from rig_tools.instrument import log
+
+JSON_PATH = None
+
+
+@instrument.timed("analyze_dependencies")
+def analyze_dependencies(top=10, json_path=None):
+    armature = bpy.context.active_object
+    if armature is None or armature.type != 'ARMATURE':
+        log.error("Error: Please select an armature object")
+        return
+
+    with instrument.phase("build"):
+        edges = dependency_graph.build([armature, *armature.children_recursive])
+    with instrument.phase("analyze"):
+        result = dependency_graph.analyze(edges, top)
+    report = dependency_graph.to_json(result)
+
+    log.info("%s nodes, %s edges", report['nodes'], report['edges'])
+
+    if report['cycles']:
+        for cycle in report['cycles']:
+            log.warning("Cycle of %s: %s", len(cycle), ", ".join(cycle))
+    else:
+        log.info("No cycles")
+
+    for entry in report['cross_object']:
+        log.info("Cross object: %s -> %s (%s) x%s", entry['from'], entry['to'], entry['kind'], entry['count'])
+
+    for chain in report['longest']:
+        log.info("Chain of %s: %s", len(chain) - 1, " -> ".join(chain))
+
+    for entry in report['fan_in']:
+        log.info("Fan in %s: %s", entry['dependents'], entry['node'])
+
+    if json_path:
+        path = bpy.path.abspath(json_path)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        log.info("Wrote %s", path)
+
+    return report
+
+
+if __name__ == "__main__":
+
+    instrument.set_level('INFO')
+    with instrument.run("Analyze dependencies"):
+        analyze_dependencies(json_path=JSON_PATH)
@@ -0,0 +1,76 @@
+##########################
+# AUDIT DRIVERS
+##########################
+# Select the armature, run
+# Lists every driver on the armature, its data and the meshes parented to it (shape keys included), slowest first:
+#   NATIVE   AVERAGE/SUM/MIN/MAX drivers
+#   SIMPLE   scripted drivers Blender evaluates without Python
+#   PYTHON   scripted drivers that need Python, slow and broken when auto run is off
+# With REWRITE = True the PYTHON drivers are rewritten into simple expressions / single property drivers where possible,
+# leave it False to only see what would change.
+# PYTHON driver expressions are only timed when auto run is on for the file, EVALUATE_PYTHON = True times them anyway
+# (that runs the Python in the file), False never does.
+
+import bpy
+import os
+import sys
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import driver_audit, instrument
+from rig_tools.instrument import log
+
+REWRITE = False
+EVALUATE_PYTHON = None
+
+
+@instrument.timed("audit_drivers")
+def audit_drivers(rewrite=False, include_children=True, json_path=None, evaluate_python=None):
+    armature = bpy.context.active_object
+    if armature is None or armature.type != 'ARMATURE':
+        log.error("Error: Please select an armature object")
+        return
+
+    rows = driver_audit.audit(armature, include_children, evaluate_python=evaluate_python)
+    if not rows:
+        log.warning("No drivers found on %s", armature.name)
+        return rows
+
+    totals = {driver_audit.NATIVE: 0, driver_audit.SIMPLE: 0, driver_audit.PYTHON: 0}
+    for row in rows:
+        totals[row['kind']] += 1
+        log.info("%-6s %8.2fus  %s %s[%s]  %s", row['kind'], row['microseconds'], row['owner'], row['data_path'], row['index'], row['expression'])
+        for target in row['targets']:
+            log.debug("        %s", target)
+
+    log.info("%s drivers: %s native, %s simple, %s python", len(rows), totals['NATIVE'], totals['SIMPLE'], totals['PYTHON'])
+    if totals['PYTHON'] and not any(row['evaluated'] for row in rows):
+        log.info("Python expressions not evaluated with auto run off, their times only cover the target reads")
+
+    for target, readers in driver_audit.shared_targets(rows).items():
+        log.info("%s is read by %s drivers", target, len(readers))
+
+    changes = driver_audit.rewrite_drivers(armature, include_children, dry_run=not rewrite)
+    for owner, data_path, change in changes:
+        log.info("%s %s %s: %s", "Rewrote" if rewrite else "Would rewrite", owner, data_path, change)
+    if totals['PYTHON'] > len(changes):
+        log.warning("%s python drivers can't be rewritten and need auto run", totals['PYTHON'] - len(changes))
+
+    if json_path:
+        import json
+        path = bpy.path.abspath(json_path)
+        with open(path, 'w') as f:
+            json.dump({'drivers': rows, 'changes': changes}, f, indent=2)
+        log.info("Wrote %s", path)
+
+    return rows
+
+
+if __name__ == "__main__":
+
+    instrument.set_level('INFO')
+    with instrument.run("Audit drivers"):
+        audit_drivers(rewrite=REWRITE, evaluate_python=EVALUATE_PYTHON)
@@ -0,0 +1,140 @@
+##########################
+# BAKE CLOTH CHAINS TO FK
+##########################
+# For rigs made with "Cloth chains from ORG.py"
+# Select the armature, set the frame range below, run
+# The simulated rotation the FK bones get from their PHYS bones is keyed onto the FK bones, reduced to as few keys as
+# the tolerance allows, then the Copy Phys Rotation constraints, the PHYS damped tracks and the cloth modifiers are muted
+# so playback and rendering skip the sim. Run with mute=False to just bake and leave everything live.
+
+import bpy
+import os
+import sys
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, keyframes
+from rig_tools.instrument import log
+
+
+@instrument.timed("bake_phys_to_fk")
+def bake_phys_to_fk(frame_start=None, frame_end=None, tolerance=0.0005, mute=True):
+    """
+    Key the visual rotation of every FK bone driven by a Copy Phys Rotation constraint
+    tolerance is the largest allowed difference between the baked curve and the sim, in rotation channel units
+    """
+
+    armature = bpy.context.active_object
+    if armature is None or armature.type != 'ARMATURE':
+        log.error("Error: Please select an armature object")
+        return
+
+    scene = bpy.context.scene
+    frame_start = scene.frame_start if frame_start is None else frame_start
+    frame_end = scene.frame_end if frame_end is None else frame_end
+
+    # FK bones following PHYS, and the PHYS bones / physics objects behind them
+    fk_bones = []
+    phys_constraints = []
+    physics_objects = set()
+
+    for pose_bone in armature.pose.bones:
+        for constraint in pose_bone.constraints:
+            if constraint.type == 'COPY_ROTATION' and constraint.name == "Copy Phys Rotation" and constraint.enabled:
+                fk_bones.append(pose_bone)
+                phys_constraints.append(constraint)
+
+                phys_bone = armature.pose.bones.get(constraint.subtarget)
+                if phys_bone is None:
+                    continue
+                for phys_constraint in phys_bone.constraints:
+                    if phys_constraint.type == 'DAMPED_TRACK' and phys_constraint.target is not None:
+                        phys_constraints.append(phys_constraint)
+                        physics_objects.add(phys_constraint.target)
+
+    if not fk_bones:
+        log.warning("No FK bones with a Copy Phys Rotation constraint found")
+        return
+
+    log.info("Baking %s FK bones over frames %s-%s", len(fk_bones), frame_start, frame_end)
+
+    # Sample every bone on every frame first, the sim has to step through the frames in order anyway
+    frames = list(range(frame_start, frame_end + 1))
+    samples = {pose_bone.name: [] for pose_bone in fk_bones}
+    previous = {}
+    current_frame = scene.frame_current
+
+    for frame in frames:
+        instrument.frame_set(scene, frame)
+        for pose_bone in fk_bones:
+            # Visual transform in the bones own space, the same thing visual keying uses
+            local_matrix = armature.convert_space(pose_bone=pose_bone, matrix=pose_bone.matrix, from_space='POSE', to_space='LOCAL')
+
+            if pose_bone.rotation_mode == 'QUATERNION':
+                rotation = local_matrix.to_quaternion()
+                # Keep quaternions on the same side as the previous frame so the curves dont flip
+                if pose_bone.name in previous and rotation.dot(previous[pose_bone.name]) < 0:
+                    rotation.negate()
+            elif pose_bone.rotation_mode == 'AXIS_ANGLE':
+                axis, angle = local_matrix.to_quaternion().to_axis_angle()
+                rotation = (angle, *axis)
+            else:
+                compat = previous.get(pose_bone.name)
+                # Blender only takes an Euler to stay compatible with, the first frame has none
+                rotation = local_matrix.to_euler(pose_bone.rotation_mode, compat) if compat is not None else local_matrix.to_euler(pose_bone.rotation_mode)
+
+            previous[pose_bone.name] = rotation
+            samples[pose_bone.name].append(tuple(rotation))
+
+    instrument.frame_set(scene, current_frame)
+
+    # Write everything in bulk
+    action = keyframes.ensure_action(armature)
+
+    total_keys = 0
+    for pose_bone in fk_bones:
+        if pose_bone.rotation_mode == 'QUATERNION':
+            prop = 'rotation_quaternion'
+        elif pose_bone.rotation_mode == 'AXIS_ANGLE':
+            prop = 'rotation_axis_angle'
+        else:
+            prop = 'rotation_euler'
+
+        channels = [list(channel) for channel in zip(*samples[pose_bone.name])]
+        key_count = keyframes.write_channels(
+            action,
+            keyframes.pose_bone_path(pose_bone.name, prop),
+            frames,
+            channels,
+            group_name=pose_bone.name,
+            tolerance=tolerance,
+        )
+        total_keys += key_count * len(channels)
+        log.debug("Baked %s: %s of %s frames keyed", pose_bone.name, key_count, len(frames))
+
+    log.info("Baked %s keys", total_keys)
+
+    if mute:
+        for constraint in phys_constraints:
+            constraint.enabled = False
+
+        for obj in physics_objects:
+            for modifier in obj.modifiers:
+                if modifier.type == 'CLOTH':
+                    modifier.show_viewport = False
+                    modifier.show_render = False
+
+        log.info("Muted %s constraints and the cloth on %s physics objects", len(phys_constraints), len(physics_objects))
+
+    return action
+
+
+if __name__ == "__main__":
+
+    # INFO for a summary, DEBUG for a line per bone
+    instrument.set_level('INFO')
+    with instrument.run("Bake PHYS to FK"):
+        bake_phys_to_fk()
@@ -1,23 +1,34 @@
 import bpy
+import os
+import sys
 from rna_prop_ui import rna_idprop_ui_create
 
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, property_spec, rig_ui
+from rig_tools.instrument import log
+
 """
 Adds given a list of prefixes (could be representing bones or chains) and a list of properties,
 creates a version of each property for each prefix and adds them to a specified properties bone
 """
 
+@instrument.timed("add_properties_to_properties_bone")
 def add_properties_to_properties_bone(armature_name, properties_bone_name, bone_collections):
     
     # Get the armature object
     armature_obj = bpy.data.objects.get(armature_name)
     if not armature_obj or armature_obj.type != 'ARMATURE':
-        print(f"Error: Armature '{armature_name}' not found or not an armature")
+        log.error("Error: Armature '%s' not found or not an armature", armature_name)
         return False
     
     # Get the properties bone
     properties_bone = armature_obj.pose.bones.get(properties_bone_name)
     if not properties_bone:
-        print(f"Error: Properties bone '{properties_bone_name}' not found in armature '{armature_name}'")
+        log.error("Error: Properties bone '%s' not found in armature '%s'", properties_bone_name, armature_name)
         return False
     
     # Process each bone collection
@@ -46,7 +57,7 @@ def add_properties_to_properties_bone(armature_name, properties_bone_name, bone_
                     if prop_name:
                         full_prop_name = f"{bone_name}_{prop_name}{suffix}"
                     else:
-                        print(f"Error: Property name is required for bone '{bone_name}'")
+                        log.error("Error: Property name is required for bone '%s'", bone_name)
                         continue
                     
                     # Set the custom property based on type
@@ -61,18 +72,63 @@ def add_properties_to_properties_bone(armature_name, properties_bone_name, bone_
                     elif prop_type.upper() == 'VECTOR':
                         properties_bone[full_prop_name] = list(default_value) if isinstance(default_value, (list, tuple)) else [0.0, 0.0, 0.0]
                     else:
-                        print(f"Warning: Unknown property type '{prop_type}' for property '{full_prop_name}'")
+                        log.warning("Warning: Unknown property type '%s' for property '%s'", prop_type, full_prop_name)
                         properties_bone[full_prop_name] = default_value
                     
                     # Set library overridable
                     if hasattr(properties_bone, 'property_overridable_library_set'):
                         properties_bone.property_overridable_library_set(f'["{full_prop_name}"]', library_overridable)
                     
-                    print(f"Added property '{full_prop_name}' ({prop_type}) to properties bone '{properties_bone_name}'")
+                    log.debug("Added property '%s' (%s) to properties bone '%s'", full_prop_name, prop_type, properties_bone_name)
 
+    rig_ui.invalidate(armature_obj)
     return True
 
 
+@instrument.timed("apply_property_spec")
+def apply_property_spec(armature_name, properties_bone_name, spec, dry_run=False, prune=False):
+    """
+    Incremental version of add_properties_to_properties_bone
+    spec is a list of bone collections or a path to a .json / .py file with them
+    Only missing or changed properties are written, dry_run just reports what would change
+    Collections with 'array': True are stored as one array per property, prune removes the scalars they replace
+    """
+    armature_obj = bpy.data.objects.get(armature_name)
+    if not armature_obj or armature_obj.type != 'ARMATURE':
+        log.error("Error: Armature '%s' not found or not an armature", armature_name)
+        return None
+
+    properties_bone = armature_obj.pose.bones.get(properties_bone_name)
+    if not properties_bone:
+        log.error("Error: Properties bone '%s' not found in armature '%s'", properties_bone_name, armature_name)
+        return None
+
+    if isinstance(spec, str):
+        spec = property_spec.load(spec)
+
+    with instrument.phase("diff"):
+        definitions = property_spec.expand(spec)
+        changes = property_spec.plan(properties_bone, definitions, prune)
+
+    if changes and not dry_run:
+        with instrument.phase("apply"):
+            property_spec.apply(properties_bone, definitions, changes)
+        # New properties only tag the object, the panel wont see them otherwise
+        rig_ui.invalidate(armature_obj)
+
+        # Drivers still reading scalars that moved into arrays
+        index_map = property_spec.read_index_map(properties_bone)
+        if index_map:
+            retargeted = property_spec.retarget_drivers(armature_obj, properties_bone_name, index_map)
+            if retargeted:
+                log.info("Pointed %s driver targets at array elements", retargeted)
+
+    for line in property_spec.report(changes, dry_run):
+        log.info(line)
+    log.info("%s of %s properties already up to date", len(definitions) - len(changes), len(definitions))
+    return changes
+
+
 if __name__ == "__main__":
     
     # Define bone collections with shared properties
@@ -106,8 +162,19 @@ if __name__ == "__main__":
     armature_name = "WitchArmature"
     properties_bone_name = "PROPERTIES"
     
+    # Path to a .json or .py spec to use instead of bone_collections above, // is relative to the blend file
+    spec_path = None
+    # Only report what would change
+    dry_run = False
+    # Remove scalar properties replaced by 'array': True collections, drivers reading them are moved to the arrays
+    prune = False
+    
+    # INFO for a summary, DEBUG for a line per property
+    instrument.set_level('INFO')
+    
     # Add properties to bones
-    add_properties_to_properties_bone(armature_name, properties_bone_name, bone_collections)
+    with instrument.run("Batch custom properties"):
+        apply_property_spec(armature_name, properties_bone_name, spec_path or bone_collections, dry_run, prune)
     
-    print("\nScript completed!")
-    print("Properties created with naming pattern: BONE_NAME_PROPERTY_NAME")
\ No newline at end of file
+    log.info("\nScript completed!")
+    log.info("Properties created with naming pattern: BONE_NAME_PROPERTY_NAME")
\ No newline at end of file
@@ -1,78 +1,107 @@
 import bpy
+import os
+import sys
 
-def make_bone_names_uppercase():
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, rename
+from rig_tools.instrument import log
+
+
+@instrument.timed("rename_bones")
+def rename_bones(armature_objects, transform, dry_run=False, skip_collisions=False):
+    """
+    Rename the bones of every armature in armature_objects with transform (see rig_tools/rename.py)
+    Every armature is planned first, if anything collides nothing is renamed unless skip_collisions is set,
+    which renames everything except the colliding bones
+    Armatures sharing the same data are only renamed once, no edit mode needed
+    """
+
+    # Objects sharing armature data only count once
+    armature_datas = []
+    for armature_obj in armature_objects:
+        if armature_obj.data not in armature_datas:
+            armature_datas.append(armature_obj.data)
+
+    with instrument.phase("plan"):
+        plans = []
+        all_problems = []
+        for armature_data in armature_datas:
+            bone_map, problems = rename.plan(armature_data.bones.keys(), transform)
+            plans.append((armature_data, bone_map))
+            all_problems.extend(f"{armature_data.name}: {problem}" for problem in problems)
+
+            log.info("%s: %s bones to rename", armature_data.name, len(bone_map))
+            for old, new in bone_map.items():
+                log.debug("'%s' -> '%s'", old, new)
+
+    for problem in all_problems:
+        log.warning("Collision: %s", problem)
+
+    if dry_run:
+        return plans, all_problems
+
+    if all_problems and not skip_collisions:
+        log.error("Nothing renamed, fix the collisions above or run with skip_collisions=True")
+        return plans, all_problems
+
+    # Bone names set from edit mode would be overwritten by the edit bones on exit
+    if bpy.context.mode == 'EDIT_ARMATURE' and any(bone_map for _armature_data, bone_map in plans):
+        instrument.mode_set('OBJECT')
+
+    with instrument.phase("apply"):
+        for armature_data, bone_map in plans:
+            if not bone_map:
+                continue
+            fixed = rename.apply(armature_data, bone_map, bpy.data)
+            log.info("Renamed %s bones of %s, fixed %s fcurves in unassigned actions", len(bone_map), armature_data.name, fixed)
+
+    return plans, all_problems
+
+
+def make_bone_names_uppercase(dry_run=False):
     """Convert all bone names in selected armatures to uppercase"""
-    
-    print("Capitalizing bone names of all armatures in selection")
-    
-    selected_objects = bpy.context.selected_objects
-    armatures = [obj for obj in selected_objects if obj.type == 'ARMATURE']
-    
+
+    log.info("Capitalizing bone names of all armatures in selection")
+
+    armatures = [obj for obj in bpy.context.selected_objects if obj.type == 'ARMATURE']
     if not armatures:
-        print("No armature objects selected")
+        log.warning("No armature objects selected")
         return
-    
-    for armature_obj in armatures:
-        print(f"Processing armature: {armature_obj.name}")
-        
-        bpy.context.view_layer.objects.active = armature_obj
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        armature_data = armature_obj.data
-        
-        changes_made = 0
-        
-        # Iterate through all bones
-        for bone in armature_data.edit_bones:
-            original_name = bone.name
-            uppercase_name = original_name.upper()
-            
-            if original_name != uppercase_name:
-                bone.name = uppercase_name
-                print(f"Renamed: '{original_name}' -> '{uppercase_name}'")
-                changes_made += 1
-        
-        print(f"Bones renamed: {changes_made}")
-        #bpy.ops.object.mode_set(mode='OBJECT')
-
-def make_all_armature_bones_uppercase():
+
+    return rename_bones(armatures, rename.uppercase, dry_run)
+
+
+def make_all_armature_bones_uppercase(dry_run=False):
     """Convert bone names to uppercase for ALL armatures in the scene"""
-    
-    print("Capitalizing bone names of all armatures in scene")
-    
+
+    log.info("Capitalizing bone names of all armatures in scene")
+
     armatures = [obj for obj in bpy.context.scene.objects if obj.type == 'ARMATURE']
-    
     if not armatures:
-        print("No armature objects found")
+        log.warning("No armature objects found")
         return
-    
-    for armature_obj in armatures:
-        print(f"Processing armature: {armature_obj.name}")
-        
-        bpy.context.view_layer.objects.active = armature_obj
-        armature_obj.select_set(True)
-        
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        armature_data = armature_obj.data
-        changes_made = 0
-        
-        for bone in armature_data.edit_bones:
-            original_name = bone.name
-            uppercase_name = original_name.upper()
-            
-            if original_name != uppercase_name:
-                bone.name = uppercase_name
-                print(f"Renamed: '{original_name}' -> '{uppercase_name}'")
-                changes_made += 1
-        
-        print(f"Bones renamed: {changes_made}")
-        bpy.ops.object.mode_set(mode='OBJECT')
+
+    return rename_bones(armatures, rename.uppercase, dry_run)
+
 
 if __name__ == "__main__":
 
-    """ SELECTED ARMATURES """
-    make_bone_names_uppercase()
+    # INFO for a line per armature, DEBUG for a line per bone
+    instrument.set_level('INFO')
+
+    with instrument.run("Capitalize Bones"):
+
+        """ SELECTED ARMATURES """
+        make_bone_names_uppercase()
+
+        """ ALL ARMATURES """
+        #make_all_armature_bones_uppercase()
 
-    """ ALL ARMATURES """
-    #make_all_armature_bones_uppercase()
\ No newline at end of file
+        """ OTHER RENAMES, same planner """
+        #selected = [obj for obj in bpy.context.selected_objects if obj.type == 'ARMATURE']
+        #rename_bones(selected, rename.prefix_swap('DEF', 'ORG'))
+        #rename_bones(selected, rename.compose(rename.normalize_side, rename.uppercase), dry_run=True)
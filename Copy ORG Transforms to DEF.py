@@ -1,53 +1,46 @@
 import bpy
-import re
+import os
+import sys
 
-def copy_org_transforms_to_def(change_subtarget):
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import constraints, instrument
+from rig_tools.instrument import log
+
+@instrument.timed("copy_org_transforms_to_def")
+def copy_org_transforms_to_def(change_subtarget, dry_run=False, prune=False):
     """
     I forgot where I got this originally, maybe Pierrick Picaut, but its modified to be able to use it several times on an armature
     as you make changes since it will only add the constraint if it doesnt exist.
+    Now runs through rig_tools/constraints.py: the existing constraints are indexed once, only the differences are
+    applied, DEF bones without an ORG bone are skipped. dry_run only logs the plan.
     """
     armature = bpy.context.active_object
-    bones = armature.pose.bones
-
-    for bone in bones:
-        def_name = bone.name
-        
-        match = re.match(r'^(DEF)(.*?)$', def_name)
-        
-        if match:
-            
-            prefix = match.group(1)
-            basename = match.group(2)
-            org_name = f'ORG{basename}'
-            
-            if armature.pose.bones.get(org_name) is not None:
-                def_bone = armature.pose.bones.get(def_name)
-                has_copy_transforms = False
-                for existing_constraint in def_bone.constraints:
-                    if existing_constraint.type == 'COPY_TRANSFORMS':
-                        print(f'{def_name} already has COPY_TRANSFORMS constraint')
-                        if existing_constraint.subtarget == org_name:
-                            print(f'{def_name} COPY_TRANSFORMS constraint already targeting {org_name}')
-                            has_copy_transforms = True  
-                            break
-                        else:
-                            if change_subtarget:
-                                print(f'Retargeting')
-                                constraint.target = armature
-                                existing_constraint.subtarget = org_name
-                                has_copy_transforms = True  
-                                break
-                                
-            else:
-               print(f'{org_name} not found')
-
-            if not has_copy_transforms:
-                constraint = def_bone.constraints.new('COPY_TRANSFORMS')
-                constraint.target = armature
-                constraint.subtarget = org_name
-                print(f'Added COPY_TRANSFORMS constraint to {def_name} targeting {org_name}')
-            
+    if armature is None or armature.type != 'ARMATURE':
+        log.error("Error: Please select an armature object")
+        return
+
+    rules = [constraints.Rule('DEF', 'ORG')]
+
+    with instrument.phase("plan"):
+        changes = constraints.plan(armature, rules, retarget=change_subtarget, prune=prune)
+
+    if changes and not dry_run:
+        with instrument.phase("apply"):
+            constraints.apply(armature, changes)
+
+    for line in constraints.report(changes, dry_run):
+        log.info(line)
+    return changes
+
+
 if __name__ == "__main__":
     
+    # INFO for a line per change, DEBUG for timings
+    instrument.set_level('WARNING')
     change_subtarget = True
-    copy_org_transforms_to_def(change_subtarget)
\ No newline at end of file
+    with instrument.run("Copy ORG Transforms to DEF"):
+        copy_org_transforms_to_def(change_subtarget)
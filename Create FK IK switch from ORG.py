@@ -6,84 +6,92 @@
 # MCH_SWITCH, MCH_IK, MCH_FK chains will be created with appropriate constraints
 import bpy
 import bmesh
-import re
+import os
+import sys
 from mathutils import Vector
 
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import fk_ik_snap, instrument, naming, property_spec
+from rig_tools.instrument import log
+
 # Create and set up FK IK SWITCH
+@instrument.timed("create_fk_ik_switch")
 def create_fk_ik_switch():
 
     if bpy.context.active_object is None or bpy.context.active_object.type != 'ARMATURE':
-        print("Error: Please select an armature object")
+        log.error("Error: Please select an armature object")
         return
     
     armature = bpy.context.active_object
 
-    bpy.ops.object.mode_set(mode='EDIT')
+    instrument.mode_set('EDIT')
     
+    # Only sided ORG_*.L / ORG_*.R bones get a switch
     selected_org_bones = []
-    pattern = r'^ORG_(.*)\.([LR])$'
     
     for bone in bpy.context.selected_editable_bones:
-        if re.match(pattern, bone.name):
-            selected_org_bones.append(bone.name)
+        record = naming.parse(bone.name)
+        if record is not None and record.prefix == 'ORG' and record.side != naming.CENTER:
+            selected_org_bones.append(record)
     
     if not selected_org_bones:
-        print("No selected bones found with pattern ORG_*.L or ORG_*.R")
-        bpy.ops.object.mode_set(mode='OBJECT')
+        log.warning("No selected bones found with pattern ORG_*.L or ORG_*.R")
+        instrument.mode_set('OBJECT')
         return
     
-    print(f"Found {len(selected_org_bones)} ORG bones to duplicate")
+    log.info("Found %s ORG bones to duplicate", len(selected_org_bones))
     
     # Create the three duplicate sets
     prefixes = ['MCH_SWITCH', 'MCH_IK', 'MCH_FK']
     created_bones = {prefix: [] for prefix in prefixes}
     
     #TODO: parenting
-    for org_bone_name in selected_org_bones:
-        # Get the suffix and base name
-        match = re.match(r'^ORG_(.*)\.([LR])$', org_bone_name)
-        if match:
-            base_name = match.group(1)
-            suffix = match.group(2)
-            
-            org_bone = armature.data.edit_bones[org_bone_name]
+    for record in selected_org_bones:
+        org_bone = armature.data.edit_bones[record.name]
 
-            for prefix in prefixes:
-                new_name = f"{prefix}_{base_name}.{suffix}"
+        for prefix in prefixes:
+            new_name = record.with_prefix(prefix)
 
-                new_bone = armature.data.edit_bones.new(new_name)
-                new_bone.head = org_bone.head.copy()
-                new_bone.tail = org_bone.tail.copy()
-                new_bone.roll = org_bone.roll
-                new_bone.parent = org_bone.parent
-                
-                created_bones[prefix].append((new_name, suffix))
-                print(f"Created bone: {new_name}")
+            new_bone = armature.data.edit_bones.new(new_name)
+            new_bone.head = org_bone.head.copy()
+            new_bone.tail = org_bone.tail.copy()
+            new_bone.roll = org_bone.roll
+            new_bone.parent = org_bone.parent
+            
+            created_bones[prefix].append((new_name, record))
+            log.debug("Created bone: %s", new_name)
     
-    bpy.ops.object.mode_set(mode='POSE')
+    instrument.mode_set('POSE')
     
+    # Switch properties stored as an array (see "Batch custom properties.py") are read by element
+    index_map = property_spec.read_index_map(armature.pose.bones.get(fk_ik_snap.SWITCH_BONE))
+
     # Add constraints to MCH_SWITCH bones
-    for switch_bone_name, suffix in created_bones['MCH_SWITCH']:
+    for switch_bone_name, record in created_bones['MCH_SWITCH']:
         switch_bone = armature.pose.bones[switch_bone_name]
+        suffix = record.side
         
         # Find corresponding FK and IK bones
-        base_name = switch_bone_name.replace('MCH_SWITCH_', '').replace(f'.{suffix}', '')
-        fk_bone_name = f"MCH_FK_{base_name}.{suffix}"
-        ik_bone_name = f"MCH_IK_{base_name}.{suffix}"
+        fk_bone_name = record.with_prefix('MCH_FK')
+        ik_bone_name = record.with_prefix('MCH_IK')
         
         # Add Copy Transforms constraint for FK bone
         fk_constraint = switch_bone.constraints.new('COPY_TRANSFORMS')
         fk_constraint.name = "Copy FK"
         fk_constraint.target = armature
         fk_constraint.subtarget = fk_bone_name
-        print(f"Added FK constraint to {switch_bone_name} -> {fk_bone_name}")
+        log.debug("Added FK constraint to %s -> %s", switch_bone_name, fk_bone_name)
         
         # Add Copy Transforms constraint for IK bone
         ik_constraint = switch_bone.constraints.new('COPY_TRANSFORMS')
         ik_constraint.name = "Copy IK"
         ik_constraint.target = armature
         ik_constraint.subtarget = ik_bone_name
-        print(f"Added IK constraint to {switch_bone_name} -> {ik_bone_name}")
+        log.debug("Added IK constraint to %s -> %s", switch_bone_name, ik_bone_name)
         
         # Add driver to IK influence
         driver = ik_constraint.driver_add("influence").driver
@@ -97,12 +105,15 @@ def create_fk_ik_switch():
         # Assign PROPERTIES bone custom property to var
         # TODO: Maybe create the PROPERTIES bone and property without needing to paste it here
         var.targets[0].id = armature
-        var.targets[0].data_path = f'pose.bones["PROPERTIES"]["ARM_FK_IK_SWITCH.{suffix}"]'
+        var.targets[0].data_path = fk_ik_snap.switch_path(suffix, index_map)
         
-        print(f"Added driver to {switch_bone_name} IK constraint using ARM_FK_IK_SWITCH.{suffix}")
+        log.debug("Added driver to %s IK constraint using %s", switch_bone_name, var.targets[0].data_path)
     
-    print("FK IK Switch setup complete")
+    log.info("FK IK Switch setup complete")
 
 if __name__ == "__main__":
     
-    create_fk_ik_switch()
\ No newline at end of file
+    # INFO for a line per step, DEBUG for a line per bone
+    instrument.set_level('WARNING')
+    with instrument.run("Create FK IK switch from ORG"):
+        create_fk_ik_switch()
\ No newline at end of file
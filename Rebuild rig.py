@@ -0,0 +1,53 @@
+##########################
+# REBUILD RIG
+##########################
+# Select the armature, run
+# Regenerates only the chains whose ORG bones (head, tail, roll, parent) or generator settings changed since they were
+# generated, see rig_tools/recipe.py. Chains are recorded when they are generated through the add-on operators or
+# with GENERATE below, running the generator scripts directly doesn't record anything.
+#   GENERATE = ('cloth_chain', {'merged': False})    run a generator on the selected ORG bones and record it instead
+#   FORCE = True                                     regenerate every recorded chain
+
+import bpy
+import os
+import sys
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, recipe
+from rig_tools.instrument import log
+
+GENERATE = None
+FORCE = False
+
+
+@instrument.timed("rebuild_rig")
+def rebuild_rig(force=False):
+    armature = bpy.context.active_object
+    if armature is None or armature.type != 'ARMATURE':
+        log.error("Error: Please select an armature object")
+        return
+
+    if recipe.RECIPE_KEY not in armature.data:
+        log.warning("%s has no recipe yet, generate chains with GENERATE first", armature.name)
+        return
+
+    summary = recipe.rebuild(bpy.context, force)
+    log.info("%s rebuilt, %s up to date, %s missing ORG bones",
+             len(summary[recipe.CHANGED]), len(summary[recipe.CLEAN]), len(summary[recipe.MISSING]))
+    return summary
+
+
+if __name__ == "__main__":
+
+    # INFO for a summary, DEBUG for the generators own output
+    instrument.set_level('INFO')
+    with instrument.run("Rebuild rig"):
+        if GENERATE:
+            generator, params = GENERATE
+            recipe.generate(bpy.context, generator, params)
+        else:
+            rebuild_rig(FORCE)
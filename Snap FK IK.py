@@ -0,0 +1,93 @@
+##########################
+# FK IK SNAP
+##########################
+# For rigs made with "Create FK IK switch from ORG.py"
+# Run to register the operator, then in pose mode F3 > "Snap FK IK"
+# Snaps the MCH_FK chain of one side onto the MCH_IK chain (To FK) or the other way round (To IK), on the current
+# frame or over the whole scene range, keys the result and flips ARM_FK_IK_SWITCH for that side.
+# To IK also moves the target and pole bones of IK constraints on the MCH_IK chain.
+
+import bpy
+import os
+import sys
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import fk_ik_snap, instrument, naming, registry
+from rig_tools.instrument import log
+
+
+class A_rig_OT_snap_fk_ik(bpy.types.Operator):
+    """Match the FK chain to the IK chain or the IK chain to the FK chain, on this frame or a frame range"""
+    bl_idname = "a_rig.snap_fk_ik"
+    bl_label = "Snap FK IK"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    direction: EnumProperty(
+        name="Snap",
+        items=(
+            ('FK', "To FK", "Move the FK chain onto the IK chain and switch to FK"),
+            ('IK', "To IK", "Move the IK chain, target and pole onto the FK chain and switch to IK"),
+        ),
+        default='FK',
+    )
+    side: EnumProperty(
+        name="Side",
+        items=(('L', "Left", ""), ('R', "Right", ""), ('ACTIVE', "Active Bone", "Side of the active bone")),
+        default='ACTIVE',
+    )
+    use_range: BoolProperty(name="Frame Range", description="Snap every frame between start and end", default=False)
+    frame_start: IntProperty(name="Start", description="First frame, scene start if left at -1", default=-1)
+    frame_end: IntProperty(name="End", description="Last frame, scene end if left at -1", default=-1)
+    keyframe: BoolProperty(name="Keyframe", default=True)
+    tolerance: FloatProperty(
+        name="Tolerance", description="Drop keys that linear interpolation gets within this of, 0 keys every frame",
+        default=0.0, min=0.0, precision=5,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.active_object.type == 'ARMATURE'
+
+    @instrument.timed("snap_fk_ik")
+    def execute(self, context):
+        armature = context.active_object
+        scene = context.scene
+
+        side = self.side
+        if side == 'ACTIVE':
+            record = naming.parse(context.active_pose_bone.name) if context.active_pose_bone else None
+            if record is None or record.side == naming.CENTER:
+                self.report({'ERROR'}, "Active bone has no side, pick Left or Right")
+                return {'CANCELLED'}
+            side = record.side
+
+        if self.use_range:
+            frame_start = scene.frame_start if self.frame_start < 0 else self.frame_start
+            frame_end = scene.frame_end if self.frame_end < 0 else self.frame_end
+            frames = range(frame_start, frame_end + 1)
+        else:
+            frames = [scene.frame_current]
+
+        moved = fk_ik_snap.snap(
+            armature, scene, side, self.direction, frames,
+            keyframe=self.keyframe or self.use_range, tolerance=self.tolerance,
+        )
+        if not moved:
+            self.report({'ERROR'}, f"No MCH_FK / MCH_IK pairs found on side {side}")
+            return {'CANCELLED'}
+
+        log.info("Snapped %s bones to %s over %s frames", len(moved), self.direction, len(frames))
+        self.report({'INFO'}, f"Snapped {len(moved)} bones to {self.direction}")
+        return {'FINISHED'}
+
+
+if __name__ == "__main__":
+
+    instrument.set_level('WARNING')
+    with registry.session("Snap FK IK") as reg:
+        reg.register_class(A_rig_OT_snap_fk_ik)
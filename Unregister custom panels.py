@@ -1,16 +1,26 @@
+##########################
+# UNREGISTER CUSTOM PANELS
+##########################
+# Removes every class, handler and property our scripts registered through rig_tools/registry.py and nothing else,
+# built-in and other add-on panels are left alone. Re-running a script already replaces its own classes,
+# this is for clearing everything out.
+
 import bpy
+import os
+import sys
+
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, registry
+from rig_tools.instrument import log
+
+
+if __name__ == "__main__":
 
-# List all registered classes
-for cls_name in dir(bpy.types):
-    cls = getattr(bpy.types, cls_name)
-    
-    # Check if it's a panel in the 'Item' category
-    if (hasattr(cls, 'bl_space_type') and 
-        hasattr(cls, 'bl_category') and 
-        getattr(cls, 'bl_category', None)):
-        
-        try:
-            bpy.utils.unregister_class(cls)
-            print(f"Unregistered: {cls_name}")
-        except:
-            print(f"Failed to unregister: {cls_name}")
\ No newline at end of file
+    instrument.set_level('INFO')
+    with instrument.run("Unregister custom panels"):
+        removed = registry.unregister_all()
+        log.info("Unregistered %s classes / handlers / properties", removed)
@@ -0,0 +1 @@
+"""Benchmarks for the rig scripts, see run.py"""
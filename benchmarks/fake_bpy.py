@@ -0,0 +1,1248 @@
+"""
+In-process stand-in for bpy and mathutils, enough of them to run the rig scripts outside Blender
+
+    from benchmarks import fake_bpy
+    fake_bpy.install()      # puts bpy, bpy.types, bpy.props, bpy.app.handlers, mathutils, bmesh, rna_prop_ui in sys.modules
+    import bpy
+
+Only covers what the benchmarked code paths touch: armatures with edit / pose / object mode switching, bones,
+pose bones, constraints and drivers, custom properties, bone collections, meshes filled through foreach_set,
+vertex groups, modifiers and collections. Everything is plain Python so it runs on a bare CI machine.
+
+It is not Blender: nothing is evaluated, there is no depsgraph and no undo. Timings from it show how the Python side of
+a script scales (lookups, loops, mode switches are counted the same way), not how long Blender would take.
+"""
+import math
+import sys
+import types
+from array import array
+
+
+##########################
+# mathutils
+##########################
+
+class Vector:
+    __slots__ = ('_values',)
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self._values = [float(value) for value in values]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        self._values[index] = float(value)
+
+    def __repr__(self):
+        return f"Vector({tuple(round(value, 4) for value in self._values)})"
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self._values == other._values
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self, other))
+
+    def __mul__(self, scalar):
+        return Vector(a * scalar for a in self)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        return Vector(a / scalar for a in self)
+
+    def __neg__(self):
+        return Vector(-a for a in self)
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    x = property(lambda self: self._values[0], lambda self, value: self.__setitem__(0, value))
+    y = property(lambda self: self._values[1], lambda self, value: self.__setitem__(1, value))
+    z = property(lambda self: self._values[2], lambda self, value: self.__setitem__(2, value))
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self, other))
+
+    def cross(self, other):
+        ax, ay, az = self
+        bx, by, bz = other
+        return Vector((ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx))
+
+    @property
+    def length(self):
+        return math.sqrt(self.dot(self))
+
+    def normalized(self):
+        length = self.length
+        return Vector(self) / length if length else Vector(self)
+
+    def copy(self):
+        return Vector(self)
+
+    def to_tuple(self):
+        return tuple(self._values)
+
+
+class Matrix:
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = Matrix.Identity(4)._rows
+        self._rows = [[float(value) for value in row] for row in rows]
+
+    @classmethod
+    def Identity(cls, size):
+        return cls([[1.0 if i == j else 0.0 for j in range(size)] for i in range(size)])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return (Vector(row) for row in self._rows)
+
+    def __getitem__(self, index):
+        return Vector(self._rows[index])
+
+    def __repr__(self):
+        return f"Matrix({self._rows})"
+
+    def __matmul__(self, other):
+        size = len(self._rows)
+        if isinstance(other, Matrix):
+            columns = list(zip(*other._rows))
+            return Matrix([[sum(a * b for a, b in zip(row, column)) for column in columns] for row in self._rows])
+        values = list(other)
+        if size == 4 and len(values) == 3:
+            # Points get the translation, like mathutils
+            values.append(1.0)
+            return Vector(sum(a * b for a, b in zip(row, values)) for row in self._rows[:3])
+        return Vector(sum(a * b for a, b in zip(row, values)) for row in self._rows)
+
+    def copy(self):
+        return Matrix(self._rows)
+
+    def to_3x3(self):
+        return Matrix([row[:3] for row in self._rows[:3]])
+
+    @property
+    def translation(self):
+        return Vector(row[3] for row in self._rows[:3])
+
+    def inverted(self):
+        """Gauss-Jordan, rig matrices are small and never singular"""
+        size = len(self._rows)
+        work = [row[:] + [1.0 if i == j else 0.0 for j in range(size)] for i, row in enumerate(self._rows)]
+        for column in range(size):
+            pivot = max(range(column, size), key=lambda r: abs(work[r][column]))
+            work[column], work[pivot] = work[pivot], work[column]
+            scale = work[column][column]
+            work[column] = [value / scale for value in work[column]]
+            for r in range(size):
+                if r != column and work[r][column]:
+                    factor = work[r][column]
+                    work[r] = [a - factor * b for a, b in zip(work[r], work[column])]
+        return Matrix([row[size:] for row in work])
+
+
+class Quaternion(Vector):
+    """w, x, y, z. Euler conversion only for the XYZ order"""
+    __slots__ = ()
+
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+        super().__init__(values)
+
+    def to_axis_angle(self):
+        w, x, y, z = self.normalized()
+        angle = 2.0 * math.acos(max(-1.0, min(1.0, w)))
+        sin = math.sqrt(max(0.0, 1.0 - w * w))
+        axis = Vector((x / sin, y / sin, z / sin)) if sin > 1e-9 else Vector((0.0, 0.0, 1.0))
+        return axis, angle
+
+    def to_euler(self, order='XYZ', *euler_compat):
+        # Like mathutils, the compat argument is optional but has to be an Euler when given, None is an error
+        if euler_compat and not isinstance(euler_compat[0], Vector):
+            raise TypeError(f"to_euler(): expected an Euler for euler_compat, not {type(euler_compat[0]).__name__}")
+        w, x, y, z = self.normalized()
+        return Vector((
+            math.atan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y)),
+            math.asin(max(-1.0, min(1.0, 2.0 * (w * y - z * x)))),
+            math.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z)),
+        ))
+
+
+def _bone_matrix(head, tail, roll):
+    """Rest matrix of a bone, Y along the bone and the roll turning X / Z around it"""
+    y_axis = (tail - head).normalized()
+    reference = Vector((0.0, 0.0, 1.0)) if abs(y_axis.z) < 0.999 else Vector((1.0, 0.0, 0.0))
+    x_axis = y_axis.cross(reference).normalized()
+    z_axis = x_axis.cross(y_axis)
+    cos, sin = math.cos(roll), math.sin(roll)
+    x_axis, z_axis = x_axis * cos - z_axis * sin, x_axis * sin + z_axis * cos
+    return Matrix([
+        [x_axis[0], y_axis[0], z_axis[0], head[0]],
+        [x_axis[1], y_axis[1], z_axis[1], head[1]],
+        [x_axis[2], y_axis[2], z_axis[2], head[2]],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+
+
+##########################
+# Collections and custom properties
+##########################
+
+def _fill(values, flat):
+    """foreach_get into a list, numpy array or array.array"""
+    if isinstance(values, array):
+        values[:len(flat)] = array(values.typecode, flat)
+    else:
+        values[:len(flat)] = flat
+
+
+class IDProps:
+    """obj["prop"] custom properties"""
+
+    def _props(self):
+        if '_id_props' not in self.__dict__:
+            self.__dict__['_id_props'] = {}
+        return self.__dict__['_id_props']
+
+    def __getitem__(self, key):
+        return self._props()[key]
+
+    def __setitem__(self, key, value):
+        self._props()[key] = value
+
+    def __delitem__(self, key):
+        del self._props()[key]
+
+    def __contains__(self, key):
+        return key in self._props()
+
+    def get(self, key, default=None):
+        return self._props().get(key, default)
+
+    def keys(self):
+        return list(self._props())
+
+    def items(self):
+        return list(self._props().items())
+
+    def pop(self, key, default=None):
+        return self._props().pop(key, default)
+
+
+class Named:
+    """Item of a NamedCollection, renaming keeps the collections name lookup and uniqueness up to date"""
+    _owner = None
+
+    @property
+    def name(self):
+        return self.__dict__['_name']
+
+    @name.setter
+    def name(self, value):
+        old = self.__dict__.get('_name')
+        if self._owner is not None:
+            value = self._owner._renamed(self, old, value)
+        self.__dict__['_name'] = value
+        self._on_rename(old, value)
+
+    def _on_rename(self, old, new):
+        pass
+
+    def as_pointer(self):
+        return id(self)
+
+
+class NamedCollection:
+    """bpy_prop_collection: iteration, len, lookup by name or index, get, keys"""
+
+    def __init__(self, items=()):
+        self._items = []
+        self._by_name = {}
+        for item in items:
+            self._link(item)
+
+    def _unique(self, name):
+        if name not in self._by_name:
+            return name
+        index = 1
+        while f"{name}.{index:03d}" in self._by_name:
+            index += 1
+        return f"{name}.{index:03d}"
+
+    def _link(self, item):
+        item.__dict__['_name'] = self._unique(item.__dict__['_name'])
+        item._owner = self
+        self._items.append(item)
+        self._by_name[item.name] = item
+        return item
+
+    def _unlink(self, item):
+        self._items.remove(item)
+        self._by_name.pop(item.name, None)
+        item._owner = None
+
+    def _renamed(self, item, old, new):
+        self._by_name.pop(old, None)
+        new = self._unique(new)
+        self._by_name[new] = item
+        return new
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._items[key]
+        return self._by_name[key]
+
+    def get(self, name, default=None):
+        return self._by_name.get(name, default)
+
+    def keys(self):
+        return [item.name for item in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(item.name, item) for item in self._items]
+
+    def find(self, name):
+        item = self._by_name.get(name)
+        return self._items.index(item) if item is not None else -1
+
+    def foreach_get(self, attr, values):
+        """Flat values of attr for every item, matrices column by column like Blender"""
+        flat = []
+        for item in self._items:
+            value = getattr(item, attr)
+            if isinstance(value, Matrix):
+                flat.extend(value._rows[row][column] for column in range(len(value._rows)) for row in range(len(value._rows)))
+            elif isinstance(value, (Vector, list, tuple)):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        _fill(values, flat)
+
+
+class Attributes:
+    """Settings blocks (cloth settings, colors...) that just take whatever is set on them"""
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+##########################
+# Animation
+##########################
+
+class Keyframe:
+    def __init__(self, frame, value):
+        self.co = Vector((frame, value))
+        self.handle_left = Vector((frame - 1.0, value))
+        self.handle_right = Vector((frame + 1.0, value))
+        self.handle_left_type = self.handle_right_type = 'AUTO_CLAMPED'
+        self.interpolation = 'BEZIER'
+        self.easing = 'AUTO'
+        self.type = 'KEYFRAME'
+
+
+class KeyframePoints:
+    # foreach_get / foreach_set hand enums over as their index, like Blender
+    _VECTORS = ('co', 'handle_left', 'handle_right')
+    _ENUMS = {
+        'interpolation': ('CONSTANT', 'LINEAR', 'BEZIER'),
+        'handle_left_type': ('FREE', 'ALIGNED', 'VECTOR', 'AUTO', 'AUTO_CLAMPED'),
+        'handle_right_type': ('FREE', 'ALIGNED', 'VECTOR', 'AUTO', 'AUTO_CLAMPED'),
+        'easing': ('AUTO', 'EASE_IN', 'EASE_OUT', 'EASE_IN_OUT'),
+        'type': ('KEYFRAME', 'BREAKDOWN', 'MOVING_HOLD', 'EXTREME', 'JITTER', 'GENERATED'),
+    }
+
+    def __init__(self):
+        self._points = []
+
+    def __iter__(self):
+        return iter(self._points)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __getitem__(self, index):
+        return self._points[index]
+
+    def add(self, count):
+        self._points.extend(Keyframe(0.0, 0.0) for _ in range(count))
+
+    def insert(self, frame, value, options=None):
+        point = Keyframe(frame, value)
+        self._points.append(point)
+        self._points.sort(key=lambda point: point.co[0])
+        return point
+
+    def remove(self, point, fast=False):
+        self._points.remove(point)
+
+    def clear(self):
+        self._points.clear()
+
+    def foreach_set(self, attr, values):
+        values = list(values)
+        if attr in self._VECTORS:
+            for i, point in enumerate(self._points):
+                setattr(point, attr, Vector(values[i * 2:i * 2 + 2]))
+        else:
+            names = self._ENUMS[attr]
+            for point, value in zip(self._points, values):
+                setattr(point, attr, names[value])
+
+    def foreach_get(self, attr, values):
+        if attr in self._VECTORS:
+            flat = [value for point in self._points for value in getattr(point, attr)]
+        else:
+            names = self._ENUMS[attr]
+            flat = [names.index(getattr(point, attr)) for point in self._points]
+        _fill(values, flat)
+
+
+class DriverTarget:
+    def __init__(self):
+        self.id = None
+        self.data_path = ''
+        self.bone_target = ''
+        self.transform_type = 'LOC_X'
+        self.transform_space = 'WORLD_SPACE'
+
+
+class DriverVariable(Named):
+    def __init__(self, name="var"):
+        self.__dict__['_name'] = name
+        self.type = 'SINGLE_PROP'
+        self.targets = [DriverTarget(), DriverTarget()]
+
+
+class DriverVariables(NamedCollection):
+    def new(self):
+        return self._link(DriverVariable())
+
+    def remove(self, variable):
+        self._unlink(variable)
+
+
+class Driver:
+    def __init__(self):
+        self.type = 'SCRIPTED'
+        self.expression = ''
+        self.use_self = False
+        self.is_valid = True
+        self.variables = DriverVariables()
+
+
+class FCurve:
+    def __init__(self, data_path, index=0, group=None):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = group
+        self.keyframe_points = KeyframePoints()
+        self.driver = Driver()
+        self.mute = False
+
+    def update(self):
+        pass
+
+
+class FCurves:
+    def __init__(self):
+        self._curves = []
+
+    def __iter__(self):
+        return iter(list(self._curves))
+
+    def __len__(self):
+        return len(self._curves)
+
+    def new(self, data_path, index=0, action_group=''):
+        fcurve = FCurve(data_path, index, action_group or None)
+        self._curves.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index=0):
+        for fcurve in self._curves:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def remove(self, fcurve):
+        self._curves.remove(fcurve)
+
+
+class ActionGroup(Named):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+
+class ActionGroups(NamedCollection):
+    def new(self, name):
+        return self._link(ActionGroup(name))
+
+
+class Action(Named, IDProps):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.fcurves = FCurves()
+        self.groups = ActionGroups()
+        self.users = 0
+
+
+class AnimData:
+    def __init__(self):
+        self.action = None
+        self.drivers = FCurves()
+        self.nla_tracks = []
+
+
+class Animatable:
+    animation_data = None
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+
+##########################
+# Constraints and modifiers
+##########################
+
+_CONSTRAINT_NAMES = {
+    'COPY_TRANSFORMS': "Copy Transforms",
+    'COPY_ROTATION': "Copy Rotation",
+    'COPY_LOCATION': "Copy Location",
+    'DAMPED_TRACK': "Damped Track",
+    'CHILD_OF': "Child Of",
+    'IK': "IK",
+    'ARMATURE': "Armature",
+}
+
+
+class Constraint(Named):
+    def __init__(self, constraint_type, owner_id, path):
+        self.__dict__['_name'] = _CONSTRAINT_NAMES.get(constraint_type, constraint_type.title())
+        self.type = constraint_type
+        self.target = None
+        self.subtarget = ''
+        self.influence = 1.0
+        self.enabled = True
+        self.mute = False
+        self.owner_space = 'WORLD'
+        self.target_space = 'WORLD'
+        self.inverse_matrix = Matrix.Identity(4)
+        self.chain_count = 0
+        self.pole_target = None
+        self.pole_subtarget = ''
+        self._id = owner_id
+        self._path = path
+
+    def driver_add(self, prop, index=-1):
+        path = f'{self._path}.constraints["{self.name}"].{prop}'
+        return self._id.animation_data_create().drivers.new(path, max(index, 0))
+
+
+class Constraints(NamedCollection):
+    def __init__(self, owner_id, path=''):
+        super().__init__()
+        self._id = owner_id
+        self._path = path
+
+    def new(self, constraint_type):
+        return self._link(Constraint(constraint_type, self._id, self._path))
+
+    def remove(self, constraint):
+        self._unlink(constraint)
+
+
+class Modifier(Named):
+    def __init__(self, name, modifier_type):
+        self.__dict__['_name'] = name
+        self.type = modifier_type
+        self.object = None
+        self.show_viewport = True
+        self.show_render = True
+        self.use_vertex_groups = True
+        self.use_bone_envelopes = False
+        self.settings = Attributes()
+        self.collision_settings = Attributes(use_collision=False, collection=None)
+        self.point_cache = Attributes(frame_start=1, frame_end=250, is_baked=False)
+
+
+class Modifiers(NamedCollection):
+    def new(self, name, type):
+        return self._link(Modifier(name, type))
+
+    def remove(self, modifier):
+        self._unlink(modifier)
+
+
+##########################
+# Armatures
+##########################
+
+class Bone(Named, IDProps):
+    def __init__(self, name, head, tail, roll=0.0):
+        self.__dict__['_name'] = name
+        self.head_local = Vector(head)
+        self.tail_local = Vector(tail)
+        self.roll = roll
+        self.parent = None
+        self.children = []
+        self.select = self.select_head = self.select_tail = False
+        self.hide = False
+        self.use_connect = False
+        self.use_deform = True
+        self.use_inherit_rotation = True
+        self.inherit_scale = 'FULL'
+        self.collections = []
+        self._armature = None
+
+    def _on_rename(self, old, new):
+        if old is not None and self._armature is not None:
+            self._armature._bone_renamed(old, new)
+
+    @property
+    def matrix_local(self):
+        # Read for every bone on every sampled frame, only rebuilt when the rest data changed
+        key = (*self.head_local, *self.tail_local, self.roll)
+        cached = self.__dict__.get('_matrix_local')
+        if cached is None or cached[0] != key:
+            cached = self.__dict__['_matrix_local'] = (key, _bone_matrix(self.head_local, self.tail_local, self.roll))
+        return cached[1].copy()
+
+    @property
+    def length(self):
+        return (self.tail_local - self.head_local).length
+
+    @property
+    def z_axis(self):
+        return Vector(row[2] for row in self.matrix_local._rows[:3])
+
+
+class EditBone(Named):
+    head = property(lambda self: self._head, lambda self, value: setattr(self, '_head', Vector(value)))
+    tail = property(lambda self: self._tail, lambda self, value: setattr(self, '_tail', Vector(value)))
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self._head = Vector((0.0, 0.0, 0.0))
+        self._tail = Vector((0.0, 1.0, 0.0))
+        self.roll = 0.0
+        self.parent = None
+        self.select = self.select_head = self.select_tail = False
+        self.use_connect = False
+        self.use_deform = True
+        self._source = None
+
+    @property
+    def matrix(self):
+        return _bone_matrix(self.head, self.tail, self.roll)
+
+    @property
+    def length(self):
+        return (self.tail - self.head).length
+
+    @property
+    def x_axis(self):
+        return Vector(row[0] for row in self.matrix._rows[:3])
+
+    @property
+    def y_axis(self):
+        return Vector(row[1] for row in self.matrix._rows[:3])
+
+    @property
+    def z_axis(self):
+        return Vector(row[2] for row in self.matrix._rows[:3])
+
+
+class EditBones(NamedCollection):
+    def new(self, name):
+        return self._link(EditBone(name))
+
+    def remove(self, edit_bone):
+        for other in self._items:
+            if other.parent is edit_bone:
+                other.parent = edit_bone.parent
+        self._unlink(edit_bone)
+
+
+class BoneCollection(Named, IDProps):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.bones = []
+        self.children = []
+        self.parent = None
+        self.is_visible = True
+
+    def assign(self, bone):
+        bone = getattr(bone, 'bone', bone)
+        # A bone is in a handful of collections, a collection can hold thousands of bones
+        if self not in bone.collections:
+            self.bones.append(bone)
+            bone.collections.append(self)
+        return True
+
+    def unassign(self, bone):
+        bone = getattr(bone, 'bone', bone)
+        if self in bone.collections:
+            self.bones.remove(bone)
+            bone.collections.remove(self)
+
+
+class BoneCollections(NamedCollection):
+    def __init__(self, armature):
+        super().__init__()
+        self._armature = armature
+
+    def new(self, name, parent=None):
+        collection = BoneCollection(name)
+        self._armature.collections_all._link(collection)
+        if parent is not None:
+            collection.parent = parent
+            parent.children.append(collection)
+            return collection
+        return self._link(collection)
+
+
+class Armature(Named, IDProps, Animatable):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.bones = NamedCollection()
+        self.edit_bones = EditBones()
+        self.collections_all = NamedCollection()
+        self.collections = BoneCollections(self)
+        self._objects = []
+        self.users = 0
+
+    def _bone_renamed(self, old, new):
+        for obj in self._objects:
+            obj.pose._bone_renamed(old, new)
+            animation_data = obj.animation_data
+            action = animation_data.action if animation_data else None
+            if action is not None:
+                old_path, new_path = f'pose.bones["{old}"]', f'pose.bones["{new}"]'
+                for fcurve in action.fcurves:
+                    if fcurve.data_path.startswith(old_path):
+                        fcurve.data_path = new_path + fcurve.data_path[len(old_path):]
+
+    def _enter_edit_mode(self):
+        edit_bones = EditBones()
+        copies = {}
+        for bone in self.bones:
+            edit_bone = EditBone(bone.name)
+            edit_bone._head = bone.head_local.copy()
+            edit_bone._tail = bone.tail_local.copy()
+            edit_bone.roll = bone.roll
+            edit_bone.select, edit_bone.select_head, edit_bone.select_tail = bone.select, bone.select_head, bone.select_tail
+            edit_bone.use_connect = bone.use_connect
+            edit_bone.use_deform = bone.use_deform
+            edit_bone._source = bone
+            copies[bone.name] = edit_bone
+            edit_bones._link(edit_bone)
+        for bone in self.bones:
+            if bone.parent is not None:
+                copies[bone.name].parent = copies[bone.parent.name]
+        self.edit_bones = edit_bones
+
+    def _exit_edit_mode(self):
+        bones = NamedCollection()
+        made = {}
+        for edit_bone in self.edit_bones:
+            bone = edit_bone._source or Bone(edit_bone.name, edit_bone.head, edit_bone.tail)
+            old_name = bone.__dict__['_name']
+            bone.__dict__['_name'] = edit_bone.name
+            # The edit bones are thrown away, their vectors can be kept
+            bone.head_local = edit_bone.head
+            bone.tail_local = edit_bone.tail
+            bone.roll = edit_bone.roll
+            bone.select, bone.select_head, bone.select_tail = edit_bone.select, edit_bone.select_head, edit_bone.select_tail
+            bone.use_connect = edit_bone.use_connect
+            bone.use_deform = edit_bone.use_deform
+            bone.children = []
+            bone._armature = self
+            made[edit_bone.name] = (bone, old_name if edit_bone._source is not None else None)
+            bones._link(bone)
+        for edit_bone in self.edit_bones:
+            bone = made[edit_bone.name][0]
+            bone.parent = made[edit_bone.parent.name][0] if edit_bone.parent is not None else None
+            if bone.parent is not None:
+                bone.parent.children.append(bone)
+
+        kept = {bone for bone, _old in made.values()}
+        for collection in self.collections_all:
+            collection.bones = [bone for bone in collection.bones if bone in kept]
+
+        self.bones = bones
+        self.edit_bones = EditBones()
+        for obj in self._objects:
+            obj.pose._sync(self, {old: bone.name for bone, old in made.values() if old is not None})
+
+
+class PoseBone(Named, IDProps):
+    # Transform channels are only made when something reads them, most pose bones never get touched
+    _CHANNELS = {
+        'location': (0.0, 0.0, 0.0),
+        'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+        'rotation_euler': (0.0, 0.0, 0.0),
+        'rotation_axis_angle': (0.0, 0.0, 1.0, 0.0),
+        'scale': (1.0, 1.0, 1.0),
+        'custom_shape_translation': (0.0, 0.0, 0.0),
+        'custom_shape_scale_xyz': (1.0, 1.0, 1.0),
+    }
+
+    def __init__(self, obj, bone):
+        self.__dict__['_name'] = bone.name
+        self.bone = bone
+        self.id_data = obj
+        self.constraints = Constraints(obj, f'pose.bones["{bone.name}"]')
+        self.rotation_mode = 'QUATERNION'
+        self.custom_shape = None
+        self.color = Attributes(palette='DEFAULT')
+        self._overridable = set()
+
+    def __getattr__(self, name):
+        default = PoseBone._CHANNELS.get(name)
+        if default is None:
+            raise AttributeError(name)
+        value = self.__dict__[name] = Vector(default)
+        return value
+
+    @property
+    def parent(self):
+        parent = self.bone.parent
+        return self.id_data.pose.bones[parent.name] if parent is not None else None
+
+    @property
+    def matrix(self):
+        return self.bone.matrix_local
+
+    @property
+    def length(self):
+        return self.bone.length
+
+    @property
+    def matrix_basis(self):
+        return Matrix.Identity(4)
+
+    def property_overridable_library_set(self, path, overridable):
+        (self._overridable.add if overridable else self._overridable.discard)(path)
+        return True
+
+    def keyframe_insert(self, data_path, index=-1, frame=None, group=None):
+        return True
+
+
+class Pose:
+    def __init__(self, obj):
+        self._obj = obj
+        self.bones = NamedCollection()
+
+    def _sync(self, armature, renamed):
+        """Pose bones follow the bones after edit mode, renamed ones keep their constraints and properties"""
+        old_bones = {pose_bone.name: pose_bone for pose_bone in self.bones}
+        old_names = {new: old for old, new in renamed.items()}
+        bones = NamedCollection()
+        for bone in armature.bones:
+            pose_bone = old_bones.get(old_names.get(bone.name, bone.name))
+            if pose_bone is None:
+                pose_bone = PoseBone(self._obj, bone)
+            pose_bone.__dict__['_name'] = bone.name
+            pose_bone.bone = bone
+            bones._link(pose_bone)
+        self.bones = bones
+
+    def _bone_renamed(self, old, new):
+        pose_bone = self.bones.get(old)
+        if pose_bone is not None:
+            pose_bone.name = new
+
+
+##########################
+# Meshes and objects
+##########################
+
+class MeshElements:
+    """mesh.vertices / loops / polygons, stored as flat attribute lists"""
+
+    def __init__(self):
+        self._count = 0
+        self._attributes = {}
+
+    def __len__(self):
+        return self._count
+
+    def add(self, count):
+        self._count += count
+
+    def foreach_set(self, attr, values):
+        self._attributes[attr] = list(values)
+
+    def foreach_get(self, attr, values):
+        values[:] = self._attributes.get(attr, [])
+
+
+class Mesh(Named, IDProps, Animatable):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.vertices = MeshElements()
+        self.loops = MeshElements()
+        self.polygons = MeshElements()
+        self.edges = MeshElements()
+        self.shape_keys = None
+        self.users = 0
+
+    def update(self, calc_edges=False):
+        pass
+
+
+class VertexGroup(Named):
+    def __init__(self, name, index):
+        self.__dict__['_name'] = name
+        self.index = index
+        self._weights = {}
+
+    def add(self, indices, weight, type):
+        for index in indices:
+            if type == 'ADD':
+                self._weights[index] = min(1.0, self._weights.get(index, 0.0) + weight)
+            else:
+                self._weights[index] = weight
+
+
+class VertexGroups(NamedCollection):
+    def new(self, name="Group"):
+        return self._link(VertexGroup(name, len(self)))
+
+
+class Object(Named, IDProps, Animatable):
+    def __init__(self, name, data):
+        self.__dict__['_name'] = name
+        self.data = data
+        if isinstance(data, Armature):
+            self.type = 'ARMATURE'
+            data._objects.append(self)
+            self.pose = Pose(self)
+            self.pose._sync(data, {})
+        elif isinstance(data, Mesh):
+            self.type = 'MESH'
+            self.pose = None
+        else:
+            self.type = 'EMPTY'
+            self.pose = None
+        self.matrix_world = Matrix.Identity(4)
+        self.constraints = Constraints(self)
+        self.modifiers = Modifiers()
+        self.vertex_groups = VertexGroups()
+        self.parent = None
+        self.parent_type = 'OBJECT'
+        self.parent_bone = ''
+        self.mode = 'OBJECT'
+        self._selected = False
+
+    def select_set(self, state):
+        self._selected = bool(state)
+
+    def select_get(self):
+        return self._selected
+
+    @property
+    def children(self):
+        return [obj for obj in data.objects if obj.parent is self]
+
+    @property
+    def children_recursive(self):
+        found = []
+        pending = list(self.children)
+        while pending:
+            obj = pending.pop()
+            found.append(obj)
+            pending.extend(obj.children)
+        return found
+
+    def convert_space(self, pose_bone=None, matrix=None, from_space='WORLD', to_space='WORLD'):
+        return matrix.copy()
+
+
+class Collection(Named):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.objects = ObjectLinks()
+        self.children = CollectionLinks()
+
+    @property
+    def all_objects(self):
+        found = list(self.objects)
+        for child in self.children:
+            found.extend(obj for obj in child.all_objects if obj not in found)
+        return found
+
+
+class ObjectLinks:
+    def __init__(self):
+        self._objects = []
+
+    def __iter__(self):
+        return iter(list(self._objects))
+
+    def __len__(self):
+        return len(self._objects)
+
+    def link(self, obj):
+        if obj not in self._objects:
+            self._objects.append(obj)
+
+    def unlink(self, obj):
+        self._objects.remove(obj)
+
+
+class CollectionLinks(ObjectLinks):
+    pass
+
+
+##########################
+# bpy.data / context / ops
+##########################
+
+class DataCollection(NamedCollection):
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+
+    def new(self, name, *args):
+        return self._link(self._factory(name, *args))
+
+    def remove(self, item, do_unlink=True):
+        self._unlink(item)
+        if isinstance(item, Object):
+            for collection in [scene.collection, *data.collections]:
+                if item in collection.objects._objects:
+                    collection.objects.unlink(item)
+            if isinstance(item.data, Armature) and item in item.data._objects:
+                item.data._objects.remove(item)
+
+
+class BlendData:
+    def __init__(self):
+        self.filepath = ''
+        self.objects = DataCollection(Object)
+        self.meshes = DataCollection(Mesh)
+        self.armatures = DataCollection(Armature)
+        self.collections = DataCollection(Collection)
+        self.actions = DataCollection(Action)
+
+
+class ViewLayerObjects:
+    def __init__(self):
+        self.active = None
+
+    def __iter__(self):
+        return iter(scene.objects)
+
+    def __len__(self):
+        return len(scene.objects)
+
+
+class ViewLayer:
+    def __init__(self):
+        self.objects = ViewLayerObjects()
+
+    def update(self):
+        pass
+
+
+class Scene(Named, IDProps):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.collection = Collection("Scene Collection")
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_current = 1
+        self.render = Attributes(fps=24)
+
+    @property
+    def objects(self):
+        return self.collection.all_objects
+
+    def frame_set(self, frame, subframe=0.0):
+        self.frame_current = frame
+
+
+class Context:
+    @property
+    def scene(self):
+        return scene
+
+    @property
+    def view_layer(self):
+        return view_layer
+
+    @property
+    def active_object(self):
+        return view_layer.objects.active
+
+    object = active_object
+
+    @property
+    def selected_objects(self):
+        return [obj for obj in scene.objects if obj.select_get()]
+
+    @property
+    def mode(self):
+        obj = self.active_object
+        if obj is None or obj.mode == 'OBJECT':
+            return 'OBJECT'
+        if obj.mode == 'EDIT':
+            return 'EDIT_ARMATURE' if obj.type == 'ARMATURE' else 'EDIT_MESH'
+        return obj.mode
+
+    @property
+    def selected_editable_bones(self):
+        obj = self.active_object
+        if obj is None or obj.mode != 'EDIT' or obj.type != 'ARMATURE':
+            return []
+        return [bone for bone in obj.data.edit_bones if bone.select]
+
+    @property
+    def active_pose_bone(self):
+        return None
+
+    def temp_override(self, **kwargs):
+        from contextlib import nullcontext
+        return nullcontext()
+
+
+def mode_set(mode='OBJECT'):
+    obj = context.active_object
+    if obj is None:
+        raise RuntimeError("Operator bpy.ops.object.mode_set.poll() failed, context is incorrect")
+    if obj.mode == mode:
+        return {'FINISHED'}
+    if obj.mode == 'EDIT' and obj.type == 'ARMATURE':
+        obj.data._exit_edit_mode()
+    if mode == 'EDIT' and obj.type == 'ARMATURE':
+        obj.data._enter_edit_mode()
+    obj.mode = mode
+    return {'FINISHED'}
+
+
+def reset():
+    """Fresh empty file"""
+    global data, scene, view_layer
+    data = BlendData()
+    scene = Scene("Scene")
+    view_layer = ViewLayer()
+    if 'bpy' in sys.modules and getattr(sys.modules['bpy'], '_is_stand_in', False):
+        sys.modules['bpy'].data = data
+
+
+data = None
+scene = None
+view_layer = None
+context = Context()
+
+
+##########################
+# Modules
+##########################
+
+def _property(*args, **kwargs):
+    return (args, kwargs)
+
+
+def _persistent(func):
+    return func
+
+
+def _rna_idprop_ui_create(item, prop, *, default, min=0.0, max=1.0, soft_min=None, soft_max=None,
+                          description=None, overridable=False, subtype=None, **kwargs):
+    item[prop] = default
+    if overridable and hasattr(item, 'property_overridable_library_set'):
+        item.property_overridable_library_set(f'["{prop}"]', True)
+
+
+def install():
+    """Put the stand-in modules in sys.modules, returns the bpy module"""
+    reset()
+
+    mathutils = types.ModuleType('mathutils')
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    mathutils.Quaternion = Quaternion
+
+    bpy = types.ModuleType('bpy')
+    bpy._is_stand_in = True
+    bpy.data = data
+    bpy.context = context
+
+    bpy_types = types.ModuleType('bpy.types')
+    for name in ('Operator', 'Panel', 'PropertyGroup', 'Menu', 'UIList'):
+        setattr(bpy_types, name, type(name, (), {}))
+    bpy_types.Armature = Armature
+    bpy_types.Object = Object
+    bpy_types.Mesh = Mesh
+    bpy_types.PoseBone = PoseBone
+    bpy.types = bpy_types
+
+    bpy_props = types.ModuleType('bpy.props')
+    for name in ('BoolProperty', 'IntProperty', 'FloatProperty', 'StringProperty', 'EnumProperty',
+                 'PointerProperty', 'CollectionProperty', 'FloatVectorProperty', 'IntVectorProperty'):
+        setattr(bpy_props, name, _property)
+    bpy.props = bpy_props
+
+    bpy_app = types.ModuleType('bpy.app')
+    bpy_app.version = (4, 2, 0)
+    bpy_app.version_string = "4.2.0 (stand-in)"
+    bpy_app.background = True
+    handlers = types.ModuleType('bpy.app.handlers')
+    handlers.persistent = _persistent
+    for name in ('depsgraph_update_post', 'undo_post', 'redo_post', 'load_post', 'frame_change_post'):
+        setattr(handlers, name, [])
+    bpy_app.handlers = handlers
+    bpy.app = bpy_app
+
+    bpy.ops = types.SimpleNamespace(object=types.SimpleNamespace(mode_set=mode_set))
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+
+    rna_prop_ui = types.ModuleType('rna_prop_ui')
+    rna_prop_ui.rna_idprop_ui_create = _rna_idprop_ui_create
+
+    sys.modules.update({
+        'bpy': bpy,
+        'bpy.types': bpy_types,
+        'bpy.props': bpy_props,
+        'bpy.app': bpy_app,
+        'bpy.app.handlers': handlers,
+        'mathutils': mathutils,
+        'bmesh': types.ModuleType('bmesh'),
+        'rna_prop_ui': rna_prop_ui,
+    })
+    return bpy
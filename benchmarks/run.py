@@ -0,0 +1,338 @@
+"""
+Benchmarks for the rig scripts on synthetic armatures, compared against a stored baseline
+
+Outside Blender the scripts run against the in-process bpy stand-in (benchmarks/fake_bpy.py), no Blender needed:
+
+    python benchmarks/run.py
+    python benchmarks/run.py --scales small,medium --only setup_cloth_chain,create_fk_ik_switch
+
+Inside Blender the real bpy is used, same arguments after --:
+
+    blender --background --factory-startup --python benchmarks/run.py -- --scales large
+
+Every benchmark gets a freshly generated armature (benchmarks/synthetic.py) that isn't timed, the best of --repeats runs
+is kept along with the instrument counters of the run (bpy.ops calls, mode switches...). Results go to --output as JSON.
+
+The baseline (benchmarks/baseline.json) holds one set of results per backend, "stand-in" or "blender-X.Y". A benchmark
+regresses when it is more than --threshold times slower than the baseline and at least --min-delta seconds slower,
+or when any of its counters went up. Counters don't depend on the machine, times do, so rebuild the baseline with
+--update-baseline on the machine that checks against it. --fail-on-regression exits with 1 for CI.
+
+The stand-in does nothing Blender would do on a mode switch or constraint, its times only show the Python side of
+the scripts. Use it to catch loops going quadratic and extra operator calls, use Blender for the real numbers.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+
+# rig_tools and benchmarks live next to each other
+_repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repo_dir not in sys.path:
+    sys.path.append(_repo_dir)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# forks and nesting as in synthetic.build_armature
+Scale = namedtuple('Scale', 'chains bones forks nesting')
+
+SCALES = {
+    'small': Scale(10, 5, 0, 1),
+    'medium': Scale(50, 10, 5, 2),
+    'large': Scale(200, 20, 10, 4),
+}
+
+THRESHOLD = 1.25
+MIN_DELTA = 0.005
+
+CLOTH = "Cloth chains from ORG.py"
+FK_IK = "Create FK IK switch from ORG.py"
+COPY_TO_DEF = "Copy ORG Transforms to DEF.py"
+RENAME = "Capitalize Bones.py"
+PROPERTIES = "Batch custom properties.py"
+
+
+def use_bpy(stand_in=False):
+    """Real bpy when there is one, the stand-in otherwise. Returns the backend name"""
+    if not stand_in:
+        try:
+            import bpy
+            return f"blender-{bpy.app.version[0]}.{bpy.app.version[1]}"
+        except ImportError:
+            pass
+    from benchmarks import fake_bpy
+    fake_bpy.install()
+    return 'stand-in'
+
+
+##########################
+# Benchmarks
+##########################
+
+# Each benchmark gets a fresh armature, does its untimed setup and returns the call to time
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def _script(filename):
+    from rig_tools import addon
+    return addon.script(filename)
+
+
+def _org_chains(armature):
+    """Sorted ORG chains by name, needs edit mode"""
+    from rig_tools import chain_graph
+
+    org_bones = [bone for bone in armature.data.edit_bones if bone.name.startswith("ORG_")]
+    chains, _problems = chain_graph.chains_by_name(org_bones)
+    return chains
+
+
+@benchmark
+def setup_cloth_chain(armature):
+    from benchmarks import synthetic
+
+    synthetic.select_org_bones(armature)
+    return _script(CLOTH).setup_cloth_chain
+
+
+@benchmark
+def setup_cloth_chain_merged(armature):
+    from benchmarks import synthetic
+
+    synthetic.select_org_bones(armature)
+    cloth = _script(CLOTH)
+    return lambda: cloth.setup_cloth_chain(merged=True, sim_rows=8)
+
+
+@benchmark
+def sort_bone_chain(armature):
+    chains = {}
+    for bone in armature.data.bones:
+        if bone.name.startswith("ORG_"):
+            chains.setdefault(bone.name.rsplit('_', 1)[0], []).append(bone)
+    cloth = _script(CLOTH)
+    return lambda: [cloth.sort_bone_chain(bones) for bones in chains.values()]
+
+
+@benchmark
+def create_chain_mesh(armature):
+    from rig_tools import instrument, ribbon_mesh
+
+    instrument.mode_set('EDIT')
+    rows = {chain.key: ribbon_mesh.chain_rows(chain.bones, armature.matrix_world) for chain in _org_chains(armature)}
+    instrument.mode_set('OBJECT')
+    cloth = _script(CLOTH)
+    return lambda: [cloth.create_chain_mesh(chain_rows, f"PHYS_{chain_key}") for chain_key, chain_rows in rows.items()]
+
+
+@benchmark
+def create_fk_ik_switch(armature):
+    from benchmarks import synthetic
+
+    synthetic.select_org_bones(armature)
+    return _script(FK_IK).create_fk_ik_switch
+
+
+@benchmark
+def snap_fk_ik(armature):
+    import bpy
+    from benchmarks import synthetic
+    from rig_tools import fk_ik_snap, instrument
+
+    synthetic.select_org_bones(armature)
+    _script(FK_IK).create_fk_ik_switch()
+    instrument.mode_set('OBJECT')
+    scene = bpy.context.scene
+
+    def snap():
+        moved = fk_ik_snap.snap(armature, scene, 'L', 'FK', range(1, 25), tolerance=0.001)
+        # Nothing moved means the MCH_FK / MCH_IK pairs werent found, not a fast run
+        if not moved:
+            raise RuntimeError("snap_fk_ik moved no bones")
+        return moved
+    return snap
+
+
+@benchmark
+def copy_org_transforms_to_def(armature):
+    copy = _script(COPY_TO_DEF)
+    return lambda: copy.copy_org_transforms_to_def(True)
+
+
+@benchmark
+def make_bone_names_uppercase(armature):
+    return _script(RENAME).make_bone_names_uppercase
+
+
+@benchmark
+def rename_prefix_swap(armature):
+    from rig_tools import rename
+
+    rename_script = _script(RENAME)
+    return lambda: rename_script.rename_bones([armature], rename.prefix_swap('DEF', 'MCH'))
+
+
+@benchmark
+def add_properties_to_properties_bone(armature):
+    # One set of properties per chain, PROPERTIES bone style: CHAIN000_IK_FK.L
+    chains = sorted({bone.name.split('_')[1] for bone in armature.data.bones if bone.name.startswith("ORG_")})
+    bone_collections = [{
+        'bones': [chain.upper() for chain in chains],
+        'symmetrical': True,
+        'properties': [
+            {'name': 'IK_FK', 'type': 'FLOAT', 'default': 1.0},
+            {'name': 'STRETCH', 'type': 'FLOAT', 'default': 0.0},
+            {'name': 'FOLLOW', 'type': 'INT', 'default': 1, 'max': 2},
+        ],
+    }]
+    properties = _script(PROPERTIES)
+    return lambda: properties.add_properties_to_properties_bone(armature.name, "PROPERTIES", bone_collections)
+
+
+##########################
+# Running
+##########################
+
+def run_benchmark(name, scale, repeats):
+    """Best time over repeats, counters from the last run"""
+    from benchmarks import synthetic
+    from rig_tools import instrument, naming
+
+    best = None
+    for _repeat in range(repeats):
+        synthetic.clear_scene()
+        armature = synthetic.build_armature(scale.chains, scale.bones, scale.forks, scale.nesting)
+        call = BENCHMARKS[name](armature)
+        # Every run starts with cold name parsing, like a fresh session would
+        naming.parse.cache_clear()
+
+        with instrument.run(name):
+            started = time.perf_counter()
+            call()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'seconds': round(best, 6),
+        'repeats': repeats,
+        'bones': len(armature.data.bones),
+        'counters': instrument.report()['counters'],
+    }
+
+
+def run_all(scales, names, repeats):
+    results = {}
+    for scale_name in scales:
+        scale = SCALES[scale_name]
+        results[scale_name] = {}
+        for name in names:
+            result = run_benchmark(name, scale, repeats)
+            results[scale_name][name] = result
+            print(f"{scale_name:>8} {name:<36} {result['seconds'] * 1000:10.2f} ms  {result['counters']}")
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Regressions against baseline as readable lines, benchmarks missing from the baseline are skipped"""
+    regressions = []
+    for scale_name, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            base = baseline.get(scale_name, {}).get(name)
+            if base is None:
+                continue
+            seconds, base_seconds = result['seconds'], base['seconds']
+            if seconds > base_seconds * threshold and seconds - base_seconds > min_delta:
+                regressions.append(
+                    f"{scale_name} {name}: {seconds * 1000:.2f} ms, baseline {base_seconds * 1000:.2f} ms "
+                    f"({seconds / base_seconds:.2f}x)"
+                )
+            for counter, value in result['counters'].items():
+                base_value = base['counters'].get(counter, 0)
+                if value > base_value:
+                    regressions.append(f"{scale_name} {name}: {counter} {value}, baseline {base_value}")
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rig scripts on synthetic armatures")
+    parser.add_argument('--scales', default=','.join(SCALES), help=f"Comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--only', help="Comma separated benchmark names, all of them by default")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="JSON file for the results")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the baseline for this backend")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Slowdown factor that counts as a regression")
+    parser.add_argument('--min-delta', type=float, default=MIN_DELTA, help="Seconds a slowdown has to be at least")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--stand-in', action='store_true', help="Use the bpy stand-in even if bpy can be imported")
+    args = parser.parse_args(argv)
+
+    scales = args.scales.split(',')
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    for name in scales:
+        if name not in SCALES:
+            parser.error(f"Unknown scale {name}")
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark {name}")
+
+    backend = use_bpy(args.stand_in)
+    from rig_tools import instrument
+    instrument.set_level('SILENT')
+
+    print(f"Backend: {backend}")
+    results = run_all(scales, names, args.repeats)
+    report = {
+        'backend': backend,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline.get(backend, {}), args.threshold, args.min_delta)
+    if backend not in baseline:
+        print(f"No baseline for {backend}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions and backend in baseline:
+        print("No regressions")
+
+    if args.update_baseline:
+        stored = baseline.setdefault(backend, {})
+        for scale_name, benchmarks in results.items():
+            stored.setdefault(scale_name, {}).update(
+                {name: {'seconds': result['seconds'], 'counters': result['counters']} for name, result in benchmarks.items()}
+            )
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline for {backend} written to {args.baseline}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    # Blender passes our arguments after --
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    exit_code = main(argv)
+    if exit_code:
+        sys.exit(exit_code)
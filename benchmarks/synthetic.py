@@ -0,0 +1,127 @@
+"""
+Synthetic armatures for the benchmarks, built through the regular bpy API so they work in Blender and the stand-in
+
+    armature = synthetic.build_armature(chains=50, bones=10)
+
+Every chain gets ORG_chainNNN_{NN}{side} bones with a matching DEF_ bone, sides cycle through .L, .R and centre.
+Names are lower case so the upper case rename has every bone to rename.
+Extra shapes real rigs have and the scripts have to cope with:
+
+    forks       every Nth chain gets an extra bone branching off its middle bone (same chain name, like a split strand)
+    nesting     chains hang off the tip of the previous chain in groups of this many, deep hierarchies like tails
+                or tentacles, 1 parents every chain to ROOT
+
+Plus a ROOT bone, a PROPERTIES bone and the rig_id the rig panel looks for. The result is the active, selected
+object in object mode.
+"""
+SIDES = ('.L', '.R', '')
+BONE_LENGTH = 0.1
+CHAIN_SPACING = 0.05
+
+
+def chain_name(index):
+    return f"chain{index:03d}"
+
+
+def chain_side(index):
+    return SIDES[index % len(SIDES)]
+
+
+def org_name(chain, bone, side):
+    return f"ORG_{chain}_{bone + 1:02d}{side}"
+
+
+def build_armature(chains, bones, forks=0, nesting=1, name="BENCH_RIG", rig_id="Arig"):
+    """
+    Armature object with chains x bones ORG / DEF bones, see the module docstring
+    forks 0 adds no forks, N adds one to every Nth chain
+    """
+    import bpy
+
+    armature_data = bpy.data.armatures.new(name)
+    armature = bpy.data.objects.new(name, armature_data)
+    bpy.context.scene.collection.objects.link(armature)
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+    armature.select_set(True)
+    bpy.context.view_layer.objects.active = armature
+    armature_data['rig_id'] = rig_id
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    edit_bones = armature_data.edit_bones
+
+    root = edit_bones.new("ROOT")
+    root.head = (0.0, 0.0, 0.0)
+    root.tail = (0.0, BONE_LENGTH, 0.0)
+
+    properties = edit_bones.new("PROPERTIES")
+    properties.head = (0.0, 0.0, -BONE_LENGTH)
+    properties.tail = (0.0, BONE_LENGTH, -BONE_LENGTH)
+    properties.parent = root
+
+    previous_tip = None
+    for chain_index in range(chains):
+        chain = chain_name(chain_index)
+        side = chain_side(chain_index)
+        x = (chain_index + 1) * CHAIN_SPACING * (-1.0 if side == '.R' else 1.0)
+
+        # Nested chains start at the previous tip, the first one of every group starts at ROOT
+        if nesting > 1 and chain_index % nesting and previous_tip is not None:
+            parent = previous_tip
+            start = parent.tail.copy()
+        else:
+            parent = root
+            start = (x, 0.0, 1.0)
+
+        org_bones = []
+        for bone_index in range(bones):
+            org = edit_bones.new(org_name(chain, bone_index, side))
+            org.head = (start[0], start[1], start[2] - bone_index * BONE_LENGTH)
+            org.tail = (start[0], start[1], start[2] - (bone_index + 1) * BONE_LENGTH)
+            org.roll = 0.1 * bone_index
+            org.parent = org_bones[-1] if org_bones else parent
+            org.use_connect = bool(org_bones)
+            org_bones.append(org)
+
+        if forks and chain_index % forks == 0 and bones > 1:
+            branch_from = org_bones[(bones - 1) // 2]
+            fork = edit_bones.new(org_name(chain, bones, side))
+            fork.head = branch_from.tail.copy()
+            fork.tail = (branch_from.tail[0] + BONE_LENGTH, branch_from.tail[1], branch_from.tail[2])
+            fork.parent = branch_from
+            org_bones.append(fork)
+
+        for org in org_bones:
+            deform = edit_bones.new("DEF" + org.name[len("ORG"):])
+            deform.head = org.head.copy()
+            deform.tail = org.tail.copy()
+            deform.roll = org.roll
+
+        previous_tip = org_bones[bones - 1]
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return armature
+
+
+def select_org_bones(armature, chain_limit=None):
+    """Select the ORG bones of the first chain_limit chains (all of them by default), edit mode picks it up"""
+    wanted = None if chain_limit is None else {chain_name(index) for index in range(chain_limit)}
+    count = 0
+    for bone in armature.data.bones:
+        select = bone.name.startswith("ORG_") and (wanted is None or bone.name.split('_')[1] in wanted)
+        bone.select = bone.select_head = bone.select_tail = select
+        count += select
+    return count
+
+
+def clear_scene():
+    """Remove every object, armature, mesh and bone collection the previous benchmark made"""
+    import bpy
+
+    if bpy.context.active_object is not None and bpy.context.active_object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for collection in (bpy.data.armatures, bpy.data.meshes, bpy.data.collections, bpy.data.actions):
+        for item in list(collection):
+            collection.remove(item)
@@ -18,17 +18,27 @@ advance 1 frame
 click reset
 """
 import bpy
-from bpy.props import StringProperty, EnumProperty, PointerProperty, BoolProperty
+import os
+import sys
+from bpy.props import StringProperty, EnumProperty, PointerProperty, BoolProperty, IntProperty, FloatProperty
 from mathutils import Euler, Matrix, Vector, Quaternion
 from bpy.types import PropertyGroup
 from bpy.app.handlers import persistent
 import mathutils
 
-rig_id = "Arig"
+# rig_tools lives next to this script
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+
+from rig_tools import instrument, keyframes, pivot, registry, rig_ui
+from rig_tools.instrument import log
+
+rig_id = rig_ui.RIG_ID
 
 class A_rig_OT_reset_dynamic_pivot(bpy.types.Operator):
     """
-    Resets the Pivots rotation while maintaining the effect of the rotation on affected bone to allow
+    Resets the Pivots rotation while maintaining the effect of the rotation on affected bones to allow
     moving the pivot to another location without affecting anything
     """
     bl_idname = "a_rig.reset_dynamic_pivot"
@@ -37,30 +47,24 @@ class A_rig_OT_reset_dynamic_pivot(bpy.types.Operator):
     bl_options = {'UNDO', 'INTERNAL'}
     parent: StringProperty(name="Parent", description="Name of Parent pivot bone")
     child: StringProperty(name="Child", description="Name of Child pivot bone")
-    affected: StringProperty(name="Affected", description="Name of Affected bone")
+    affected: StringProperty(name="Affected", description="Names of Affected bones, comma separated")
+    affected_collection: StringProperty(name="Affected Collection", description="Bone collection of Affected bones")
     
     @classmethod 
     def poll(cls, context):
-        try:
-            return (context.active_object.data.get("rig_id") == rig_id)
-        except (AttributeError, KeyError, TypeError):
-            return False
+        return rig_ui.is_rig(context.active_object)
     
+    @instrument.timed("reset_dynamic_pivot")
     def execute(self, context):
-        print(f"Resetting pivot: {self.parent}")
+        log.debug("Resetting pivot: %s", self.parent)
         armature = context.active_object
         pose_bones = armature.pose.bones
         scene = context.scene
         current_frame = scene.frame_current
     
         # Bones
-        parent_bone = pose_bones[f'{self.parent}']
-        affected_bone = pose_bones[f'{self.affected}']
-        child_bone_name = f'{self.child}' 
-        
-        child_bone = pose_bones.get(child_bone_name)
-        
-        select_set = [affected_bone, parent_bone]
+        parent_bone = pose_bones.get(self.parent)
+        child_bone = pose_bones.get(self.child)
     
         if not parent_bone:
             self.report({'ERROR'}, "Parent bone not found")
@@ -69,112 +73,116 @@ class A_rig_OT_reset_dynamic_pivot(bpy.types.Operator):
         if not child_bone:
             self.report({'ERROR'}, "Child bone not found")
             return {'CANCELLED'}
-            
-        if not affected_bone:
-            self.report({'ERROR'}, f"Affected bone not found")
+        
+        names = pivot.affected_names(armature, self.affected, self.affected_collection, exclude=(self.parent, self.child))
+        missing = [name for name in names if name not in pose_bones]
+        if not names or missing:
+            self.report({'ERROR'}, f"Affected bone not found: {', '.join(missing)}" if missing else "No affected bones")
             return {'CANCELLED'}
+        affected_bones = [pose_bones[name] for name in names]
     
-        # Update to make sure matrices are current
-        context.view_layer.update()
+        # Only evaluation this does, costs nothing when the scene is already up to date
+        instrument.update_view_layer(context)
+        
+        # All affected bones share the one evaluation
+        affected_world_matrices = [armature.matrix_world @ bone.matrix for bone in affected_bones]
         
-        # Need to keyframe the affected bone on the previous frame or it will have extra movement and then snap back on this frame
-        print(f"frame {current_frame}")
+        # Need to keyframe the affected bones on the previous frame or they will have extra movement and then snap back on this frame
+        log.debug("frame %s", current_frame)
+        keys = []
         if current_frame > 0:
-            current_affected_loc = affected_bone.location.copy()
-            current_affected_rot = affected_bone.rotation_quaternion.copy()
-            current_affected_scale = affected_bone.scale.copy()
-            
-            self.keyframe_previous_frame(
-                scene, 
-                affected_bone, 
-                current_affected_loc, 
-                current_affected_rot, 
-                current_affected_scale
-            )
+            keys.extend(pivot.transform_keys(affected_bones, current_frame - 1))
         
-        # Get affected bones matrix
-        affected_world_matrix = armature.matrix_world @ affected_bone.matrix
-        affected_loc, affected_rot, affected_scale = affected_world_matrix.decompose()
+        # Pivot and child after the reset, worked out from the current pose when possible
+        reset = pivot.reset_matrices(parent_bone, child_bone)
         
         # Reset pivot rotation
-        parent_bone.rotation_quaternion = mathutils.Quaternion((1, 0, 0, 0))
-        parent_bone.rotation_euler = mathutils.Euler((0, 0, 0), 'XYZ')
-
-        context.view_layer.update()
-        
-        # Calculate new averaged effect after reset
-        new_parent_world_matrix = armature.matrix_world @ parent_bone.matrix
-        new_child_world_matrix = armature.matrix_world @ child_bone.matrix
-        
-        new_parent_loc, new_parent_rot, new_parent_scale = new_parent_world_matrix.decompose()
-        new_child_loc, new_child_rot, new_child_scale = new_child_world_matrix.decompose()
-        
-        new_averaged_loc = (new_parent_loc + new_child_loc) * 0.5
-        new_averaged_rot = new_parent_rot.slerp(new_child_rot, 0.5)
-        new_averaged_scale = (new_parent_scale + new_child_scale) * 0.5
+        pivot.zero_rotation(parent_bone)
         
-        new_averaged_world_matrix = mathutils.Matrix.LocRotScale(new_averaged_loc, new_averaged_rot, new_averaged_scale)
-        target_affected_local_matrix = new_averaged_world_matrix.inverted() @ affected_world_matrix
+        if reset is None:
+            # Something else moves the pivot or child, read them back after one evaluation
+            log.debug("%s or %s is constrained, evaluating", parent_bone.name, child_bone.name)
+            instrument.update_view_layer(context)
+            reset = parent_bone.matrix.copy(), child_bone.matrix.copy()
         
+        # Calculate new averaged effect after reset
+        new_parent_world_matrix = armature.matrix_world @ reset[0]
+        new_child_world_matrix = armature.matrix_world @ reset[1]
+        new_averaged_world_matrix = pivot.averaged_matrix(new_parent_world_matrix, new_child_world_matrix)
+        averaged_inverse = new_averaged_world_matrix.inverted()
         
-        # Apply to affected bone
-        loc, rot, scale = target_affected_local_matrix.decompose()
-        
-        affected_bone.location = loc
-        affected_bone.rotation_quaternion = rot
-        affected_bone.scale = scale
-        
-        context.view_layer.update()
+        # Apply to affected bones
+        for affected_bone, affected_world_matrix in zip(affected_bones, affected_world_matrices):
+            pivot.set_basis(affected_bone, averaged_inverse @ affected_world_matrix)
         
-        #bpy.ops.pose.select_all(action='DESELECT')
-        for pbone in select_set:
-            try:
-                pbone.keyframe_insert("location")
-                pbone.keyframe_insert("rotation_quaternion")
-                pbone.keyframe_insert("scale")
-            except RuntimeError:
-                self.report({'WARNING'}, f'{pbone.name} failed to keyframe')
-                pass
+        # Everything keyed in one go, one undo step for the whole reset
+        keys.extend(pivot.transform_keys([*affected_bones, parent_bone], current_frame))
+        try:
+            keyframes.insert_keys(keyframes.ensure_action(armature), keys)
+        except RuntimeError as e:
+            self.report({'WARNING'}, f'Failed to keyframe: {e}')
         
         #put pivot back at rest pose
         #nvm this is cancer
         #parent_bone.location = loc
         
-        # Final update
-        context.view_layer.update()
-        
-        self.report({'INFO'}, "Dynamic pivot reset successfully")
+        self.report({'INFO'}, f"Dynamic pivot reset successfully, {len(affected_bones)} bones compensated")
         return {'FINISHED'}
     
-    def keyframe_previous_frame(self, scene, affected_bone, prev_loc, prev_rot, prev_scale):
-        """Keyframe the affected bone on the previous frame with its original transform"""
-        current_frame = scene.frame_current
+class A_rig_OT_rebake_dynamic_pivot(bpy.types.Operator):
+    """
+    Clears the Pivots rotation over a whole frame range while keeping the affected bone moving exactly as before,
+    instead of stepping through the shot and pressing RESET on every frame
+    """
+    bl_idname = "a_rig.rebake_dynamic_pivot"
+    bl_label = "Re-bake Dynamic Pivot"
+    bl_description = "Clears pivot rotation over the frame range and keys the affected bone to compensate"
+    bl_options = {'REGISTER', 'UNDO', 'INTERNAL'}
+    parent: StringProperty(name="Parent", description="Name of Parent pivot bone")
+    child: StringProperty(name="Child", description="Name of Child pivot bone")
+    affected: StringProperty(name="Affected", description="Names of Affected bones, comma separated")
+    affected_collection: StringProperty(name="Affected Collection", description="Bone collection of Affected bones")
+    frame_start: IntProperty(name="Start", description="First frame, scene start if left at -1", default=-1)
+    frame_end: IntProperty(name="End", description="Last frame, scene end if left at -1", default=-1)
+    tolerance: FloatProperty(
+        name="Tolerance", description="Drop keys that linear interpolation gets within this of, 0 keys every frame",
+        default=0.0001, min=0.0, precision=5,
+    )
+    
+    @classmethod 
+    def poll(cls, context):
+        return A_rig_OT_reset_dynamic_pivot.poll(context)
+    
+    @instrument.timed("rebake_dynamic_pivot")
+    def execute(self, context):
+        armature = context.active_object
+        pose_bones = armature.pose.bones
+        scene = context.scene
+        
+        names = pivot.affected_names(armature, self.affected, self.affected_collection, exclude=(self.parent, self.child))
+        if not names:
+            self.report({'ERROR'}, "No affected bones")
+            return {'CANCELLED'}
+        for name in (self.parent, self.child, *names):
+            if pose_bones.get(name) is None:
+                self.report({'ERROR'}, f"{name} not found")
+                return {'CANCELLED'}
+        
+        frame_start = scene.frame_start if self.frame_start < 0 else self.frame_start
+        frame_end = scene.frame_end if self.frame_end < 0 else self.frame_end
         
         try:
-            # Go to previous frame
-            scene.frame_set(current_frame - 1)
-            
-            # Set the bone to its previous transform
-            affected_bone.location = prev_loc
-            affected_bone.rotation_quaternion = prev_rot
-            affected_bone.scale = prev_scale
-            
-            bpy.context.view_layer.update()
-            
-            # Keyframe the bone on this frame
-            affected_bone.keyframe_insert("location")
-            affected_bone.keyframe_insert("rotation_quaternion")
-            affected_bone.keyframe_insert("scale")
-            
-            print(f"✅ Keyframed {affected_bone.name} on frame {current_frame - 1}")
-            
-        except Exception as e:
-            print(f"Failed to keyframe previous frame: {e}")
+            key_counts = pivot.rebake(
+                armature, scene, self.parent, self.child, names,
+                range(frame_start, frame_end + 1), self.tolerance,
+            )
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
         
-        finally:
-            # Go back to current frame
-            scene.frame_set(current_frame)
-            bpy.context.view_layer.update()
+        log.debug("Re-baked %s over %s-%s: %s", self.parent, frame_start, frame_end, key_counts)
+        self.report({'INFO'}, f"Pivot re-baked over frames {frame_start}-{frame_end}")
+        return {'FINISHED'}
     
 class A_PT_rigui(bpy.types.Panel):
     bl_space_type = 'VIEW_3D'
@@ -185,16 +193,10 @@ class A_PT_rigui(bpy.types.Panel):
     
     @classmethod
     def poll(cls, context):
-        try:
-            return (context.active_object.data.get("rig_id") == rig_id)
-        except (AttributeError, KeyError, TypeError):
-            return False
-        
-        
+        return rig_ui.is_rig(context.active_object)
 
     def draw(self, context):
         layout = self.layout
-        col = layout.column()
         """
         # Check if properties exist before accessing
         if not hasattr(context.scene, 'A_rig_props'):
@@ -204,23 +206,47 @@ class A_PT_rigui(bpy.types.Panel):
         # Get the properties
         A_props = context.scene.A_rig_props
         """
-        # Get pose bones for accessing custom properties
+        # Everything below comes from the cached model, rebuilt only when the rig itself changes
         armature = context.active_object
-        pose_bones = armature.pose.bones
-        #props_bone = context.object.pose.bones.get("PROPERTIES")
-        
-        # Use collections_all to access all collections including nested ones
-        all_collections = bpy.data.armatures["Armature"].collections_all
+        model = rig_ui.model(armature)
         
         box = layout.box()
-        row = box.row()
-    
+        
         row = box.row(align=True)
         op = row.operator("A_rig.reset_dynamic_pivot", emboss=True, text="RESET PIVOT", icon='SNAP_ON')
-        op.parent = 'PIVOT'
-        op.child = 'MCH_PIVOT_CHILD'
-        op.affected = 'AFFECTED'
+        for key, value in model.pivot.items():
+            setattr(op, key, value)
+        
+        row = box.row(align=True)
+        op = row.operator("A_rig.rebake_dynamic_pivot", emboss=True, text="RE-BAKE RANGE", icon='ACTION')
+        for key, value in model.pivot.items():
+            setattr(op, key, value)
+        
+        props_bone = armature.pose.bones.get(rig_ui.PROPERTIES_BONE)
+        if model.switches and props_bone is not None:
+            box = layout.box()
+            col = box.column(align=True)
+            for label, prop, index in model.switches:
+                col.prop(props_bone, f'["{prop}"]', index=index, text=label, slider=True)
+        
+        # Use collections_all to access all collections including nested ones
+        if model.collections:
+            all_collections = armature.data.collections_all
+            box = layout.box()
+            col = box.column(align=True)
+            for name, depth in model.collections:
+                collection = all_collections.get(name)
+                if collection is None:
+                    continue
+                row = col.row(align=True)
+                row.separator(factor=2.0 * depth)
+                row.prop(collection, "is_visible", text=name, toggle=True)
     
 if __name__ == "__main__":
-    bpy.utils.register_class(A_rig_OT_reset_dynamic_pivot)
-    bpy.utils.register_class(A_PT_rigui)
\ No newline at end of file
+    # Re-running the script replaces the classes from the last run, "Unregister custom panels.py" removes them
+    with registry.session("pivot demo") as reg:
+        for handler_list, func in rig_ui.HANDLERS:
+            reg.add_handler(handler_list, func)
+        reg.register_class(A_rig_OT_reset_dynamic_pivot)
+        reg.register_class(A_rig_OT_rebake_dynamic_pivot)
+        reg.register_class(A_PT_rigui)
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Shared helpers for the rig scripts in this folder.
+
+The scripts are still meant to be opened in the text editor and run one at a time,
+they just import the bits they have in common from here instead of each doing it their own way.
+
+The folder also installs as an add-on, see addon.py. Nothing is imported until register() runs,
+so the scripts importing rig_tools don't pay for it.
+"""
+bl_info = {
+    "name": "A Rig Tools",
+    "author": "fakegucci",
+    "version": (0, 1, 0),
+    "blender": (4, 0, 0),
+    "location": "View3D > Sidebar > Rig Tools",
+    "description": "Cloth chains, FK/IK switches, dynamic pivots and rig fix ups",
+    "category": "Rigging",
+}
+
+
+def register():
+    from . import addon
+    addon.register()
+
+
+def unregister():
+    from . import addon
+    addon.unregister()
@@ -0,0 +1,417 @@
+"""
+The scripts in this folder as one add-on
+
+register() only registers the small operator and panel classes below, they hold the operator properties and nothing
+else. The script that does the work is imported the first time one of its operators runs, so enabling the add-on
+costs about the same as not having it, and tools that never get used never import anything.
+
+The scripts are found next to the rig_tools folder, the way they sit in the repo, or in rig_tools/scripts/ when they
+are zipped up inside it to install. They keep working on their own from the text editor either way.
+
+    script("Cloth chains from ORG.py").setup_cloth_chain(merged=True)     # what the operators do on first use
+
+After the first load script() returns the module it already has without touching the disk, the rig panel calls it
+on every redraw. Edited scripts are picked up by the Reload Scripts operator, reload_scripts(), which imports
+the ones whose file changed.
+"""
+import importlib.util
+import os
+import time
+
+import bpy
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
+
+from . import instrument, recipe, registry, rig_ui
+from .instrument import log
+
+_package_dir = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIRS = (os.path.join(_package_dir, 'scripts'), os.path.dirname(_package_dir))
+
+# file name -> (mtime, module), a script is only imported again on reload when its file changed
+_scripts = {}
+
+
+def script_path(filename):
+    for directory in SCRIPT_DIRS:
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"{filename} not found in {', '.join(SCRIPT_DIRS)}")
+
+
+def script(filename, reload=False):
+    """
+    One of the loose scripts as a module, imported on first use without running its __main__ block
+    reload checks the file and imports it again if it changed, otherwise a loaded script is returned as is
+    """
+    cached = _scripts.get(filename)
+    if cached is not None and not reload:
+        return cached[1]
+    path = script_path(filename)
+    mtime = os.path.getmtime(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    started = time.perf_counter()
+    name = 'rig_script_' + ''.join(c if c.isalnum() else '_' for c in os.path.splitext(filename)[0]).lower()
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _scripts[filename] = (mtime, module)
+    log.debug("Loaded %s in %.3fs", filename, time.perf_counter() - started)
+    return module
+
+
+def loaded_scripts():
+    return sorted(_scripts)
+
+
+def reload_scripts():
+    """Import the loaded scripts whose file changed again, returns their file names"""
+    changed = []
+    for filename in loaded_scripts():
+        module = _scripts[filename][1]
+        if script(filename, reload=True) is not module:
+            changed.append(filename)
+    return changed
+
+
+##########################
+# Rig UI, same idnames / class names as the scripts so running a script replaces them
+##########################
+
+class A_rig_OT_reset_dynamic_pivot(bpy.types.Operator):
+    """Resets pivot rotation while maintaining effect, to allow moving of the pivot after a rotation"""
+    bl_idname = "a_rig.reset_dynamic_pivot"
+    bl_label = "Reset Dynamic Pivot"
+    bl_options = {'UNDO', 'INTERNAL'}
+    parent: StringProperty(name="Parent", description="Name of Parent pivot bone")
+    child: StringProperty(name="Child", description="Name of Child pivot bone")
+    affected: StringProperty(name="Affected", description="Names of Affected bones, comma separated")
+    affected_collection: StringProperty(name="Affected Collection", description="Bone collection of Affected bones")
+
+    @classmethod
+    def poll(cls, context):
+        return rig_ui.is_rig(context.active_object)
+
+    def execute(self, context):
+        return script("pivot demo.py").A_rig_OT_reset_dynamic_pivot.execute(self, context)
+
+
+class A_rig_OT_rebake_dynamic_pivot(bpy.types.Operator):
+    """Clears pivot rotation over the frame range and keys the affected bone to compensate"""
+    bl_idname = "a_rig.rebake_dynamic_pivot"
+    bl_label = "Re-bake Dynamic Pivot"
+    bl_options = {'REGISTER', 'UNDO', 'INTERNAL'}
+    parent: StringProperty(name="Parent", description="Name of Parent pivot bone")
+    child: StringProperty(name="Child", description="Name of Child pivot bone")
+    affected: StringProperty(name="Affected", description="Names of Affected bones, comma separated")
+    affected_collection: StringProperty(name="Affected Collection", description="Bone collection of Affected bones")
+    frame_start: IntProperty(name="Start", description="First frame, scene start if left at -1", default=-1)
+    frame_end: IntProperty(name="End", description="Last frame, scene end if left at -1", default=-1)
+    tolerance: FloatProperty(
+        name="Tolerance", description="Drop keys that linear interpolation gets within this of, 0 keys every frame",
+        default=0.0001, min=0.0, precision=5,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return rig_ui.is_rig(context.active_object)
+
+    def execute(self, context):
+        return script("pivot demo.py").A_rig_OT_rebake_dynamic_pivot.execute(self, context)
+
+
+class A_rig_OT_snap_fk_ik(bpy.types.Operator):
+    """Match the FK chain to the IK chain or the IK chain to the FK chain, on this frame or a frame range"""
+    bl_idname = "a_rig.snap_fk_ik"
+    bl_label = "Snap FK IK"
+    bl_options = {'REGISTER', 'UNDO'}
+    direction: EnumProperty(
+        name="Snap",
+        items=(
+            ('FK', "To FK", "Move the FK chain onto the IK chain and switch to FK"),
+            ('IK', "To IK", "Move the IK chain, target and pole onto the FK chain and switch to IK"),
+        ),
+        default='FK',
+    )
+    side: EnumProperty(
+        name="Side",
+        items=(('L', "Left", ""), ('R', "Right", ""), ('ACTIVE', "Active Bone", "Side of the active bone")),
+        default='ACTIVE',
+    )
+    use_range: BoolProperty(name="Frame Range", description="Snap every frame between start and end", default=False)
+    frame_start: IntProperty(name="Start", description="First frame, scene start if left at -1", default=-1)
+    frame_end: IntProperty(name="End", description="Last frame, scene end if left at -1", default=-1)
+    keyframe: BoolProperty(name="Keyframe", default=True)
+    tolerance: FloatProperty(
+        name="Tolerance", description="Drop keys that linear interpolation gets within this of, 0 keys every frame",
+        default=0.0, min=0.0, precision=5,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.active_object.type == 'ARMATURE'
+
+    def execute(self, context):
+        return script("Snap FK IK.py").A_rig_OT_snap_fk_ik.execute(self, context)
+
+
+class A_PT_rigui(bpy.types.Panel):
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Item'
+    bl_label = "A Rig UI"
+    bl_idname = "a_PT_rigui"
+
+    @classmethod
+    def poll(cls, context):
+        return rig_ui.is_rig(context.active_object)
+
+    def draw(self, context):
+        script("pivot demo.py").A_PT_rigui.draw(self, context)
+
+
+##########################
+# Generators, one operator per script function
+##########################
+
+class _ScriptOperator:
+    """Runs function from script_file with arguments(), the script is only imported here"""
+    bl_options = {'REGISTER', 'UNDO'}
+    script_file = None
+    function = None
+    # The function returns None when it had nothing to work on, the ones that always return None turn this off
+    none_is_failure = True
+    # Generators named in recipe.GENERATORS get recorded in the rig recipe so "Rebuild rig" can redo them
+    recipe_generator = None
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == 'ARMATURE'
+
+    def arguments(self, context):
+        return {}
+
+    def execute(self, context):
+        with instrument.run(self.bl_label):
+            if self.recipe_generator:
+                result = recipe.generate(context, self.recipe_generator, self.arguments(context))
+            else:
+                result = getattr(script(self.script_file), self.function)(**self.arguments(context))
+        if self.none_is_failure and result is None:
+            self.report({'WARNING'}, f"{self.bl_label} did nothing, see the console")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+
+class A_rig_OT_cloth_chains(_ScriptOperator, bpy.types.Operator):
+    """Cloth sim, PHYS and FK bones for the selected ORG chains"""
+    bl_idname = "a_rig.cloth_chains"
+    bl_label = "Cloth Chains from ORG"
+    script_file = "Cloth chains from ORG.py"
+    function = 'setup_cloth_chain'
+    recipe_generator = 'cloth_chain'
+    group_by: EnumProperty(
+        name="Group by",
+        items=(('NAME', "Name", "Chains from the _NN naming"), ('CONNECTIVITY', "Parenting", "Chains from the parenting")),
+    )
+    merged: BoolProperty(name="Merged", description="Every chain in one physics object with one cloth sim")
+    sim_rows: IntProperty(name="Sim Rows", description="Cloth rows per chain, 0 for one per joint", default=0, min=0)
+
+    def arguments(self, context):
+        return {'group_by': self.group_by, 'merged': self.merged, 'sim_rows': self.sim_rows or None}
+
+
+class A_rig_OT_fk_ik_switch(_ScriptOperator, bpy.types.Operator):
+    """MCH_SWITCH / MCH_IK / MCH_FK chains for the selected ORG bones"""
+    bl_idname = "a_rig.fk_ik_switch"
+    bl_label = "FK IK Switch from ORG"
+    script_file = "Create FK IK switch from ORG.py"
+    function = 'create_fk_ik_switch'
+    recipe_generator = 'fk_ik_switch'
+    none_is_failure = False
+
+
+class A_rig_OT_rebuild_rig(bpy.types.Operator):
+    """Regenerate the chains whose ORG bones or settings changed since they were generated"""
+    bl_idname = "a_rig.rebuild_rig"
+    bl_label = "Rebuild Changed Chains"
+    bl_options = {'REGISTER', 'UNDO'}
+    force: BoolProperty(name="Everything", description="Regenerate every recorded chain, changed or not")
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == 'ARMATURE' and recipe.RECIPE_KEY in obj.data
+
+    def execute(self, context):
+        with instrument.run(self.bl_label):
+            summary = recipe.rebuild(context, self.force)
+        self.report({'INFO'}, f"{len(summary[recipe.CHANGED])} chains rebuilt, {len(summary[recipe.CLEAN])} up to date")
+        return {'FINISHED'}
+
+
+class A_rig_OT_copy_org_to_def(_ScriptOperator, bpy.types.Operator):
+    """Copy Transforms from every ORG bone to its DEF bone"""
+    bl_idname = "a_rig.copy_org_to_def"
+    bl_label = "Copy ORG Transforms to DEF"
+    script_file = "Copy ORG Transforms to DEF.py"
+    function = 'copy_org_transforms_to_def'
+    change_subtarget: BoolProperty(name="Retarget", description="Point existing constraints back at the ORG bone", default=True)
+    prune: BoolProperty(name="Prune", description="Remove constraints the rule no longer makes")
+
+    def arguments(self, context):
+        return {'change_subtarget': self.change_subtarget, 'prune': self.prune}
+
+
+class A_rig_OT_uppercase_bones(_ScriptOperator, bpy.types.Operator):
+    """Uppercase the bone names of the selected armatures, or every armature in the scene"""
+    bl_idname = "a_rig.uppercase_bones"
+    bl_label = "Uppercase Bone Names"
+    script_file = "Capitalize Bones.py"
+    function = 'make_bone_names_uppercase'
+    all_armatures: BoolProperty(name="All Armatures", description="Every armature in the scene instead of the selection")
+
+    def execute(self, context):
+        module = script(self.script_file)
+        func = module.make_all_armature_bones_uppercase if self.all_armatures else module.make_bone_names_uppercase
+        with instrument.run(self.bl_label):
+            result = func()
+        if result is None:
+            self.report({'WARNING'}, "No armatures")
+            return {'CANCELLED'}
+        _plans, problems = result
+        if problems:
+            self.report({'ERROR'}, f"{len(problems)} collisions, nothing renamed")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+
+class A_rig_OT_bake_phys_to_fk(_ScriptOperator, bpy.types.Operator):
+    """Key the simulated rotation onto the FK bones and mute the sim"""
+    bl_idname = "a_rig.bake_phys_to_fk"
+    bl_label = "Bake PHYS to FK"
+    script_file = "Bake PHYS to FK.py"
+    function = 'bake_phys_to_fk'
+    tolerance: FloatProperty(name="Tolerance", default=0.0005, min=0.0, precision=5)
+    mute: BoolProperty(name="Mute Sim", default=True)
+
+    def arguments(self, context):
+        return {'tolerance': self.tolerance, 'mute': self.mute}
+
+
+class A_rig_OT_apply_property_spec(_ScriptOperator, bpy.types.Operator):
+    """Add or update the custom properties of the PROPERTIES bone from a spec file"""
+    bl_idname = "a_rig.apply_property_spec"
+    bl_label = "Apply Property Spec"
+    script_file = "Batch custom properties.py"
+    function = 'apply_property_spec'
+    filepath: StringProperty(name="Spec", description=".json or .py property spec", subtype='FILE_PATH')
+    properties_bone: StringProperty(name="Properties Bone", default=rig_ui.PROPERTIES_BONE)
+    dry_run: BoolProperty(name="Dry Run")
+    prune: BoolProperty(name="Prune")
+
+    def arguments(self, context):
+        return {
+            'armature_name': context.active_object.name,
+            'properties_bone_name': self.properties_bone,
+            'spec': bpy.path.abspath(self.filepath),
+            'dry_run': self.dry_run,
+            'prune': self.prune,
+        }
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
+class A_rig_OT_audit_drivers(_ScriptOperator, bpy.types.Operator):
+    """List the drivers of the rig slowest first, optionally rewrite python drivers"""
+    bl_idname = "a_rig.audit_drivers"
+    bl_label = "Audit Drivers"
+    script_file = "Audit drivers.py"
+    function = 'audit_drivers'
+    rewrite: BoolProperty(name="Rewrite")
+
+    def arguments(self, context):
+        return {'rewrite': self.rewrite}
+
+
+class A_rig_OT_analyze_dependencies(_ScriptOperator, bpy.types.Operator):
+    """Log cycles, cross object dependencies and the longest chains of the rig"""
+    bl_idname = "a_rig.analyze_dependencies"
+    bl_label = "Analyze Dependencies"
+    script_file = "Analyze dependencies.py"
+    function = 'analyze_dependencies'
+
+
+class A_rig_OT_reload_scripts(bpy.types.Operator):
+    """Import the scripts that changed on disk again, the tools keep using the loaded ones until then"""
+    bl_idname = "a_rig.reload_scripts"
+    bl_label = "Reload Scripts"
+
+    def execute(self, context):
+        changed = reload_scripts()
+        self.report({'INFO'}, f"Reloaded {', '.join(changed)}" if changed else "No script changed")
+        return {'FINISHED'}
+
+
+class A_PT_rig_tools(bpy.types.Panel):
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Rig Tools'
+    bl_label = "Rig Tools"
+    bl_idname = "A_PT_rig_tools"
+
+    def draw(self, context):
+        col = self.layout.column(align=True)
+        col.label(text="Generate")
+        col.operator("a_rig.cloth_chains", icon='MOD_CLOTH')
+        col.operator("a_rig.fk_ik_switch", icon='CON_KINEMATIC')
+        col.operator("a_rig.copy_org_to_def", icon='CON_TRANSLIKE')
+        col.operator("a_rig.apply_property_spec", icon='PROPERTIES')
+        col.operator("a_rig.rebuild_rig", icon='FILE_REFRESH')
+        col.separator()
+        col.label(text="Fix up")
+        col.operator("a_rig.uppercase_bones", icon='SORTALPHA')
+        col.operator("a_rig.bake_phys_to_fk", icon='ACTION')
+        col.separator()
+        col.label(text="Inspect")
+        col.operator("a_rig.audit_drivers", icon='DRIVER')
+        col.operator("a_rig.analyze_dependencies", icon='NODETREE')
+        col.separator()
+        col.operator("a_rig.reload_scripts", icon='FILE_REFRESH')
+
+
+classes = (
+    A_rig_OT_reset_dynamic_pivot,
+    A_rig_OT_rebake_dynamic_pivot,
+    A_rig_OT_snap_fk_ik,
+    A_PT_rigui,
+    A_rig_OT_cloth_chains,
+    A_rig_OT_fk_ik_switch,
+    A_rig_OT_rebuild_rig,
+    A_rig_OT_copy_org_to_def,
+    A_rig_OT_uppercase_bones,
+    A_rig_OT_bake_phys_to_fk,
+    A_rig_OT_apply_property_spec,
+    A_rig_OT_audit_drivers,
+    A_rig_OT_analyze_dependencies,
+    A_rig_OT_reload_scripts,
+    A_PT_rig_tools,
+)
+
+
+def register():
+    with registry.session("addon", reload=False) as reg:
+        for handler_list, func in rig_ui.HANDLERS:
+            reg.add_handler(handler_list, func)
+        for cls in classes:
+            reg.register_class(cls)
+
+
+def unregister():
+    registry.get("addon").unregister()
+    _scripts.clear()
@@ -0,0 +1,321 @@
+"""
+Bake the cloth caches of a .blend in parallel background Blender processes
+
+    python -m rig_tools.bake_farm shot.blend --workers 32
+
+1. scan   one Blender process lists the cloth objects (the *_PHYSICS_OBJECT meshes from the cloth chain script)
+          and groups the ones that have to be baked together
+2. bake   the groups are spread over a pool of background Blender processes, each bakes its objects to disk
+3. merge  one last process points the cloth caches in the master file at the baked files and saves it
+
+Cloth objects only have to be baked together when one of them collides with another simulated object.
+Static or animated colliders are only read during a bake, so sharing one doesn't stop objects baking in parallel.
+
+The same file is run inside Blender for the scan/bake/merge steps, so it only imports bpy (and the rest of
+rig_tools) in those.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Files go in the same folder Blender uses for disk caches, //blendcache_<file name>/
+CACHE_INDEX = 0
+
+
+def cache_name(obj_name, modifier_name):
+    """Unique, file name safe point cache name for a cloth modifier"""
+    safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in f'{obj_name}_{modifier_name}')
+    return f'BAKE_{safe}'
+
+
+def cache_directory(blend_path, relative=True):
+    """Folder the caches of blend_path are baked into, blend relative or absolute"""
+    folder = f'blendcache_{os.path.splitext(os.path.basename(blend_path))[0]}'
+    if relative:
+        return f'//{folder}/'
+    return os.path.join(os.path.dirname(blend_path), folder) + os.sep
+
+
+##########################
+# Inside Blender
+##########################
+
+def cloth_modifiers(obj):
+    return [modifier for modifier in obj.modifiers if modifier.type == 'CLOTH']
+
+
+def scan_cloth_groups(scene):
+    """
+    Cloth objects of the scene split into groups that can be baked independently
+    A cloth that collides with another cloth object pulls them into the same group
+    """
+    cloth_objects = [obj for obj in scene.objects if obj.type == 'MESH' and cloth_modifiers(obj)]
+    cloth_names = {obj.name for obj in cloth_objects}
+    scene_colliders = [obj.name for obj in scene.objects if any(modifier.type == 'COLLISION' for modifier in obj.modifiers)]
+
+    # Union find over cloth objects that collide with each other
+    group_of = {name: name for name in cloth_names}
+
+    def find(name):
+        while group_of[name] != name:
+            group_of[name] = group_of[group_of[name]]
+            name = group_of[name]
+        return name
+
+    for obj in cloth_objects:
+        for modifier in cloth_modifiers(obj):
+            collision = modifier.collision_settings
+            if not collision.use_collision:
+                continue
+            if collision.collection is not None:
+                colliders = [other.name for other in collision.collection.all_objects]
+            else:
+                colliders = scene_colliders
+            for collider_name in colliders:
+                if collider_name in cloth_names and collider_name != obj.name:
+                    group_of[find(collider_name)] = find(obj.name)
+
+    groups = {}
+    for name in sorted(cloth_names):
+        groups.setdefault(find(name), []).append(name)
+    return list(groups.values())
+
+
+def bake_objects(scene, object_names, frame_start=None, frame_end=None):
+    """Bake the cloth caches of object_names to disk, returns a report per object"""
+    import bpy
+    from rig_tools import instrument
+
+    reports = []
+    for obj_name in object_names:
+        obj = scene.objects[obj_name]
+        for modifier in cloth_modifiers(obj):
+            cache = modifier.point_cache
+            started = time.perf_counter()
+            report = {'object': obj_name, 'modifier': modifier.name, 'cache': cache_name(obj_name, modifier.name)}
+            try:
+                cache.use_external = False
+                cache.use_disk_cache = True
+                cache.name = report['cache']
+                cache.index = CACHE_INDEX
+                if frame_start is not None:
+                    cache.frame_start = frame_start
+                if frame_end is not None:
+                    cache.frame_end = frame_end
+
+                with bpy.context.temp_override(scene=scene, active_object=obj, object=obj, point_cache=cache):
+                    instrument.ops('ptcache.free_bake')
+                    instrument.ops('ptcache.bake', bake=True)
+
+                report['frames'] = [cache.frame_start, cache.frame_end]
+                report['ok'] = cache.is_baked
+                if not cache.is_baked:
+                    report['error'] = "Bake finished but cache is not marked baked"
+            except Exception as e:
+                report['ok'] = False
+                report['error'] = str(e)
+            report['seconds'] = round(time.perf_counter() - started, 3)
+            reports.append(report)
+    return reports
+
+
+def merge_caches(scene, reports, blend_path, relative=True):
+    """Point the master files cloth caches at the baked files"""
+    merged = 0
+    directory = cache_directory(blend_path, relative)
+    for report in reports:
+        if not report.get('ok'):
+            continue
+        obj = scene.objects.get(report['object'])
+        modifier = obj.modifiers.get(report['modifier']) if obj else None
+        if modifier is None:
+            print(f"Could not find {report['object']} {report['modifier']} to merge")
+            continue
+        cache = modifier.point_cache
+        cache.use_disk_cache = True
+        cache.use_external = True
+        cache.filepath = directory
+        cache.name = report['cache']
+        cache.index = CACHE_INDEX
+        merged += 1
+    return merged
+
+
+def run_in_blender(argv):
+    """Entry point when this file is run with blender --background --python"""
+    import bpy
+
+    parser = argparse.ArgumentParser(prog='bake_farm (blender)')
+    parser.add_argument('--mode', choices=('scan', 'bake', 'merge'), required=True)
+    parser.add_argument('--result', required=True, help="JSON file to write the result to")
+    parser.add_argument('--objects', nargs='*', default=[])
+    parser.add_argument('--reports', help="JSON file with the bake reports to merge")
+    parser.add_argument('--output', help="Save the merged file here instead of over the master file")
+    parser.add_argument('--frame-start', type=int)
+    parser.add_argument('--frame-end', type=int)
+    args = parser.parse_args(argv)
+
+    # rig_tools is the folder this file is in
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if package_parent not in sys.path:
+        sys.path.append(package_parent)
+    from rig_tools import instrument
+
+    scene = bpy.context.scene
+    blend_path = bpy.data.filepath
+
+    if args.mode == 'scan':
+        result = {'groups': scan_cloth_groups(scene)}
+    elif args.mode == 'bake':
+        result = {'reports': bake_objects(scene, args.objects, args.frame_start, args.frame_end)}
+    else:
+        with open(args.reports) as f:
+            reports = json.load(f)
+        # Saving somewhere else would break the blend relative path to the caches
+        result = {'merged': merge_caches(scene, reports, blend_path, relative=not args.output)}
+        if args.output:
+            instrument.ops('wm.save_as_mainfile', filepath=args.output, relative_remap=False)
+        else:
+            instrument.ops('wm.save_mainfile')
+
+    with open(args.result, 'w') as f:
+        json.dump(result, f, indent=2)
+
+
+##########################
+# Outside Blender
+##########################
+
+def run_blender(blender, blend_path, mode, work_dir, extra_args=(), autoexec=False):
+    """Run one background Blender step, returns (result dict or None, error text)"""
+    result_path = os.path.join(work_dir, f'{mode}_{uuid.uuid4().hex}.json')
+    command = [
+        blender, '--background', '--factory-startup',
+        # Rigs with python drivers need auto run to deform the same way they do in the UI
+        '--enable-autoexec' if autoexec else '--disable-autoexec',
+        blend_path,
+        '--python-exit-code', '1',
+        '--python', os.path.abspath(__file__),
+        '--', '--mode', mode, '--result', result_path, *extra_args,
+    ]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0 or not os.path.exists(result_path):
+        return None, (process.stderr or process.stdout)[-2000:]
+    with open(result_path) as f:
+        return json.load(f), ''
+
+
+def bake_farm(blend_path, blender='blender', workers=None, output=None, frame_start=None, frame_end=None, report_path=None, autoexec=False):
+    """
+    Scan, bake in parallel and merge, returns the list of bake reports
+    None when the scan or the merge failed, the master file wasnt updated then
+    The temporary work folder is removed afterwards unless something failed, its logs and results are kept for a look
+    """
+    blend_path = os.path.abspath(blend_path)
+    work_dir = tempfile.mkdtemp(prefix='bake_farm_')
+    reports = None
+    try:
+        reports = _bake_farm(blend_path, blender, workers, output, frame_start, frame_end, report_path, autoexec, work_dir)
+    finally:
+        if reports is not None and all(report.get('ok') for report in reports):
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"Kept {work_dir} for inspection")
+    return reports
+
+
+def _bake_farm(blend_path, blender, workers, output, frame_start, frame_end, report_path, autoexec, work_dir):
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    scan, error = run_blender(blender, blend_path, 'scan', work_dir, autoexec=autoexec)
+    if scan is None:
+        print(f"Error: scanning {blend_path} failed\n{error}")
+        return None
+
+    groups = scan['groups']
+    print(f"Found {sum(len(group) for group in groups)} cloth objects in {len(groups)} independent groups, baking with {workers} workers")
+
+    frame_args = []
+    if frame_start is not None:
+        frame_args += ['--frame-start', str(frame_start)]
+    if frame_end is not None:
+        frame_args += ['--frame-end', str(frame_end)]
+
+    reports = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {
+            pool.submit(run_blender, blender, blend_path, 'bake', work_dir, ['--objects', *group, *frame_args], autoexec): group
+            for group in groups
+        }
+        for done, job in enumerate(as_completed(jobs), 1):
+            group = jobs[job]
+            result, error = job.result()
+            if result is None:
+                failed += 1
+                reports.extend({'object': name, 'ok': False, 'error': error} for name in group)
+                print(f"[{done}/{len(groups)}] FAILED {', '.join(group)}\n{error}")
+                continue
+            for report in result['reports']:
+                reports.append(report)
+                status = 'baked' if report['ok'] else f"FAILED: {report.get('error')}"
+                failed += 0 if report['ok'] else 1
+                print(f"[{done}/{len(groups)}] {report['object']} {status} ({report['seconds']}s)")
+
+    reports_path = os.path.join(work_dir, 'reports.json')
+    with open(reports_path, 'w') as f:
+        json.dump(reports, f, indent=2)
+
+    merge_args = ['--reports', reports_path]
+    if output:
+        merge_args += ['--output', os.path.abspath(output)]
+    merge, error = run_blender(blender, blend_path, 'merge', work_dir, merge_args, autoexec)
+    if merge is None:
+        print(f"Error: merging caches into {output or blend_path} failed\n{error}")
+    else:
+        print(f"Merged {merge['merged']} caches into {output or blend_path}")
+
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({
+                'blend': blend_path, 'seconds': round(time.perf_counter() - started, 3),
+                'merged': merge is not None, 'reports': reports,
+            }, f, indent=2)
+
+    print(f"Done in {time.perf_counter() - started:.1f}s, {failed} failed")
+    # The bakes are on disk but the master file doesnt point at them
+    return reports if merge is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake cloth caches in parallel background Blender processes")
+    parser.add_argument('blend', help="Master .blend file")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'), help="Blender executable")
+    parser.add_argument('--workers', type=int, default=None, help="Number of Blender processes, defaults to the core count")
+    parser.add_argument('--output', help="Save the merged file here instead of over the master file")
+    parser.add_argument('--frame-start', type=int)
+    parser.add_argument('--frame-end', type=int)
+    parser.add_argument('--report', help="Write a JSON report of every bake here")
+    parser.add_argument('--autoexec', action='store_true', help="Allow python drivers and scripts in the file to run")
+    args = parser.parse_args(argv)
+
+    reports = bake_farm(args.blend, args.blender, args.workers, args.output, args.frame_start, args.frame_end, args.report, args.autoexec)
+    if reports is None or not all(report.get('ok') for report in reports):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if '--' in sys.argv:
+        # Running inside Blender, everything after -- is ours
+        run_in_blender(sys.argv[sys.argv.index('--') + 1:])
+    else:
+        sys.exit(main())
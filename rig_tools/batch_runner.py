@@ -0,0 +1,327 @@
+"""
+Run one of the rig scripts over many .blend files in parallel background Blender processes
+
+    python -m rig_tools.batch_runner job.json characters/*.blend --workers 16 --reports reports/
+
+The job spec says what to run and on what, the selection the scripts normally take from the UI comes from patterns:
+
+    {
+        "script": "Cloth chains from ORG.py",
+        "function": "setup_cloth_chain",
+        "arguments": {"merged": true, "sim_rows": 8},
+        "armatures": ["*_RIG"],                 optional, every armature by default
+        "bones": ["ORG_HAIR_*", "ORG_CAPE_*"],  optional, selected before the function runs
+        "per_armature": true,                   call once per armature (active + selected), false calls it once
+        "none_is_failure": true,                false for functions that always return None
+        "save": true
+    }
+
+"{armature}" anywhere in the arguments is replaced by the name of the armature being worked on, for functions like
+add_properties_to_properties_bone that take the name instead of using the active object.
+File lists can also be read from a text file with @files.txt, one path per line.
+
+The rig functions report problems by logging an error and returning, a file fails when the function logged an ERROR,
+returned False, or returned None (unless none_is_failure is false). Failed files are not saved.
+
+Every file gets its own Blender process from the pool, so a crash or a bad file only fails that file. Files are saved
+to a temporary file next to the original and moved over it once the save finished, an interrupted run never
+leaves a half written .blend behind. Each file gets a JSON report with the per-phase timings from instrument,
+and a summary of the whole run is written next to them.
+
+Like bake_farm.py the same file runs inside Blender, it only imports bpy (and the rest of rig_tools) in there.
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def load_job(path):
+    with open(path) as f:
+        job = json.load(f)
+    for key in ('script', 'function'):
+        if key not in job:
+            raise ValueError(f"Job {path} has no '{key}'")
+    job.setdefault('arguments', {})
+    job.setdefault('armatures', ['*'])
+    job.setdefault('bones', [])
+    job.setdefault('per_armature', True)
+    job.setdefault('none_is_failure', True)
+    job.setdefault('save', True)
+    return job
+
+
+def expand_files(paths):
+    """Paths as given, @list.txt replaced by the paths listed in it (relative to the list), duplicates removed"""
+    files = []
+    for path in paths:
+        if path.startswith('@'):
+            list_dir = os.path.dirname(path[1:])
+            with open(path[1:]) as f:
+                files.extend(os.path.join(list_dir, line.strip()) for line in f if line.strip() and not line.startswith('#'))
+        else:
+            files.append(path)
+    unique = []
+    for path in files:
+        path = os.path.abspath(path)
+        if path not in unique:
+            unique.append(path)
+    return unique
+
+
+def matches(name, patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def report_path(report_dir, blend_path):
+    """
+    Folder and file name, character files are often all called rig.blend
+    A hash of the full path keeps char/rig.blend from two different trees apart
+    """
+    folder = os.path.basename(os.path.dirname(blend_path))
+    name = os.path.splitext(os.path.basename(blend_path))[0]
+    digest = hashlib.sha1(os.path.abspath(blend_path).encode()).hexdigest()[:8]
+    return os.path.join(report_dir, f'{folder}_{name}_{digest}.json')
+
+
+##########################
+# Inside Blender
+##########################
+
+def select_bones(armature, patterns):
+    """Select the bones matching patterns and nothing else, edit mode picks the selection up from the bones"""
+    selected = []
+    for bone in armature.data.bones:
+        select = matches(bone.name, patterns)
+        bone.select = bone.select_head = bone.select_tail = select
+        if select:
+            selected.append(bone.name)
+    return selected
+
+
+def make_active(context, objects):
+    for obj in context.view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    context.view_layer.objects.active = objects[0] if objects else None
+
+
+def save_atomic(blend_path):
+    """Save to a temporary file next to blend_path, then move it over the original"""
+    from rig_tools import instrument
+
+    directory = os.path.dirname(blend_path)
+    handle, temp_path = tempfile.mkstemp(prefix='.batch_', suffix='.blend', dir=directory)
+    os.close(handle)
+    try:
+        # copy keeps the open file pointing at the original, same folder keeps // paths valid
+        instrument.ops('wm.save_as_mainfile', filepath=temp_path, copy=True, relative_remap=False)
+        os.replace(temp_path, blend_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def job_arguments(arguments, armature_name):
+    """The job arguments with "{armature}" filled in"""
+    def fill(value):
+        if isinstance(value, str):
+            return value.replace('{armature}', armature_name)
+        if isinstance(value, list):
+            return [fill(item) for item in value]
+        if isinstance(value, dict):
+            return {key: fill(item) for key, item in value.items()}
+        return value
+    return fill(arguments)
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=lambda item: getattr(item, 'name', None) or repr(item)))
+
+
+def run_job(job, blend_path):
+    """Run the job on the open file, returns the report, the file is only saved if nothing failed"""
+    import bpy
+    from rig_tools import addon, instrument
+
+    context = bpy.context
+    report = {'blend': blend_path, 'script': job['script'], 'function': job['function'], 'armatures': [], 'failures': []}
+
+    with instrument.run(f"{job['script']}:{job['function']}"):
+        with instrument.phase("load script"):
+            func = getattr(addon.script(job['script']), job['function'])
+
+        if context.mode != 'OBJECT':
+            instrument.mode_set('OBJECT')
+
+        armatures = [obj for obj in context.scene.objects if obj.type == 'ARMATURE' and matches(obj.name, job['armatures'])]
+        if not armatures:
+            raise RuntimeError(f"No armatures matching {', '.join(job['armatures'])}")
+
+        runs = [[armature] for armature in armatures] if job['per_armature'] else [armatures]
+        for objects in runs:
+            make_active(context, objects)
+            selected = []
+            if job['bones']:
+                for armature in objects:
+                    selected.extend(select_bones(armature, job['bones']))
+            errors_before = len(instrument.errors())
+            with instrument.phase(objects[0].name):
+                result = func(**job_arguments(job['arguments'], objects[0].name))
+            errors = instrument.errors()[errors_before:]
+            if errors:
+                report['failures'].append(f"{objects[0].name}: {'; '.join(errors)}")
+            elif result is False or (result is None and job['none_is_failure']):
+                report['failures'].append(f"{objects[0].name}: {job['function']} returned {result}, nothing was done")
+            # Scripts leave edit or pose mode behind
+            if context.mode != 'OBJECT':
+                instrument.mode_set('OBJECT')
+            report['armatures'].append({
+                'objects': [obj.name for obj in objects],
+                'selected_bones': len(selected),
+                'result': _jsonable(result),
+            })
+
+        report['saved'] = job['save'] and not report['failures']
+        if report['saved']:
+            with instrument.phase("save"):
+                save_atomic(blend_path)
+
+    report['timings'] = instrument.report()
+    return report
+
+
+def run_in_blender(argv):
+    """Entry point when this file is run with blender --background --python"""
+    import bpy
+
+    parser = argparse.ArgumentParser(prog='batch_runner (blender)')
+    parser.add_argument('--job', required=True)
+    parser.add_argument('--result', required=True, help="JSON file to write the report to")
+    args = parser.parse_args(argv)
+
+    # rig_tools is the folder this file is in
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if package_parent not in sys.path:
+        sys.path.append(package_parent)
+
+    job = load_job(args.job)
+    blend_path = bpy.data.filepath
+    try:
+        report = run_job(job, blend_path)
+        report['ok'] = not report['failures']
+        if report['failures']:
+            report['error'] = "\n".join(report['failures'])
+    except Exception as e:
+        import traceback
+        report = {'blend': blend_path, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()}
+
+    with open(args.result, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+##########################
+# Outside Blender
+##########################
+
+def run_file(blender, job_path, blend_path, result_path, autoexec=False):
+    """One background Blender process for one file, returns the report"""
+    started = time.perf_counter()
+    command = [
+        blender, '--background', '--factory-startup',
+        '--enable-autoexec' if autoexec else '--disable-autoexec',
+        blend_path,
+        '--python-exit-code', '1',
+        '--python', os.path.abspath(__file__),
+        '--', '--job', job_path, '--result', result_path,
+    ]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if os.path.exists(result_path):
+        with open(result_path) as f:
+            report = json.load(f)
+    else:
+        report = {'blend': blend_path, 'ok': False, 'error': (process.stderr or process.stdout)[-2000:]}
+    if process.returncode != 0 and report.get('ok'):
+        report['ok'] = False
+        report['error'] = f"Blender exited with {process.returncode}"
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    with open(result_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def batch_run(job_path, files, blender='blender', workers=None, report_dir=None, autoexec=False, backup=False):
+    """Run the job over every file in parallel, returns the reports"""
+    job_path = os.path.abspath(job_path)
+    load_job(job_path)
+    files = expand_files(files)
+    workers = min(workers or os.cpu_count() or 1, len(files)) or 1
+    report_dir = os.path.abspath(report_dir or tempfile.mkdtemp(prefix='batch_runner_'))
+    os.makedirs(report_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    missing = [path for path in files if not os.path.exists(path)]
+    reports = [{'blend': path, 'ok': False, 'error': "File not found"} for path in missing]
+    files = [path for path in files if path not in missing]
+
+    if backup:
+        for path in files:
+            shutil.copy2(path, path + '1')
+
+    print(f"Running {os.path.basename(job_path)} on {len(files)} files with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {
+            pool.submit(run_file, blender, job_path, path, report_path(report_dir, path), autoexec): path
+            for path in files
+        }
+        for done, job in enumerate(as_completed(jobs), 1):
+            report = job.result()
+            reports.append(report)
+            error_lines = (report.get('error') or '').strip().splitlines()
+            status = 'ok' if report['ok'] else f"FAILED: {error_lines[-1] if error_lines else 'unknown error'}"
+            print(f"[{done}/{len(files)}] {os.path.basename(jobs[job])} {status} ({report['seconds']}s)")
+
+    failed = sum(1 for report in reports if not report['ok'])
+    summary = {
+        'job': job_path,
+        'workers': workers,
+        'seconds': round(time.perf_counter() - started, 3),
+        'failed': failed,
+        'files': [{'blend': report['blend'], 'ok': report['ok'], 'seconds': report.get('seconds')} for report in reports],
+    }
+    with open(os.path.join(report_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Done in {summary['seconds']:.1f}s, {failed} failed, reports in {report_dir}")
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a rig script over many .blend files in parallel background Blender processes")
+    parser.add_argument('job', help="Job spec .json")
+    parser.add_argument('files', nargs='+', help=".blend files, @list.txt for a file with one path per line")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'), help="Blender executable")
+    parser.add_argument('--workers', type=int, default=None, help="Number of Blender processes, defaults to the core count")
+    parser.add_argument('--reports', help="Folder for the per file JSON reports, a temporary folder by default")
+    parser.add_argument('--backup', action='store_true', help="Copy every file to .blend1 before running")
+    parser.add_argument('--autoexec', action='store_true', help="Allow python drivers and scripts in the files to run")
+    args = parser.parse_args(argv)
+
+    reports = batch_run(args.job, args.files, args.blender, args.workers, args.reports, args.autoexec, args.backup)
+    return 0 if all(report['ok'] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    if '--' in sys.argv:
+        # Running inside Blender, everything after -- is ours
+        run_in_blender(sys.argv[sys.argv.index('--') + 1:])
+    else:
+        sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Parent/child graph over a set of bones
+
+Works with anything that has .name and .parent (edit bones, bones, pose bones).
+The children index is built in one pass and every walk is iterative, so long chains
+(hair, rope) don't hit the recursion limit and many strands at once stay linear.
+"""
+from collections import deque, namedtuple
+
+from rig_tools import naming
+
+# bones: parent to child order, root: first bone, parent: name of the bone the chain hangs off (None if outside the set)
+Chain = namedtuple('Chain', 'key bones root parent')
+
+
+class ChainGraph:
+    """
+    graph = ChainGraph(bones)
+    graph.roots     bones whose parent is not part of the set
+    graph.forks     {bone name: [child names]} for every bone with more than one child in the set
+    graph.ordered() every bone, parents before children
+    """
+
+    def __init__(self, bones):
+        self.bones = {}
+        self.parents = {}
+        self.children = {}
+        for bone in bones:
+            self.bones[bone.name] = bone
+            self.children[bone.name] = []
+
+        self.roots = []
+        for name, bone in self.bones.items():
+            parent = bone.parent
+            if parent is not None and parent.name in self.bones:
+                self.parents[name] = parent.name
+                self.children[parent.name].append(name)
+            else:
+                self.parents[name] = None
+                self.roots.append(name)
+
+        # Sorted so branches and roots always come out in the same order
+        self.roots.sort()
+        for child_names in self.children.values():
+            child_names.sort()
+
+        self.forks = {name: child_names for name, child_names in self.children.items() if len(child_names) > 1}
+
+    def __len__(self):
+        return len(self.bones)
+
+    @property
+    def is_linear(self):
+        """Single root and no forks, i.e. a plain chain"""
+        return len(self.roots) == 1 and not self.forks
+
+    def walk(self, root_name):
+        """Names below root_name (inclusive), depth first, parents before children"""
+        order = []
+        stack = [root_name]
+        while stack:
+            name = stack.pop()
+            order.append(name)
+            # Reversed so the first child is visited first
+            stack.extend(reversed(self.children[name]))
+        return order
+
+    def ordered(self):
+        """Every bone parent to child, one root after another"""
+        return [self.bones[name] for root in self.roots for name in self.walk(root)]
+
+    def components(self):
+        """Lists of bones that are connected through parenting, one per root"""
+        return [[self.bones[name] for name in self.walk(root)] for root in self.roots]
+
+    def linear_chains(self):
+        """
+        Split the graph into unbranched chains
+        At a fork the chain carries on through the first child, the other children start new chains
+        """
+        chains = []
+        starts = deque(self.roots)
+        while starts:
+            name = starts.popleft()
+            chain = [name]
+            while self.children[name]:
+                first_child, *other_children = self.children[name]
+                starts.extend(other_children)
+                chain.append(first_child)
+                name = first_child
+            chains.append([self.bones[name] for name in chain])
+        return chains
+
+
+def _chain_key(bone):
+    record = naming.parse(bone.name)
+    return record.chain if record is not None else bone.name
+
+
+def _make_chain(key, bones):
+    root = bones[0]
+    return Chain(key, bones, root, root.parent.name if root.parent else None)
+
+
+def chains_by_name(bones):
+    """
+    Group bones by the chain key from their _NN naming and sort each group parent to child
+    Returns (chains, problems) where problems maps chain key -> description for groups that
+    aren't a single unbranched chain, those are left out of chains
+    """
+    groups = {}
+    for bone in bones:
+        groups.setdefault(_chain_key(bone), []).append(bone)
+
+    chains = []
+    problems = {}
+    for key, group in groups.items():
+        graph = ChainGraph(group)
+        if len(graph.roots) > 1:
+            problems[key] = f"{len(graph.roots)} separate roots: {', '.join(graph.roots)}"
+        elif graph.forks:
+            problems[key] = "forks at " + ', '.join(f"{name} -> {children}" for name, children in graph.forks.items())
+        else:
+            chains.append(_make_chain(key, graph.ordered()))
+    return chains, problems
+
+
+def chains_by_connectivity(bones):
+    """
+    Find chains by following parent links, ignoring names
+    Forked groups are split into unbranched chains, each chain is keyed by the naming of its first bone
+    Returns (chains, problems) like chains_by_name, problems lists forks that were split and key collisions
+    """
+    graph = ChainGraph(bones)
+    chains = []
+    problems = {}
+    used_keys = set()
+
+    for fork_name, child_names in graph.forks.items():
+        problems[_chain_key(graph.bones[fork_name])] = f"split at fork {fork_name} -> {child_names}"
+
+    for chain_bones in graph.linear_chains():
+        key = _chain_key(chain_bones[0])
+        if key in used_keys:
+            problems[key] = f"more than one chain would be called {key}, skipped the one starting at {chain_bones[0].name}"
+            continue
+        used_keys.add(key)
+        chains.append(_make_chain(key, chain_bones))
+    return chains, problems
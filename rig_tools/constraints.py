@@ -0,0 +1,144 @@
+"""
+Constraint reconciler
+
+Rules declare which layer copies which:
+
+    rules = [Rule('DEF', 'ORG'),                                   # DEF_* copies ORG_*
+             Rule('ORG', 'FK', name="Copy FK transform")]          # ORG_* copies FK_*
+
+plan() indexes the constraints already on the armature in one pass over the pose bones and returns the smallest
+list of changes that makes the rig match the rules, apply() carries them out. Running both again straight after
+gives an empty plan.
+
+A constraint belongs to a rule when it has the rules type, and the rules name if the rule has one.
+    ADD       the owner has no such constraint but the target bone exists
+    RETARGET  it has one pointing somewhere else (only with retarget=True)
+    UPDATE    it points at the right bone but settings differ
+    REMOVE    extra copies of it, or with prune=True ones whose target bone is gone
+Owners whose target bone doesnt exist are never given a constraint.
+"""
+from collections import namedtuple
+
+from . import naming
+
+ADD = 'ADD'
+RETARGET = 'RETARGET'
+UPDATE = 'UPDATE'
+REMOVE = 'REMOVE'
+
+
+class Rule(namedtuple('Rule', 'owner_prefix target_prefix type name settings')):
+    """owner_prefix bones get a type constraint targeting the target_prefix bone of the same name"""
+    __slots__ = ()
+
+    def __new__(cls, owner_prefix, target_prefix, type='COPY_TRANSFORMS', name=None, settings=None):
+        return super().__new__(cls, owner_prefix, target_prefix, type, name, settings or {})
+
+    def manages(self, constraint):
+        return constraint.type == self.type and (self.name is None or constraint.name == self.name)
+
+
+# owner and target are bone names, constraint is the constraint name for everything but ADD
+Change = namedtuple('Change', 'action owner constraint target detail rule')
+
+
+def _differing_settings(constraint, settings):
+    return {key: value for key, value in settings.items() if getattr(constraint, key) != value}
+
+
+def plan(armature, rules, retarget=True, prune=False):
+    """Changes needed to make armature match rules, nothing is modified"""
+    pose_bones = armature.pose.bones
+    prefixes = {rule.owner_prefix for rule in rules} | {rule.target_prefix for rule in rules}
+    index = naming.BoneNameIndex(pose_bones.keys(), prefixes=prefixes)
+
+    rules_by_owner = {}
+    for rule in rules:
+        rules_by_owner.setdefault(rule.owner_prefix, []).append(rule)
+
+    changes = []
+    for owner_name, record in index.records.items():
+        owner_rules = rules_by_owner.get(record.prefix)
+        if not owner_rules:
+            continue
+
+        constraints = list(pose_bones[owner_name].constraints)
+        for rule in owner_rules:
+            target_name = index.partner(owner_name, rule.target_prefix)
+            managed = [constraint for constraint in constraints if rule.manages(constraint)]
+
+            if target_name is None:
+                if prune:
+                    changes.extend(
+                        Change(REMOVE, owner_name, constraint.name, constraint.subtarget, "target bone missing", rule)
+                        for constraint in managed
+                        if constraint.subtarget and constraint.subtarget not in pose_bones
+                    )
+                continue
+
+            correct = [c for c in managed if c.target == armature and c.subtarget == target_name]
+            if correct:
+                keep = correct[0]
+                settings = _differing_settings(keep, rule.settings)
+                if settings:
+                    changes.append(Change(UPDATE, owner_name, keep.name, target_name, settings, rule))
+            elif managed and retarget:
+                keep = managed[0]
+                changes.append(Change(RETARGET, owner_name, keep.name, target_name, keep.subtarget, rule))
+            elif managed:
+                # Left pointing elsewhere on purpose, dont stack another one on top
+                continue
+            else:
+                changes.append(Change(ADD, owner_name, rule.name, target_name, None, rule))
+                continue
+
+            # Extra copies targeting the same bone
+            changes.extend(
+                Change(REMOVE, owner_name, constraint.name, target_name, "duplicate", rule)
+                for constraint in correct if constraint is not keep
+            )
+
+    return changes
+
+
+def apply(armature, changes):
+    """Carry out a plan from plan()"""
+    pose_bones = armature.pose.bones
+    for change in changes:
+        pose_bone = pose_bones[change.owner]
+        rule = change.rule
+
+        if change.action == REMOVE:
+            pose_bone.constraints.remove(pose_bone.constraints[change.constraint])
+            continue
+
+        if change.action == ADD:
+            constraint = pose_bone.constraints.new(rule.type)
+            if rule.name:
+                constraint.name = rule.name
+        else:
+            constraint = pose_bone.constraints[change.constraint]
+
+        constraint.target = armature
+        constraint.subtarget = change.target
+        for key, value in rule.settings.items():
+            setattr(constraint, key, value)
+
+
+def report(changes, dry_run=False):
+    verb = "Would" if dry_run else "Did"
+    lines = []
+    for change in changes:
+        if change.action == ADD:
+            lines.append(f"ADD      {change.owner} -> {change.target}")
+        elif change.action == RETARGET:
+            lines.append(f"RETARGET {change.owner} '{change.constraint}' {change.detail} -> {change.target}")
+        elif change.action == UPDATE:
+            lines.append(f"UPDATE   {change.owner} '{change.constraint}' {change.detail}")
+        else:
+            lines.append(f"REMOVE   {change.owner} '{change.constraint}' ({change.detail})")
+    counts = {action: sum(1 for change in changes if change.action == action) for action in (ADD, RETARGET, UPDATE, REMOVE)}
+    lines.append(
+        f"{verb} add {counts[ADD]}, retarget {counts[RETARGET]}, update {counts[UPDATE]}, remove {counts[REMOVE]}"
+    )
+    return lines
@@ -0,0 +1,325 @@
+"""
+Dependency graph of a rig: bone -> constraint / parent / driver -> target
+
+Nodes are bones ('BONE', object, bone), whole objects ('OBJECT', object) and the final pose of an armature
+('POSE', object), which is what armature parenting and envelope Armature modifiers wait for. Armature modifiers
+deforming by vertex groups only wait for the bones with a group. An edge a -> b means a has to wait for b. Built from:
+
+    bone parents, bone constraints (every target and pole target), drivers on the armature and its data,
+    object constraints and parents, Armature modifiers
+
+and starting from the objects passed in, every object they point at is pulled in too, so a PHYS bone tracking a
+cloth mesh that has a vertex group for that same bone shows up as the cycle it is. The merged cloth mesh only
+has groups for the chain parents, which don't wait on the PHYS bones.
+
+analyze() gives cycles, edges that cross between objects, the longest dependency chains and the nodes most
+other nodes wait on.
+"""
+import re
+from collections import namedtuple
+
+Edge = namedtuple('Edge', 'source target kind')
+
+_bone_path = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]')
+
+
+def bone_node(obj, bone_name):
+    return ('BONE', obj.name, bone_name)
+
+
+def object_node(obj):
+    return ('OBJECT', obj.name)
+
+
+def pose_node(obj):
+    return ('POSE', obj.name)
+
+
+def label(node):
+    if node[0] == 'BONE':
+        return f"{node[1]}:{node[2]}"
+    if node[0] == 'POSE':
+        return f"{node[1]}:<pose>"
+    return node[1]
+
+
+def _target_node(target, subtarget):
+    if target is None:
+        return None
+    if target.type == 'ARMATURE' and subtarget and subtarget in target.pose.bones:
+        return bone_node(target, subtarget)
+    if target.type == 'ARMATURE':
+        return pose_node(target)
+    return object_node(target)
+
+
+def _constraint_targets(constraint):
+    """(target object, subtarget) pairs of a constraint, whatever kind it is"""
+    if constraint.type == 'ARMATURE':
+        return [(target.target, target.subtarget) for target in constraint.targets]
+
+    pairs = []
+    target = getattr(constraint, 'target', None)
+    if target is not None:
+        pairs.append((target, getattr(constraint, 'subtarget', '')))
+    pole = getattr(constraint, 'pole_target', None)
+    if pole is not None:
+        pairs.append((pole, getattr(constraint, 'pole_subtarget', '')))
+    return pairs
+
+
+def _driver_owner(obj, data_path):
+    """Node a driver on obj writes to, the bone for pose bone paths and the object otherwise"""
+    match = _bone_path.match(data_path)
+    if obj.type == 'ARMATURE' and match:
+        return bone_node(obj, match.group(1))
+    return object_node(obj)
+
+
+def _variable_sources(variable):
+    sources = []
+    for target in variable.targets:
+        id_block = target.id
+        if id_block is None or getattr(id_block, 'type', None) is None:
+            continue
+        if variable.type == 'SINGLE_PROP':
+            match = _bone_path.match(target.data_path)
+            sources.append(_target_node(id_block, match.group(1) if match else ''))
+        else:
+            sources.append(_target_node(id_block, target.bone_target))
+    return [source for source in sources if source is not None]
+
+
+def _armature_modifier_targets(obj, modifier):
+    """
+    Nodes an Armature modifier waits for, like Blender sets it up: with vertex groups only the bones that have a
+    group on obj, envelopes can be reached by any bone so those wait for the whole pose
+    """
+    armature = modifier.object
+    targets = []
+    if modifier.use_bone_envelopes:
+        targets.append(pose_node(armature))
+    elif modifier.use_vertex_groups:
+        pose_bones = armature.pose.bones
+        targets.extend(bone_node(armature, group.name) for group in obj.vertex_groups if group.name in pose_bones)
+    return targets
+
+
+def _object_edges(obj):
+    edges = []
+    node = object_node(obj)
+
+    if obj.parent is not None:
+        if obj.parent_type == 'BONE':
+            edges.append(Edge(node, _target_node(obj.parent, obj.parent_bone), 'parent'))
+        elif obj.parent.type == 'ARMATURE' and obj.parent_type == 'ARMATURE':
+            edges.append(Edge(node, pose_node(obj.parent), 'parent'))
+        else:
+            edges.append(Edge(node, object_node(obj.parent), 'parent'))
+
+    for constraint in obj.constraints:
+        if not constraint.enabled:
+            continue
+        for target, subtarget in _constraint_targets(constraint):
+            target_node = _target_node(target, subtarget)
+            if target_node is not None:
+                edges.append(Edge(node, target_node, f'constraint {constraint.type}'))
+
+    for modifier in getattr(obj, 'modifiers', ()):
+        if modifier.type == 'ARMATURE' and modifier.object is not None and modifier.show_viewport:
+            edges.extend(Edge(node, target_node, 'modifier ARMATURE') for target_node in _armature_modifier_targets(obj, modifier))
+
+    if obj.type == 'ARMATURE':
+        pose = pose_node(obj)
+        edges.append(Edge(node, pose, 'pose'))
+        for pose_bone in obj.pose.bones:
+            bone = bone_node(obj, pose_bone.name)
+            edges.append(Edge(pose, bone, 'pose'))
+            if pose_bone.parent is not None:
+                edges.append(Edge(bone, bone_node(obj, pose_bone.parent.name), 'parent'))
+            for constraint in pose_bone.constraints:
+                if not constraint.enabled:
+                    continue
+                for target, subtarget in _constraint_targets(constraint):
+                    target_node = _target_node(target, subtarget)
+                    if target_node is not None and target_node != bone:
+                        edges.append(Edge(bone, target_node, f'constraint {constraint.type}'))
+
+    for id_block in (obj, obj.data):
+        animation_data = getattr(id_block, 'animation_data', None)
+        if animation_data is None:
+            continue
+        for fcurve in animation_data.drivers:
+            owner = _driver_owner(obj, fcurve.data_path) if id_block is obj else object_node(obj)
+            for variable in fcurve.driver.variables:
+                for source in _variable_sources(variable):
+                    if source != owner:
+                        edges.append(Edge(owner, source, 'driver'))
+
+    return edges
+
+
+def build(objects):
+    """Edges of objects and every object they depend on, one pass per object"""
+    import bpy
+
+    pending = list(objects)
+    seen = set()
+    edges = []
+    while pending:
+        obj = pending.pop()
+        if obj.name in seen:
+            continue
+        seen.add(obj.name)
+
+        for edge in _object_edges(obj):
+            edges.append(edge)
+            if edge.target[1] not in seen:
+                target = bpy.data.objects.get(edge.target[1])
+                if target is not None:
+                    pending.append(target)
+    return edges
+
+
+def _adjacency(edges):
+    graph = {}
+    for edge in edges:
+        graph.setdefault(edge.source, []).append(edge.target)
+        graph.setdefault(edge.target, [])
+    return graph
+
+
+def strongly_connected(graph):
+    """Tarjan without recursion, returns the components in reverse topological order (dependencies first)"""
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for start in graph:
+        if start in index:
+            continue
+        work = [(start, iter(graph[start]))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = low[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(graph[neighbour])))
+                    advanced = True
+                    break
+                if neighbour in on_stack:
+                    low[node] = min(low[node], index[neighbour])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def analyze(edges, top=10):
+    """
+    Report dict:
+        cycles        lists of nodes that depend on each other
+        cross_object  edges from one object to another, counted by kind
+        longest       the longest dependency chains, deepest first
+        fan_in        nodes with the most direct dependents
+    """
+    graph = _adjacency(edges)
+    components = strongly_connected(graph)
+
+    cycles = []
+    component_of = {}
+    for i, component in enumerate(components):
+        for node in component:
+            component_of[node] = i
+        if len(component) > 1 or component[0] in graph[component[0]]:
+            cycles.append(sorted(component))
+
+    # Longest chain through the condensed graph, components come dependencies first so one pass is enough
+    depth = {}
+    next_node = {}
+    for component in components:
+        for node in component:
+            best = 0
+            best_next = None
+            for target in graph[node]:
+                if component_of[target] == component_of[node]:
+                    continue
+                if depth[target] + 1 > best:
+                    best = depth[target] + 1
+                    best_next = target
+            depth[node] = best
+            next_node[node] = best_next
+
+    longest = []
+    used = set()
+    for node in sorted(depth, key=depth.get, reverse=True):
+        if len(longest) >= top or depth[node] == 0:
+            break
+        if node in used:
+            continue
+        chain = [node]
+        while next_node[chain[-1]] is not None:
+            chain.append(next_node[chain[-1]])
+        used.update(chain)
+        longest.append(chain)
+
+    dependents = {}
+    for edge in edges:
+        if edge.target[0] != 'POSE' and edge.kind != 'pose':
+            dependents.setdefault(edge.target, set()).add(edge.source)
+    fan_in = sorted(dependents.items(), key=lambda item: len(item[1]), reverse=True)[:top]
+
+    cross_object = {}
+    for edge in edges:
+        if edge.source[1] != edge.target[1]:
+            key = (edge.source[1], edge.target[1], edge.kind)
+            cross_object[key] = cross_object.get(key, 0) + 1
+
+    return {
+        'nodes': len(graph),
+        'edges': len(edges),
+        'cycles': cycles,
+        'cross_object': cross_object,
+        'longest': longest,
+        'fan_in': [(node, len(sources)) for node, sources in fan_in],
+    }
+
+
+def to_json(result):
+    """analyze() output with readable labels, ready for json.dump"""
+    return {
+        'nodes': result['nodes'],
+        'edges': result['edges'],
+        'cycles': [[label(node) for node in cycle] for cycle in result['cycles']],
+        'cross_object': [
+            {'from': source, 'to': target, 'kind': kind, 'count': count}
+            for (source, target, kind), count in result['cross_object'].items()
+        ],
+        'longest': [[label(node) for node in chain] for chain in result['longest']],
+        'fan_in': [{'node': label(node), 'dependents': count} for node, count in result['fan_in']],
+    }
@@ -0,0 +1,311 @@
+"""
+Driver audit
+
+Every driver is put in one of three buckets:
+    NATIVE   AVERAGE/SUM/MIN/MAX, no expression at all
+    SIMPLE   scripted, but Blender's simple expression evaluator handles it, no Python and works with auto run off
+    PYTHON   scripted and needs the Python interpreter, slow and dead on the farm when auto run is disabled
+
+rewrite_driver turns PYTHON drivers into SIMPLE ones where it can:
+    math.sin(var)                                -> sin(var)
+    bpy.data.objects["RIG"].pose.bones["P"]["x"] -> a new single property variable
+and a scripted driver that ends up being just one variable becomes a plain AVERAGE driver.
+"""
+import ast
+import time
+
+NATIVE = 'NATIVE'
+SIMPLE = 'SIMPLE'
+PYTHON = 'PYTHON'
+
+# Functions the simple expression evaluator knows about
+SIMPLE_FUNCTIONS = {
+    'min', 'max', 'radians', 'degrees', 'abs', 'fabs', 'floor', 'ceil', 'trunc', 'round', 'int',
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2', 'exp', 'log', 'sqrt', 'pow', 'fmod',
+    'sign', 'clamp', 'lerp', 'smoothstep',
+}
+
+# bpy.data collections a driver target can point at, collection name -> id_type
+ID_TYPES = {
+    'objects': 'OBJECT', 'armatures': 'ARMATURE', 'meshes': 'MESH', 'materials': 'MATERIAL',
+    'scenes': 'SCENE', 'shape_keys': 'KEY', 'node_groups': 'NODETREE', 'collections': 'COLLECTION',
+    'actions': 'ACTION', 'cameras': 'CAMERA', 'lights': 'LIGHT', 'worlds': 'WORLD', 'texts': 'TEXT',
+}
+
+
+def classify(driver):
+    if driver.type != 'SCRIPTED':
+        return NATIVE
+    if driver.is_simple_expression:
+        return SIMPLE
+    return PYTHON
+
+
+def owners(armature, include_children=True):
+    """IDs whose drivers belong to the rig: the armature object, its data and optionally the shape keys of its meshes"""
+    ids = [armature, armature.data]
+    if include_children:
+        for child in armature.children_recursive:
+            ids.append(child)
+            if child.type == 'MESH' and child.data.shape_keys is not None:
+                ids.append(child.data.shape_keys)
+    return ids
+
+
+def _target_value(target):
+    if target.id is None:
+        return None
+    try:
+        return target.id.path_resolve(target.data_path) if target.data_path else target.id
+    except ValueError:
+        return None
+
+
+def python_allowed():
+    """Python drivers can be evaluated: auto run is on and wasnt blocked for this file"""
+    import bpy
+
+    return bpy.context.preferences.filepaths.use_scripts_auto_execute and not bpy.app.autoexec_fail
+
+
+def measure(driver, repeat=50, evaluate_python=False):
+    """
+    Rough cost of one evaluation in microseconds
+    Reads every SINGLE_PROP target like the driver does. With evaluate_python PYTHON drivers also get their expression
+    evaluated against bpy.app.driver_namespace, which is where the time goes for those. That runs Python from the file,
+    so it is off by default, otherwise only the target reads are timed
+    """
+    import bpy
+
+    if repeat < 1:
+        return 0.0
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        values = {}
+        for variable in driver.variables:
+            if variable.type == 'SINGLE_PROP':
+                values[variable.name] = _target_value(variable.targets[0])
+    read_time = time.perf_counter() - started
+
+    eval_time = 0.0
+    if evaluate_python and classify(driver) == PYTHON:
+        namespace = dict(bpy.app.driver_namespace)
+        namespace.update({name: value for name, value in values.items() if value is not None})
+        try:
+            code = compile(driver.expression, '<driver>', 'eval')
+            started = time.perf_counter()
+            for _ in range(repeat):
+                eval(code, namespace)
+            eval_time = time.perf_counter() - started
+        except Exception:
+            eval_time = float('nan')
+
+    return (read_time + eval_time) / repeat * 1e6
+
+
+def audit(armature, include_children=True, repeat=50, evaluate_python=None):
+    """
+    One dict per driver, sorted slowest first
+    evaluate_python None times PYTHON expressions only when python_allowed(), True or False forces it
+    """
+    if evaluate_python is None:
+        evaluate_python = python_allowed()
+    rows = []
+    for owner in owners(armature, include_children):
+        animation_data = getattr(owner, 'animation_data', None)
+        if animation_data is None:
+            continue
+        for fcurve in animation_data.drivers:
+            driver = fcurve.driver
+            rows.append({
+                'owner': owner.name,
+                'data_path': fcurve.data_path,
+                'index': fcurve.array_index,
+                'type': driver.type,
+                'kind': classify(driver),
+                'expression': driver.expression if driver.type == 'SCRIPTED' else '',
+                'variables': len(driver.variables),
+                'targets': [_describe_target(variable) for variable in driver.variables],
+                'microseconds': round(measure(driver, repeat, evaluate_python), 3),
+                'evaluated': evaluate_python and classify(driver) == PYTHON,
+            })
+    rows.sort(key=lambda row: row['microseconds'] if row['microseconds'] == row['microseconds'] else float('inf'), reverse=True)
+    return rows
+
+
+def _describe_target(variable):
+    target = variable.targets[0]
+    name = target.id.name if target.id is not None else None
+    return f"{variable.name}: {variable.type} {name} {target.data_path}".rstrip()
+
+
+def shared_targets(rows):
+    """Targets read by more than one driver, handy to spot switches that could be one property"""
+    readers = {}
+    for row in rows:
+        for target in row['targets']:
+            readers.setdefault(target.split(': ', 1)[1], []).append(f"{row['owner']} {row['data_path']}")
+    return {target: drivers for target, drivers in readers.items() if len(drivers) > 1}
+
+
+class _ExpressionRewriter(ast.NodeTransformer):
+    """Strip math. prefixes and pull bpy.data lookups out into new variables"""
+
+    def __init__(self, existing_names):
+        self.new_variables = []
+        self.names = set(existing_names)
+
+    def _new_name(self):
+        index = len(self.new_variables)
+        while f'prop{index}' in self.names:
+            index += 1
+        name = f'prop{index}'
+        self.names.add(name)
+        return name
+
+    def visit_Attribute(self, node):
+        # math.sin -> sin
+        if isinstance(node.value, ast.Name) and node.value.id == 'math' and (node.attr in SIMPLE_FUNCTIONS or node.attr == 'pi'):
+            return ast.copy_location(ast.Name(id=node.attr, ctx=ast.Load()), node)
+        target = _bpy_data_target(node)
+        if target is not None:
+            return self._replace(node, target)
+        return self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        target = _bpy_data_target(node)
+        if target is not None:
+            return self._replace(node, target)
+        return self.generic_visit(node)
+
+    def _replace(self, node, target):
+        name = self._new_name()
+        self.new_variables.append((name, *target))
+        return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+
+
+def _bpy_data_target(node):
+    """
+    (id_type, id name, data path) for bpy.data.<collection>["name"]<rest>, None for anything else
+    The rest is turned back into an RNA path like pose.bones["PROPERTIES"]["SWITCH"]
+    """
+    parts = []
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        if isinstance(node, ast.Attribute):
+            parts.append(f'.{node.attr}')
+        else:
+            key = node.slice
+            if not isinstance(key, ast.Constant):
+                return None
+            parts.append(f'["{key.value}"]' if isinstance(key.value, str) else f'[{key.value}]')
+        node = node.value
+
+    if not (isinstance(node, ast.Name) and node.id == 'bpy'):
+        return None
+    parts.reverse()
+    # .data .<collection> ["name"] then the path
+    if len(parts) < 4 or parts[0] != '.data' or not parts[2].startswith('["'):
+        return None
+    id_type = ID_TYPES.get(parts[1][1:])
+    if id_type is None:
+        return None
+    id_name = parts[2][2:-2]
+    data_path = ''.join(parts[3:]).lstrip('.')
+    return id_type, id_name, data_path
+
+
+def rewrite_expression(expression, existing_names=()):
+    """
+    Returns (new expression, new variables) or None if it cant be parsed
+    new variables are (name, id_type, id name, data path) tuples
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        return None
+    rewriter = _ExpressionRewriter(existing_names)
+    tree = rewriter.visit(tree)
+    return ast.unparse(tree), rewriter.new_variables
+
+
+def rewrite_driver(driver, dry_run=False):
+    """
+    Try to turn a PYTHON driver into a SIMPLE or NATIVE one
+    Returns a description of what changed, or None if the driver was left alone
+    Pulled out bpy.data lookups are only used when their path resolves as an RNA path
+    Changes are rolled back if Blender still doesnt accept the result as a simple expression, dry_run makes the
+    same check and always rolls back, so it lists exactly what a real run would change
+    """
+    import bpy
+
+    if classify(driver) != PYTHON:
+        return None
+
+    result = rewrite_expression(driver.expression, [variable.name for variable in driver.variables])
+    if result is None:
+        return None
+    expression, new_variables = result
+
+    # Every id has to exist or the new variable would be a dead target
+    resolved = []
+    for name, id_type, id_name, data_path in new_variables:
+        collection = next(attr for attr, kind in ID_TYPES.items() if kind == id_type)
+        id_block = getattr(bpy.data, collection).get(id_name)
+        if id_block is None:
+            return None
+        # Python attribute access isnt always an RNA path, location.x has to be location[0] for a target
+        try:
+            id_block.path_resolve(data_path)
+        except ValueError:
+            return None
+        resolved.append((name, id_type, id_block, data_path))
+
+    if expression == driver.expression and not resolved:
+        return None
+
+    description = f"{driver.expression!r} -> {expression!r}"
+
+    # Only Blender can tell if it is a simple expression, so a dry run applies it too and puts everything back
+    old_expression = driver.expression
+    added = []
+    for name, id_type, id_block, data_path in resolved:
+        variable = driver.variables.new()
+        variable.name = name
+        variable.type = 'SINGLE_PROP'
+        variable.targets[0].id_type = id_type
+        variable.targets[0].id = id_block
+        variable.targets[0].data_path = data_path
+        added.append(variable)
+    driver.expression = expression
+
+    accepted = driver.is_simple_expression
+    # A lone variable doesnt need an expression at all
+    average = accepted and len(driver.variables) == 1 and expression.strip() == driver.variables[0].name
+
+    if dry_run or not accepted:
+        driver.expression = old_expression
+        for variable in added:
+            driver.variables.remove(variable)
+        if not accepted:
+            return None
+    elif average:
+        driver.type = 'AVERAGE'
+    if average:
+        description += " (AVERAGE)"
+
+    return description
+
+
+def rewrite_drivers(armature, include_children=True, dry_run=True):
+    """Rewrite every PYTHON driver of the rig that can be rewritten, returns a list of (owner, data path, change)"""
+    changes = []
+    for owner in owners(armature, include_children):
+        animation_data = getattr(owner, 'animation_data', None)
+        if animation_data is None:
+            continue
+        for fcurve in animation_data.drivers:
+            change = rewrite_driver(fcurve.driver, dry_run)
+            if change:
+                changes.append((owner.name, fcurve.data_path, change))
+    return changes
@@ -0,0 +1,214 @@
+"""
+FK <-> IK snapping for the MCH_FK / MCH_IK / MCH_SWITCH chains from "Create FK IK switch from ORG.py"
+
+Instead of frame_set + copy one bone at a time, the whole range is done in three steps:
+    sample   one frame_set per frame, every pose matrix read with a single foreach_get (pose_arrays)
+    solve    the snapped local matrices for all frames at once, as numpy stacks of 4x4 matrices
+    write    loc/rot/scale of every snapped bone written in bulk through keyframes.write_channels
+
+direction 'FK' snaps the FK chain onto the IK chain (then switches to FK), 'IK' does the opposite and also moves
+the IK target and pole bones of any IK constraint in the chain.
+
+The local matrices are worked out the way Blender does it for bones with the default inheritance,
+bones with inherit rotation / scale turned off wont snap exactly.
+"""
+import numpy as np
+
+from rig_tools import keyframes, naming, pose_arrays, property_spec
+
+SWITCH_BONE = 'PROPERTIES'
+# Value of the switch property for each mode, the Copy IK influence is driven by it
+SWITCH_VALUES = {'FK': 0.0, 'IK': 1.0}
+
+
+def switch_property(side):
+    return f'ARM_FK_IK_SWITCH.{side}'
+
+
+def switch_path(side, index_map=None):
+    """Driver path of the switch property, an array element if the switches are stored as an array"""
+    return property_spec.property_path(SWITCH_BONE, switch_property(side), index_map)
+
+
+def chain_pairs(armature, side, direction):
+    """(bone to move, bone to match, record) for every MCH bone pair on one side"""
+    dest_prefix, source_prefix = ('MCH_FK', 'MCH_IK') if direction == 'FK' else ('MCH_IK', 'MCH_FK')
+    index = naming.BoneNameIndex(armature.pose.bones.keys(), prefixes=(dest_prefix, source_prefix))
+
+    pairs = []
+    for record in index.records.values():
+        if record.prefix != dest_prefix or record.side != side:
+            continue
+        source = index.partner(record.name, source_prefix)
+        if source is not None:
+            pairs.append((record.name, source, record))
+    return pairs
+
+
+def _rest(armature, name):
+    return np.array(armature.data.bones[name].matrix_local, dtype=np.float64)
+
+
+def _ik_chain_root(pose_bone, constraint):
+    root = pose_bone
+    steps = constraint.chain_count - 1 if constraint.chain_count else None
+    while root.parent is not None and (steps is None or steps > 0):
+        root = root.parent
+        if steps is not None:
+            steps -= 1
+    return root
+
+
+def snap_targets(armature, samples, index, pairs, direction):
+    """
+    The pose matrix every moved bone should end up with, name -> (frames, 4, 4)
+    Once snapped the FK, IK, SWITCH and ORG bones all sit in the same place,
+    so the same target is stored under all of their names for the children to use as parent
+    """
+    targets = {}
+    for dest, source, record in pairs:
+        target = samples[:, index[source]]
+        targets[dest] = target
+        for prefix in ('MCH_SWITCH', 'ORG'):
+            targets.setdefault(record.with_prefix(prefix), target)
+
+    if direction != 'IK':
+        return targets
+
+    # IK target and pole bones follow the FK chain
+    moved = {}
+    for dest, source, record in pairs:
+        pose_bone = armature.pose.bones[dest]
+        for constraint in pose_bone.constraints:
+            if constraint.type != 'IK' or constraint.target != armature or not constraint.subtarget:
+                continue
+
+            tip = targets[dest]
+            tip_rest = _rest(armature, dest)
+
+            # Keep the target where it sits relative to the tip in rest pose
+            moved[constraint.subtarget] = tip @ np.linalg.inv(tip_rest) @ _rest(armature, constraint.subtarget)
+
+            if constraint.pole_target == armature and constraint.pole_subtarget:
+                root = _ik_chain_root(pose_bone, constraint)
+                root_matrix = targets.get(root.name, samples[:, index[root.name]])
+                moved[constraint.pole_subtarget] = _pole_matrices(
+                    armature, root_matrix, tip, pose_bone.length, constraint.pole_subtarget, root.name
+                )
+
+    targets.update(moved)
+    return targets
+
+
+def _pole_matrices(armature, root_matrix, tip_matrix, tip_length, pole_name, root_name):
+    """
+    Pole position in the bend plane of the FK chain, one chain length out from the middle joint
+    Where the chain is straight the pole keeps its rest offset from the chain root instead
+    """
+    pole_rest = _rest(armature, pole_name)
+    fallback = root_matrix @ np.linalg.inv(_rest(armature, root_name)) @ pole_rest
+
+    start = root_matrix[:, :3, 3]
+    middle = tip_matrix[:, :3, 3]
+    end = middle + tip_matrix[:, :3, 1] / np.linalg.norm(tip_matrix[:, :3, 1], axis=1, keepdims=True) * tip_length
+
+    line = end - start
+    line_length = np.linalg.norm(line, axis=1, keepdims=True)
+    along = np.sum((middle - start) * line, axis=1, keepdims=True) / np.maximum(line_length ** 2, 1e-12)
+    bend = middle - (start + line * along)
+    bend_length = np.linalg.norm(bend, axis=1, keepdims=True)
+    chain_length = np.linalg.norm(middle - start, axis=1, keepdims=True) + tip_length
+
+    poles = fallback.copy()
+    bent = bend_length[:, 0] > 1e-5 * np.maximum(chain_length[:, 0], 1e-6)
+    poles[bent, :3, 3] = (middle + bend / np.maximum(bend_length, 1e-12) * chain_length)[bent]
+    poles[bent, :3, :3] = pole_rest[:3, :3]
+    return poles
+
+
+def basis_matrices(armature, samples, index, targets, names):
+    """
+    Local (basis) matrices giving each bone in names its target pose matrix
+    basis = (parent_rest^-1 @ rest)^-1 @ parent_pose^-1 @ pose, for all frames at once
+    """
+    bases = {}
+    for name in names:
+        bone = armature.data.bones[name]
+        rest = np.array(bone.matrix_local, dtype=np.float64)
+        if bone.parent is None:
+            bases[name] = np.linalg.inv(rest) @ targets[name]
+            continue
+
+        parent_name = bone.parent.name
+        parent_pose = targets.get(parent_name)
+        if parent_pose is None:
+            parent_pose = samples[:, index[parent_name]]
+        relative_rest = np.linalg.inv(np.array(bone.parent.matrix_local, dtype=np.float64)) @ rest
+        bases[name] = np.linalg.inv(relative_rest) @ np.linalg.inv(parent_pose) @ targets[name]
+    return bases
+
+
+def _aliases(pairs):
+    """SWITCH / ORG names that are only in the targets as parent stand-ins"""
+    return {record.with_prefix(prefix) for _dest, _source, record in pairs for prefix in ('MCH_SWITCH', 'ORG')}
+
+
+def snap(armature, scene, side, direction, frames, keyframe=True, tolerance=0.0, switch=True):
+    """
+    Snap one side of the rig to FK (direction 'FK') or IK ('IK') over frames
+    With a single frame the pose is set directly and only keyed if keyframe is True
+    Returns the names of the bones that were moved
+    """
+    pairs = chain_pairs(armature, side, direction)
+    if not pairs:
+        return []
+
+    frames = list(frames)
+    samples, index = pose_arrays.sample_pose_matrices(armature, scene, frames)
+    targets = snap_targets(armature, samples, index, pairs, direction)
+
+    # The chain itself plus any IK target / pole bones
+    names = [dest for dest, _source, _record in pairs]
+    aliases = _aliases(pairs)
+    names.extend(name for name in targets if name not in names and name not in aliases and name in index)
+    bases = basis_matrices(armature, samples, index, targets, names)
+
+    action = keyframes.ensure_action(armature) if keyframe else None
+
+    for name in names:
+        pose_bone = armature.pose.bones[name]
+        location, quaternions, scale = pose_arrays.decompose(bases[name])
+        rotation_prop, rotation = pose_arrays.rotation_channels(pose_bone, quaternions)
+        channels = (
+            ('location', location.T.tolist()),
+            (rotation_prop, rotation),
+            ('scale', scale.T.tolist()),
+        )
+
+        # Current frame gets the pose right away so the viewport matches
+        if scene.frame_current in frames:
+            i = frames.index(scene.frame_current)
+            for prop, values in channels:
+                setattr(pose_bone, prop, [channel[i] for channel in values])
+
+        if action is not None:
+            for prop, values in channels:
+                keyframes.write_channels(
+                    action, keyframes.pose_bone_path(name, prop), frames, values,
+                    group_name=name, tolerance=tolerance,
+                )
+
+    properties_bone = armature.pose.bones.get(SWITCH_BONE)
+    if switch and properties_bone is not None:
+        value = SWITCH_VALUES[direction]
+        index_map = property_spec.read_index_map(properties_bone)
+        property_spec.set_value(properties_bone, switch_property(side), value, index_map)
+        if action is not None:
+            data_path, array_index = property_spec.fcurve_path(SWITCH_BONE, switch_property(side), index_map)
+            switch_frames = [frames[0], frames[-1]] if len(frames) > 1 else frames
+            keyframes.write_keys(
+                action, data_path, array_index, switch_frames, [value] * len(switch_frames),
+                group_name=SWITCH_BONE, interpolation='CONSTANT',
+            )
+
+    return names
@@ -0,0 +1,193 @@
+"""
+Logging and timing for the rig scripts
+
+Logging is silent unless a level is set, so per bone / per vertex messages cost nothing on big rigs:
+
+    instrument.set_level('DEBUG')     # everything, one line per bone
+    instrument.set_level('INFO')      # one line per step
+    instrument.set_level('WARNING')   # only problems
+
+Messages use %-style arguments so they are only formatted when they are actually printed:
+
+    log.debug("Created bone: %s", new_name)
+
+Timing, counters and the list of logged errors are always on, they are cheap:
+
+    with instrument.run("setup_cloth_chain", json_path="//timings.json"):
+        with instrument.phase("mesh build"):
+            ...
+        instrument.mode_set('POSE')   # counted as a bpy.ops call and a mode switch
+        instrument.ops('wm.save_mainfile')   # any other operator, counted as a bpy.ops call and by its name
+
+instrument.report() returns everything as a dict, export_json writes it out to compare rig versions.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'SILENT')
+
+_phases = {}
+_counters = {}
+_runs = []
+_phase_stack = []
+_errors = []
+
+
+class _ErrorRecorder(logging.Handler):
+    """Keeps every ERROR message, the rig functions report failure by logging and returning"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record):
+        _errors.append(record.getMessage())
+
+
+log = logging.getLogger('rig_tools')
+log.propagate = False
+
+# Scripts get re-run and modules reloaded in the same session, replace the handlers instead of adding more
+for _old_handler in list(log.handlers):
+    log.removeHandler(_old_handler)
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter('%(message)s'))
+log.addHandler(_handler)
+log.addHandler(_ErrorRecorder())
+
+
+def set_level(level):
+    """DEBUG, INFO, WARNING, ERROR or SILENT, errors are always recorded even when they arent printed"""
+    level = logging.CRITICAL + 1 if level == 'SILENT' else getattr(logging, level)
+    _handler.setLevel(level)
+    log.setLevel(min(level, logging.ERROR))
+
+
+# Silent by default
+set_level('SILENT')
+
+
+def reset():
+    """Forget all timings and counters"""
+    _phases.clear()
+    _counters.clear()
+    _runs.clear()
+    _phase_stack.clear()
+    _errors.clear()
+
+
+@contextmanager
+def phase(name):
+    """Time a block, nested phases are recorded as 'outer/inner'"""
+    _phase_stack.append(name)
+    key = '/'.join(_phase_stack)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _phase_stack.pop()
+        entry = _phases.setdefault(key, {'seconds': 0.0, 'calls': 0})
+        entry['seconds'] += elapsed
+        entry['calls'] += 1
+        log.debug("[%s] %.4fs", key, elapsed)
+
+
+def timed(name):
+    """Decorator version of phase"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def errors():
+    """ERROR messages logged since the last reset"""
+    return list(_errors)
+
+
+def count(name, amount=1):
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def ops(operator, **kwargs):
+    """bpy.ops call that gets counted, by name: instrument.ops('ptcache.bake', bake=True)"""
+    import bpy
+
+    count('bpy.ops')
+    count(operator)
+    module, name = operator.split('.')
+    return getattr(getattr(bpy.ops, module), name)(**kwargs)
+
+
+def mode_set(mode):
+    """bpy.ops.object.mode_set that gets counted"""
+    import bpy
+
+    count('bpy.ops')
+    count('mode_set')
+    bpy.ops.object.mode_set(mode=mode)
+
+
+def update_view_layer(context=None):
+    """view_layer.update() that gets counted"""
+    import bpy
+
+    count('view_layer.update')
+    (context or bpy.context).view_layer.update()
+
+
+def frame_set(scene, frame):
+    """scene.frame_set that gets counted, every call evaluates the whole scene"""
+    count('frame_set')
+    scene.frame_set(frame)
+
+
+@contextmanager
+def run(name, json_path=None, **details):
+    """
+    Time a whole script run, resets the previous numbers first
+    With json_path the report is written out when the run ends, // paths are relative to the blend file
+    """
+    reset()
+    started = time.perf_counter()
+    try:
+        with phase(name):
+            yield
+    finally:
+        _runs.append({'name': name, 'seconds': time.perf_counter() - started, **details})
+        log.info("%s took %.3fs", name, time.perf_counter() - started)
+        if json_path:
+            export_json(json_path)
+
+
+def report():
+    return {
+        'runs': list(_runs),
+        'phases': {key: dict(entry) for key, entry in _phases.items()},
+        'counters': dict(_counters),
+        'errors': list(_errors),
+    }
+
+
+def export_json(path, **extra):
+    """Write report() to path, extra keys (rig version, bone count...) are stored alongside"""
+    if path.startswith('//'):
+        import bpy
+        path = bpy.path.abspath(path)
+
+    data = report()
+    data.update(extra)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return path
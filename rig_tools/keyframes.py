@@ -0,0 +1,155 @@
+"""
+Bulk keyframe writing and keyframe reduction
+
+Baked motion is written with keyframe_points.add + foreach_set instead of keyframe_insert per frame,
+and thinned out first so the fcurves stay small. Reduction keeps the fewest keys such that linear
+interpolation between them never strays more than tolerance from the sampled values.
+"""
+from array import array
+
+# Enum values of Keyframe.interpolation for foreach_set
+INTERPOLATION = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+# Keyframe.handle_left_type / handle_right_type
+HANDLE_AUTO_CLAMPED = 4
+
+# Everything a key carries, (attribute, values per key, array typecode), enums go through foreach as their index
+KEY_FIELDS = (
+    ('co', 2, 'f'),
+    ('handle_left', 2, 'f'),
+    ('handle_right', 2, 'f'),
+    ('interpolation', 1, 'i'),
+    ('handle_left_type', 1, 'i'),
+    ('handle_right_type', 1, 'i'),
+    ('easing', 1, 'i'),
+    ('type', 1, 'i'),
+)
+
+
+def reduce_keys(frames, channels, tolerance):
+    """
+    Indices of the samples to keep, shared by all channels so they stay keyed on the same frames
+    channels is a list of value lists, one per channel, all as long as frames
+    Iterative Douglas-Peucker so a long shot doesnt hit the recursion limit
+    """
+    count = len(frames)
+    if count <= 2 or tolerance <= 0:
+        return list(range(count))
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        span = frames[last] - frames[first]
+        worst_error = 0.0
+        worst_index = first
+        for i in range(first + 1, last):
+            t = (frames[i] - frames[first]) / span if span else 0.0
+            for values in channels:
+                error = abs(values[first] + (values[last] - values[first]) * t - values[i])
+                if error > worst_error:
+                    worst_error = error
+                    worst_index = i
+
+        if worst_error > tolerance:
+            keep[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+
+    return [i for i in range(count) if keep[i]]
+
+
+def ensure_fcurve(action, data_path, index, group_name=None):
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        if group_name:
+            fcurve = action.fcurves.new(data_path, index=index, action_group=group_name)
+        else:
+            fcurve = action.fcurves.new(data_path, index=index)
+    return fcurve
+
+
+def write_keys(action, data_path, index, frames, values, group_name=None, interpolation='LINEAR'):
+    """
+    Replace the keys of one fcurve between the first and last frame with frames/values
+    Keys outside that range are kept as they are (handles, handle types, easing, key type), everything is written back
+    with one foreach_set per field
+    """
+    fcurve = ensure_fcurve(action, data_path, index, group_name)
+    points = fcurve.keyframe_points
+    first, last = frames[0], frames[-1]
+
+    old_count = len(points)
+    old = {}
+    for field, size, typecode in KEY_FIELDS:
+        old[field] = array(typecode, [0]) * (old_count * size)
+        if old_count:
+            points.foreach_get(field, old[field])
+
+    # One tuple of field values per key, in KEY_FIELDS order
+    keys = []
+    for i in range(old_count):
+        frame = old['co'][i * 2]
+        if frame < first or frame > last:
+            keys.append(tuple(tuple(old[field][i * size:(i + 1) * size]) for field, size, _typecode in KEY_FIELDS))
+
+    # Baked keys get auto clamped handles, update() below works out where they go
+    baked_interpolation = INTERPOLATION[interpolation]
+    for frame, value in zip(frames, values):
+        co = (frame, value)
+        keys.append((co, co, co, (baked_interpolation,), (HANDLE_AUTO_CLAMPED,), (HANDLE_AUTO_CLAMPED,), (0,), (0,)))
+    keys.sort(key=lambda key: key[0][0])
+
+    points.clear()
+    points.add(len(keys))
+    for position, (field, _size, typecode) in enumerate(KEY_FIELDS):
+        points.foreach_set(field, array(typecode, [value for key in keys for value in key[position]]))
+    fcurve.update()
+    return fcurve
+
+
+def write_channels(action, data_path, frames, channels, group_name=None, tolerance=0.0, interpolation='LINEAR'):
+    """
+    Reduce and write every array index of a property at once, e.g. the 4 rotation_quaternion channels
+    Returns how many keys each channel ended up with
+    """
+    kept = reduce_keys(frames, channels, tolerance)
+    kept_frames = [frames[i] for i in kept]
+    for index, values in enumerate(channels):
+        write_keys(action, data_path, index, kept_frames, [values[i] for i in kept], group_name, interpolation)
+    return len(kept)
+
+
+def insert_keys(action, keys):
+    """
+    Insert single keys into many fcurves, the batch version of keyframe_insert
+    keys is a list of (data_path, frame, values, group_name), one value per array index
+    Existing keys stay, handles are only recalculated once per fcurve at the end
+    """
+    touched = {}
+    for data_path, frame, values, group_name in keys:
+        for index, value in enumerate(values):
+            fcurve = ensure_fcurve(action, data_path, index, group_name)
+            fcurve.keyframe_points.insert(frame, value, options={'FAST'})
+            touched[(data_path, index)] = fcurve
+    for fcurve in touched.values():
+        fcurve.update()
+    return len(touched)
+
+
+def ensure_action(obj):
+    """The objects action, made if it doesnt have one yet"""
+    import bpy
+
+    obj.animation_data_create()
+    if obj.animation_data.action is None:
+        obj.animation_data.action = bpy.data.actions.new(f"{obj.name}Action")
+    return obj.animation_data.action
+
+
+def pose_bone_path(bone_name, prop):
+    return f'pose.bones["{bone_name}"].{prop}'
@@ -0,0 +1,163 @@
+"""
+Bone naming conventions used by the rig scripts
+
+PREFIX_base_NN.S
+    PREFIX  ORG, DEF, FK, PHYS, MCH_SWITCH, MCH_IK, MCH_FK..., followed by _ or a Rigify style - (DEF-spine)
+    base    name of the bone, including the _NN index if it has one
+    NN      position in the chain, chains are grouped by the base with the index stripped
+    S       L or R, bones without a side suffix are center or unique bones (side 'C')
+
+Every name is parsed once and cached, so scripts can ask for the same name as often as they want.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Longest first so MCH_SWITCH_arm doesnt parse as MCH + SWITCH_arm
+PREFIXES = ('MCH_SWITCH', 'MCH_IK', 'MCH_FK', 'MCH', 'ORG', 'DEF', 'PHYS', 'FK', 'IK')
+
+CENTER = 'C'
+
+_name_pattern = re.compile(
+    r'^(?P<prefix>' + '|'.join(PREFIXES) + r')(?P<separator>[_-])'
+    r'(?:(?P<sided_base>.*)\.(?P<side>[LR])|(?P<base>.+))$'
+)
+_index_pattern = re.compile(r'^(?P<chain>.+)_(?P<index>\d+)$')
+
+
+class BoneName(namedtuple('BoneName', 'name prefix base chain index side separator')):
+    """
+    Parsed bone name
+    chain is the chain key used everywhere else: chain name plus .L/.R, or just the chain name for center chains
+    index is the _NN number as an int, or None if the bone isnt numbered
+    separator is what follows the prefix, '_' or '-'
+    """
+    __slots__ = ()
+
+    @property
+    def suffix(self):
+        """The .L/.R part of the name, empty for center bones"""
+        return '' if self.side == CENTER else f'.{self.side}'
+
+    @property
+    def is_chain_bone(self):
+        """Center bones with a dot in them (ORG_spine.001) are not treated as chain bones"""
+        return self.side != CENTER or '.' not in self.base
+
+    def with_prefix(self, prefix):
+        """Name of the same bone in another layer, e.g. ORG_hair_01.L -> FK_hair_01.L, DEF-spine -> ORG-spine"""
+        return f'{prefix}{self.separator}{self.base}{self.suffix}'
+
+
+@lru_cache(maxsize=None)
+def parse(name):
+    """Parse a bone name, returns None if it doesnt start with a known prefix"""
+    match = _name_pattern.match(name)
+    if match is None:
+        return None
+
+    if match.group('side'):
+        base = match.group('sided_base')
+        side = match.group('side')
+    else:
+        base = match.group('base')
+        side = CENTER
+
+    index_match = _index_pattern.match(base)
+    if index_match:
+        chain_name = index_match.group('chain')
+        index = int(index_match.group('index'))
+    else:
+        chain_name = base
+        index = None
+
+    chain = chain_name if side == CENTER else f'{chain_name}.{side}'
+    return BoneName(name, match.group('prefix'), base, chain, index, side, match.group('separator'))
+
+
+def chain_name_parts(chain_key):
+    """Split a chain key into (name, suffix) where suffix is '.L', '.R' or ''"""
+    if chain_key.endswith(('.L', '.R')):
+        return chain_key[:-2], chain_key[-2:]
+    return chain_key, ''
+
+
+def physics_object_name(chain_key):
+    """hair.L -> hair_PHYSICS_OBJECT.L, hair -> hair_PHYSICS_OBJECT"""
+    name_part, suffix = chain_name_parts(chain_key)
+    return f'{name_part}_PHYSICS_OBJECT{suffix}'
+
+
+def merged_physics_object_name(armature_name):
+    """Single physics object holding every chain of an armature"""
+    return f'{armature_name}_PHYSICS_OBJECT'
+
+
+# Shared pin group of a merged physics object, single chain objects pin with physics.000
+PIN_GROUP = 'physics.pin'
+
+
+def physics_group_name(index, chain_key=None):
+    """
+    Physics vertex groups are physics.00n naming convention while bones are _0n
+    Groups on a merged physics object are namespaced by chain, hair.L:physics.001
+    """
+    if chain_key is None:
+        return f'physics.{index:03d}'
+    return f'{chain_key}:physics.{index:03d}'
+
+
+class BoneNameIndex:
+    """
+    Lookup tables over a set of bone names, built in a single pass
+
+    index = BoneNameIndex(bone.name for bone in armature.data.bones)
+    index.partner('ORG_hair_01.L', 'FK')  -> 'FK_hair_01.L' if that bone exists
+    index.chain('hair.L')                 -> ORG records of the hair.L chain
+    """
+
+    def __init__(self, names=(), prefixes=None):
+        self.records = {}
+        self._by_layer = {}
+        self._by_chain = {}
+        self._prefixes = set(prefixes) if prefixes is not None else None
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Add a name to the index, returns its record or None if it isnt a rig bone name"""
+        record = parse(name)
+        if record is None:
+            return None
+        if self._prefixes is not None and record.prefix not in self._prefixes:
+            return None
+
+        self.records[name] = record
+        self._by_layer[(record.prefix, record.separator, record.base, record.side)] = record
+        self._by_chain.setdefault((record.prefix, record.chain), []).append(record)
+        return record
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, name):
+        return self.records.get(name)
+
+    def partner(self, name, prefix):
+        """Name of the bone in the prefix layer matching this bone, same separator too, None if it isnt in the index"""
+        record = self.records.get(name)
+        if record is None:
+            return None
+        partner = self._by_layer.get((prefix, record.separator, record.base, record.side))
+        return partner.name if partner is not None else None
+
+    def chain(self, chain_key, prefix='ORG'):
+        """Records of the chain in insertion order, they still need sorting parent to child"""
+        return self._by_chain.get((prefix, chain_key), [])
+
+    def chains(self, prefix='ORG'):
+        """Dict of chain key -> records for every chain of the given prefix"""
+        return {chain: records for (layer, chain), records in self._by_chain.items() if layer == prefix}
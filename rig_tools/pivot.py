@@ -0,0 +1,211 @@
+"""
+Dynamic pivot math for "pivot demo.py"
+
+The AFFECTED bone sits in the average of the PIVOT and MCH_PIVOT_CHILD bones. Resetting the pivot zeroes the PIVOT
+rotation and gives AFFECTED the local transform that keeps it where it was:
+
+    affected_basis = average(pivot', child')^-1 @ affected_world
+
+pivot' and child' (the matrices after the reset) are worked out from the current pose instead of zeroing the
+rotation and re-evaluating the scene:
+
+    pivot'  = pivot @ basis^-1 @ basis'      the bones own transform swapped out, parent and rest unchanged
+    child'  = pivot' @ pivot^-1 @ child      the child just rides along
+
+That only holds while nothing but the parent chain moves those bones, reset_matrices returns None otherwise
+and the caller has to evaluate once.
+
+rebake() does the same for every frame of a range at once, on the numpy stacks from pose_arrays, so the pivot
+rotation can be cleared over a whole shot without changing what AFFECTED does. It works in pose space, which gives
+the same result as world space unless the armature object is scaled unevenly.
+"""
+import numpy as np
+from mathutils import Matrix, Quaternion
+
+from . import keyframes, pose_arrays
+
+# Zero rotation for each rotation property, what the pivot gets keyed to over a re-baked range
+IDENTITY_ROTATION = {
+    'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+    'rotation_euler': (0.0, 0.0, 0.0),
+    'rotation_axis_angle': (0.0, 0.0, 1.0, 0.0),
+}
+
+
+def affected_names(armature, affected, collection_name='', exclude=()):
+    """
+    Bone names from a comma separated list plus every bone in a bone collection, in order and without repeats
+    exclude keeps the pivot bones themselves out of it
+    """
+    names = [name.strip() for name in affected.split(',') if name.strip()]
+    if collection_name:
+        collection = armature.data.collections_all.get(collection_name)
+        if collection is not None:
+            names.extend(bone.name for bone in collection.bones)
+    seen = set(exclude)
+    result = []
+    for name in names:
+        if name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+
+def rigid_descendant(pose_bone, ancestor):
+    """True if pose_bone only moves with ancestor through plain parenting, no constraints or partial inheritance"""
+    bone = pose_bone
+    while bone is not None and bone != ancestor:
+        if any(constraint.enabled and constraint.influence > 0 for constraint in bone.constraints):
+            return False
+        if not bone.bone.use_inherit_rotation or bone.bone.inherit_scale != 'FULL':
+            return False
+        bone = bone.parent
+    return bone == ancestor
+
+
+def unconstrained(pose_bone):
+    return not any(constraint.enabled and constraint.influence > 0 for constraint in pose_bone.constraints)
+
+
+def reset_basis(pose_bone):
+    """The bones local matrix with its rotation zeroed"""
+    location, _rotation, scale = pose_bone.matrix_basis.decompose()
+    return Matrix.LocRotScale(location, Quaternion(), scale)
+
+
+def reset_matrices(pivot_bone, child_bone):
+    """
+    Pose matrices of the pivot and child once the pivot rotation is zeroed, without evaluating anything
+    None if either bone is driven by something this cant account for
+    """
+    if not unconstrained(pivot_bone) or not rigid_descendant(child_bone, pivot_bone):
+        return None
+
+    pivot_matrix = pivot_bone.matrix
+    new_pivot_matrix = pivot_matrix @ pivot_bone.matrix_basis.inverted() @ reset_basis(pivot_bone)
+    new_child_matrix = new_pivot_matrix @ pivot_matrix.inverted() @ child_bone.matrix
+    return new_pivot_matrix, new_child_matrix
+
+
+def averaged_matrix(parent_world, child_world):
+    """Half way between the pivot and its child, location, rotation and scale averaged separately"""
+    parent_loc, parent_rot, parent_scale = parent_world.decompose()
+    child_loc, child_rot, child_scale = child_world.decompose()
+    return Matrix.LocRotScale(
+        (parent_loc + child_loc) * 0.5,
+        parent_rot.slerp(child_rot, 0.5),
+        (parent_scale + child_scale) * 0.5,
+    )
+
+
+def zero_rotation(pose_bone):
+    pose_bone.rotation_quaternion = Quaternion((1, 0, 0, 0))
+    pose_bone.rotation_euler = (0, 0, 0)
+    pose_bone.rotation_axis_angle = (0, 0, 1, 0)
+
+
+def rotation_property(pose_bone):
+    if pose_bone.rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion'
+    if pose_bone.rotation_mode == 'AXIS_ANGLE':
+        return 'rotation_axis_angle'
+    return 'rotation_euler'
+
+
+def transform_properties(pose_bone):
+    return ('location', rotation_property(pose_bone), 'scale')
+
+
+def transform_keys(pose_bones, frame):
+    """Keys holding the bones current transform on frame, for keyframes.insert_keys"""
+    return [
+        (keyframes.pose_bone_path(pose_bone.name, prop), frame, tuple(getattr(pose_bone, prop)), pose_bone.name)
+        for pose_bone in pose_bones
+        for prop in transform_properties(pose_bone)
+    ]
+
+
+def set_basis(pose_bone, matrix):
+    """Set location / rotation (in the bones rotation mode) / scale from a local matrix"""
+    location, rotation, scale = matrix.decompose()
+    pose_bone.location = location
+    pose_bone.scale = scale
+    if pose_bone.rotation_mode == 'QUATERNION':
+        pose_bone.rotation_quaternion = rotation
+    elif pose_bone.rotation_mode == 'AXIS_ANGLE':
+        axis, angle = rotation.to_axis_angle()
+        pose_bone.rotation_axis_angle = (angle, *axis)
+    else:
+        pose_bone.rotation_euler = rotation.to_euler(pose_bone.rotation_mode, pose_bone.rotation_euler)
+
+
+def _reset_pose(pivot_bone, pivot_pose, parent_pose):
+    """Vectorised reset_matrices for the pivot: pivot @ basis^-1 @ basis with the rotation zeroed"""
+    basis = pose_arrays.local_matrices(pivot_bone, pivot_pose, parent_pose)
+    location = basis[:, :3, 3]
+    scale = np.linalg.norm(basis[:, :3, :3], axis=1)
+    identity = np.tile((1.0, 0.0, 0.0, 0.0), (len(basis), 1))
+    return pivot_pose @ np.linalg.inv(basis) @ pose_arrays.compose(location, identity, scale)
+
+
+def _averaged(parent_pose, child_pose):
+    parent_loc, parent_rot, parent_scale = pose_arrays.decompose(parent_pose)
+    child_loc, child_rot, child_scale = pose_arrays.decompose(child_pose)
+    return pose_arrays.compose(
+        (parent_loc + child_loc) * 0.5,
+        pose_arrays.slerp_half(parent_rot, child_rot),
+        (parent_scale + child_scale) * 0.5,
+    )
+
+
+def rebake(armature, scene, pivot_name, child_name, affected_names, frames, tolerance=0.0):
+    """
+    Clear the pivot rotation over frames and key the affected bones so they move exactly as before
+    Samples the range once, solves every frame together and writes the keys in bulk, reduced to tolerance
+    Returns the number of keys written per channel for each affected bone, raises ValueError if the pivot
+    or child are moved by something other than their parents
+    """
+    pose_bones = armature.pose.bones
+    pivot_bone = pose_bones[pivot_name]
+    child_bone = pose_bones[child_name]
+    if not unconstrained(pivot_bone) or not rigid_descendant(child_bone, pivot_bone):
+        raise ValueError(f"{pivot_name} / {child_name} are constrained, the range can't be solved without stepping frames twice")
+
+    frames = list(frames)
+    samples, index = pose_arrays.sample_pose_matrices(armature, scene, frames)
+
+    pivot_pose = samples[:, index[pivot_name]]
+    parent_pose = samples[:, index[pivot_bone.parent.name]] if pivot_bone.parent is not None else None
+    new_pivot_pose = _reset_pose(pivot_bone, pivot_pose, parent_pose)
+    new_child_pose = new_pivot_pose @ np.linalg.inv(pivot_pose) @ samples[:, index[child_name]]
+    averaged_inverse = np.linalg.inv(_averaged(new_pivot_pose, new_child_pose))
+
+    action = keyframes.ensure_action(armature)
+
+    current = frames.index(scene.frame_current) if scene.frame_current in frames else None
+    key_counts = {}
+    for name in affected_names:
+        pose_bone = pose_bones[name]
+        location, quaternions, scale = pose_arrays.decompose(averaged_inverse @ samples[:, index[name]])
+        rotation_prop, rotation = pose_arrays.rotation_channels(pose_bone, quaternions)
+        channels = (('location', location.T.tolist()), (rotation_prop, rotation), ('scale', scale.T.tolist()))
+
+        key_counts[name] = 0
+        for prop, values in channels:
+            key_counts[name] = max(key_counts[name], keyframes.write_channels(
+                action, keyframes.pose_bone_path(name, prop), frames, values, group_name=name, tolerance=tolerance,
+            ))
+            if current is not None:
+                setattr(pose_bone, prop, [channel[current] for channel in values])
+
+    # Pivot rotation cleared over the range
+    rotation_prop = rotation_property(pivot_bone)
+    ends = [frames[0], frames[-1]] if len(frames) > 1 else frames
+    identity = IDENTITY_ROTATION[rotation_prop]
+    keyframes.write_channels(
+        action, keyframes.pose_bone_path(pivot_name, rotation_prop), ends,
+        [[value] * len(ends) for value in identity], group_name=pivot_name,
+    )
+    zero_rotation(pivot_bone)
+
+    return key_counts
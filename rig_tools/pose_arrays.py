@@ -0,0 +1,115 @@
+"""
+Pose data as numpy stacks of 4x4 matrices, one per frame
+
+Used wherever a whole frame range gets worked on at once (FK/IK snapping, pivot re-bakes): the scene is stepped
+through once and everything after that is plain array math, no more depsgraph evaluations.
+"""
+import numpy as np
+
+from rig_tools import instrument
+
+
+def sample_pose_matrices(armature, scene, frames):
+    """
+    Pose matrices of every bone on every frame, shape (frames, bones, 4, 4), row major like mathutils
+    Returns the samples and a name -> bone index dict
+    """
+    pose_bones = armature.pose.bones
+    bone_count = len(pose_bones)
+    samples = np.empty((len(frames), bone_count, 4, 4), dtype=np.float64)
+    buffer = np.empty(bone_count * 16, dtype=np.float32)
+
+    current_frame = scene.frame_current
+    for i, frame in enumerate(frames):
+        if frame != scene.frame_current:
+            instrument.frame_set(scene, frame)
+        pose_bones.foreach_get("matrix", buffer)
+        # foreach_get hands matrices over column by column
+        samples[i] = buffer.reshape(bone_count, 4, 4).transpose(0, 2, 1)
+    if scene.frame_current != current_frame:
+        instrument.frame_set(scene, current_frame)
+
+    return samples, {name: i for i, name in enumerate(pose_bones.keys())}
+
+
+def decompose(matrices):
+    """Location, quaternion (w, x, y, z) and scale of a (frames, 4, 4) stack, quaternions kept sign continuous"""
+    location = matrices[:, :3, 3]
+    scale = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    rotation = matrices[:, :3, :3] / np.maximum(scale[:, None, :], 1e-12)
+
+    m = rotation
+    w = np.sqrt(np.maximum(0.0, 1.0 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2])) / 2
+    x = np.copysign(np.sqrt(np.maximum(0.0, 1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2])) / 2, m[:, 2, 1] - m[:, 1, 2])
+    y = np.copysign(np.sqrt(np.maximum(0.0, 1.0 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2])) / 2, m[:, 0, 2] - m[:, 2, 0])
+    z = np.copysign(np.sqrt(np.maximum(0.0, 1.0 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2])) / 2, m[:, 1, 0] - m[:, 0, 1])
+    quaternions = np.stack((w, x, y, z), axis=1)
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+    # Flip any quaternion that points away from the one before it so the curves dont jump
+    if len(quaternions) > 1:
+        dots = np.sum(quaternions[1:] * quaternions[:-1], axis=1)
+        signs = np.concatenate(([1.0], np.cumprod(np.where(dots < 0, -1.0, 1.0))))
+        quaternions *= signs[:, None]
+
+    return location, quaternions, scale
+
+
+def rotation_channels(pose_bone, quaternions):
+    """The rotation property and its channels for the bones rotation mode"""
+    from mathutils import Quaternion
+
+    mode = pose_bone.rotation_mode
+    if mode == 'QUATERNION':
+        return 'rotation_quaternion', quaternions.T.tolist()
+
+    values = []
+    previous = None
+    for quaternion in quaternions:
+        quaternion = Quaternion(quaternion)
+        if mode == 'AXIS_ANGLE':
+            axis, angle = quaternion.to_axis_angle()
+            values.append((angle, *axis))
+        else:
+            previous = quaternion.to_euler(mode, previous) if previous is not None else quaternion.to_euler(mode)
+            values.append(tuple(previous))
+    prop = 'rotation_axis_angle' if mode == 'AXIS_ANGLE' else 'rotation_euler'
+    return prop, [list(channel) for channel in zip(*values)]
+
+
+def quaternion_matrices(quaternions):
+    """(frames, 3, 3) rotation matrices from (frames, 4) w, x, y, z quaternions"""
+    w, x, y, z = quaternions.T
+    return np.stack((
+        np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)), axis=1),
+        np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)), axis=1),
+        np.stack((2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)), axis=1),
+    ), axis=1)
+
+
+def compose(location, quaternions, scale):
+    """(frames, 4, 4) matrices from location, quaternion and scale stacks, like Matrix.LocRotScale"""
+    matrices = np.zeros((len(location), 4, 4), dtype=np.float64)
+    matrices[:, :3, :3] = quaternion_matrices(quaternions) * scale[:, None, :]
+    matrices[:, :3, 3] = location
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def slerp_half(a, b):
+    """Half way between two quaternion stacks, the same as Quaternion.slerp(other, 0.5)"""
+    b = b * np.where(np.sum(a * b, axis=1) < 0, -1.0, 1.0)[:, None]
+    half = a + b
+    return half / np.linalg.norm(half, axis=1, keepdims=True)
+
+
+def local_matrices(pose_bone, pose, parent_pose=None):
+    """
+    Local (basis) matrices of a bone from its pose matrices, for bones moved only by their parent
+    parent_pose is the parents pose matrix stack, needed when the bone has a parent
+    """
+    rest = np.array(pose_bone.bone.matrix_local, dtype=np.float64)
+    if pose_bone.parent is None:
+        return np.linalg.inv(rest) @ pose
+    relative_rest = np.linalg.inv(np.array(pose_bone.parent.bone.matrix_local, dtype=np.float64)) @ rest
+    return np.linalg.inv(relative_rest) @ np.linalg.inv(parent_pose) @ pose
@@ -0,0 +1,349 @@
+"""
+Declarative custom properties for the PROPERTIES bone
+
+A spec is the same list of bone collections "Batch custom properties.py" always took:
+
+    [{'bones': ['INDEX'], 'symmetrical': True,
+      'properties': [{'name': 'IK_FOLLOWS_FK', 'type': 'FLOAT', 'default': 1.0, 'min': 0.0, 'max': 1.0,
+                      'description': '...', 'library_overridable': True}]}]
+
+kept in a .json file, or a .py file that defines bone_collections (or SPEC).
+
+plan() compares the spec with the IDProperties already on the bone and only lists what is missing or different,
+apply() carries that out. Values animators have changed are left alone, only a missing property or one of the wrong
+type gets its default written, everything else is just a UI data update. Unchanged properties are never touched,
+so re-running on a finished rig writes nothing.
+
+A collection with 'array': True stores each of its properties as one array instead of one scalar per bone and side:
+
+    {'bones': ['INDEX', 'MIDDLE'], 'symmetrical': True, 'array': True, 'properties': [{'name': 'IK_FOLLOWS_FK'}]}
+
+gives IK_FOLLOWS_FK = [INDEX.L, MIDDLE.L, INDEX.R, MIDDLE.R] (a property can set 'table' to name the array).
+The element names are kept as a JSON index map on the bone, property_path / fcurve_path turn the old scalar names
+into array element paths for drivers and keys. Only FLOAT, INT and BOOL properties can be arrays,
+BOOL arrays are stored as 0/1 ints.
+"""
+import json
+import os
+import runpy
+from collections import namedtuple
+
+ADD = 'ADD'
+RETYPE = 'RETYPE'
+RESIZE = 'RESIZE'
+UPDATE = 'UPDATE'
+REMOVE = 'REMOVE'
+INDEX = 'INDEX'
+
+# Where the array index map lives on the properties bone
+TABLE_KEY = '_property_tables'
+
+TYPES = {
+    'FLOAT': float,
+    'INT': int,
+    'BOOL': bool,
+    'STRING': str,
+    'VECTOR': list,
+}
+
+ARRAY_TYPES = ('FLOAT', 'INT', 'BOOL')
+
+# elements is None for scalars, the scalar names stored in the array otherwise
+PropertyDef = namedtuple('PropertyDef', 'name type default min max description overridable elements')
+Change = namedtuple('Change', 'action name detail')
+
+
+def load(path):
+    """Bone collections from a .json file or a .py file defining bone_collections or SPEC"""
+    if path.startswith('//'):
+        import bpy
+        path = bpy.path.abspath(path)
+
+    if os.path.splitext(path)[1].lower() == '.py':
+        namespace = runpy.run_path(path)
+        spec = namespace.get('bone_collections', namespace.get('SPEC'))
+        if spec is None:
+            raise ValueError(f"{path} defines neither bone_collections nor SPEC")
+        return spec
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _default(prop_type, value):
+    if prop_type == 'VECTOR':
+        return [float(v) for v in value] if isinstance(value, (list, tuple)) else [0.0, 0.0, 0.0]
+    if prop_type in TYPES:
+        return TYPES[prop_type](value)
+    return value
+
+
+def expand(bone_collections):
+    """
+    One PropertyDef per bone x side x property, names are BONE_PROPERTY.S
+    Array collections give one PropertyDef per property instead
+    """
+    definitions = []
+    for collection in bone_collections:
+        suffixes = ['.L', '.R'] if collection.get('symmetrical', False) else ['']
+        as_array = collection.get('array', False)
+
+        # Normalise every property once, not once per bone and side
+        configs = []
+        for prop_config in collection.get('properties', []):
+            prop_name = prop_config.get('name')
+            if not prop_name:
+                raise ValueError(f"Property name is required for bones {collection.get('bones', [])}")
+            prop_type = prop_config.get('type', 'FLOAT').upper()
+            limit = int if prop_type in ('INT', 'BOOL') else float
+            configs.append((
+                prop_config.get('table', prop_name),
+                prop_name,
+                prop_type,
+                _default(prop_type, prop_config.get('default', 0.0)),
+                limit(prop_config.get('min', 0.0)),
+                limit(prop_config.get('max', 1.0)),
+                prop_config.get('description', ''),
+                prop_config.get('library_overridable', True),
+            ))
+
+        if not as_array:
+            for suffix in suffixes:
+                for bone_name in collection.get('bones', []):
+                    for _table, prop_name, *rest in configs:
+                        definitions.append(PropertyDef(f"{bone_name}_{prop_name}{suffix}", *rest, None))
+            continue
+
+        for table, prop_name, prop_type, default, *rest in configs:
+            if prop_type not in ARRAY_TYPES:
+                raise ValueError(f"{prop_name}: only {', '.join(ARRAY_TYPES)} properties can be stored as arrays")
+            elements = tuple(
+                f"{bone_name}_{prop_name}{suffix}" for suffix in suffixes for bone_name in collection.get('bones', [])
+            )
+            array_type = 'INT' if prop_type == 'BOOL' else prop_type
+            definitions.append(PropertyDef(table, array_type, [TYPES[array_type](default)] * len(elements), *rest, elements))
+
+    names = [definition.name for definition in definitions]
+    if len(names) != len(set(names)):
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        raise ValueError(f"Properties defined more than once: {', '.join(duplicates)}")
+    return definitions
+
+
+def tables(definitions):
+    """Array name -> element names, what gets stored as the index map"""
+    return {definition.name: list(definition.elements) for definition in definitions if definition.elements}
+
+
+def read_index_map(properties_bone):
+    """Scalar name -> (array name, index) from the map stored on the bone, empty if it has no arrays"""
+    stored = json.loads(properties_bone.get(TABLE_KEY, '{}')) if properties_bone is not None else {}
+    return {element: (table, i) for table, elements in stored.items() for i, element in enumerate(elements)}
+
+
+def property_path(bone_name, name, index_map=None):
+    """Driver target path of a property by its scalar name, pointing into the array if it was moved into one"""
+    if index_map and name in index_map:
+        table, i = index_map[name]
+        return f'pose.bones["{bone_name}"]["{table}"][{i}]'
+    return f'pose.bones["{bone_name}"]["{name}"]'
+
+
+def fcurve_path(bone_name, name, index_map=None):
+    """(data path, array index) to key a property by its scalar name"""
+    if index_map and name in index_map:
+        table, i = index_map[name]
+        return f'pose.bones["{bone_name}"]["{table}"]', i
+    return f'pose.bones["{bone_name}"]["{name}"]', 0
+
+
+def retarget_drivers(armature, bone_name, index_map):
+    """
+    Point driver variables that read a scalar which now lives in an array at the array element instead
+    Returns how many targets were changed
+    """
+    scalar_paths = {property_path(bone_name, name): property_path(bone_name, name, index_map) for name in index_map}
+    changed = 0
+    for id_block in (armature, armature.data):
+        animation_data = id_block.animation_data
+        if animation_data is None:
+            continue
+        for fcurve in animation_data.drivers:
+            for variable in fcurve.driver.variables:
+                for target in variable.targets:
+                    new_path = scalar_paths.get(target.data_path)
+                    if new_path is not None:
+                        target.data_path = new_path
+                        changed += 1
+    return changed
+
+
+def get_value(properties_bone, name, index_map=None):
+    if index_map and name in index_map:
+        table, i = index_map[name]
+        return properties_bone[table][i]
+    return properties_bone[name]
+
+
+def set_value(properties_bone, name, value, index_map=None):
+    if index_map and name in index_map:
+        table, i = index_map[name]
+        properties_bone[table][i] = value
+    else:
+        properties_bone[name] = value
+
+
+def _same(a, b):
+    if isinstance(a, (list, tuple)) or isinstance(b, (list, tuple)):
+        return isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)) and len(a) == len(b) and all(map(_same, a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) < 1e-6
+    return a == b
+
+
+def _matches_type(definition, value):
+    expected = TYPES.get(definition.type)
+    if expected is None:
+        return True
+    if definition.elements is not None:
+        if not hasattr(value, '__len__') or isinstance(value, str):
+            return False
+        values = value.to_list() if hasattr(value, 'to_list') else list(value)
+        return not values or isinstance(values[0], expected)
+    if expected is list:
+        return hasattr(value, '__len__') and not isinstance(value, str)
+    if expected is float:
+        return isinstance(value, float)
+    # Files from before 3.0 store bools as ints
+    return isinstance(value, expected) or expected is bool and isinstance(value, int)
+
+
+def _ui_changes(properties_bone, definition):
+    """UI settings that differ from the definition, as a dict ready for id_properties_ui().update()"""
+    ui_data = properties_bone.id_properties_ui(definition.name).as_dict()
+    wanted = {'description': definition.description, 'default': definition.default}
+    if definition.type in ('FLOAT', 'INT', 'VECTOR') or definition.elements is not None:
+        wanted.update(min=definition.min, max=definition.max, soft_min=definition.min, soft_max=definition.max)
+    return {key: value for key, value in wanted.items() if key in ui_data and not _same(ui_data[key], value)}
+
+
+def plan(properties_bone, definitions, prune=False):
+    """
+    Changes needed to make the bone match definitions, nothing is modified
+    With prune the scalar properties that now live in an array are removed
+    """
+    stored_tables = json.loads(properties_bone.get(TABLE_KEY, '{}'))
+    changes = []
+    for definition in definitions:
+        if definition.name not in properties_bone:
+            changes.append(Change(ADD, definition.name, definition.type))
+            continue
+
+        value = properties_bone[definition.name]
+        if not _matches_type(definition, value):
+            changes.append(Change(RETYPE, definition.name, f"{type(value).__name__} -> {definition.type}"))
+            continue
+
+        if definition.elements is not None and (
+            len(value) != len(definition.elements) or stored_tables.get(definition.name) != list(definition.elements)
+        ):
+            changes.append(Change(RESIZE, definition.name, f"{len(value)} -> {len(definition.elements)}"))
+            continue
+
+        detail = _ui_changes(properties_bone, definition)
+        path = f'["{definition.name}"]'
+        if properties_bone.is_property_overridable_library(path) != definition.overridable:
+            detail['overridable'] = definition.overridable
+        if detail:
+            changes.append(Change(UPDATE, definition.name, detail))
+
+    new_tables = tables(definitions)
+    if {**stored_tables, **new_tables} != stored_tables:
+        changes.append(Change(INDEX, TABLE_KEY, f"{len(new_tables)} arrays"))
+
+    if prune:
+        for elements in new_tables.values():
+            changes.extend(Change(REMOVE, name, "stored in an array") for name in elements if name in properties_bone)
+    return changes
+
+
+def _array_values(properties_bone, definition, stored_tables):
+    """
+    Starting values for a new or resized array, keeping what animators set
+    Taken from the old array where the element was already stored, or from the old scalar property
+    """
+    cast = TYPES[definition.type]
+    values = list(definition.default)
+
+    old_elements = stored_tables.get(definition.name, [])
+    old_values = properties_bone.get(definition.name)
+    old_values = old_values.to_list() if hasattr(old_values, 'to_list') else None
+    old_index = {name: i for i, name in enumerate(old_elements)}
+
+    for i, element in enumerate(definition.elements):
+        try:
+            if old_values is not None and element in old_index and old_index[element] < len(old_values):
+                values[i] = cast(old_values[old_index[element]])
+            elif element in properties_bone:
+                values[i] = cast(properties_bone[element])
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def apply(properties_bone, definitions, changes):
+    """Carry out the changes from plan()"""
+    from rna_prop_ui import rna_idprop_ui_create
+
+    by_name = {definition.name: definition for definition in definitions}
+    stored_tables = json.loads(properties_bone.get(TABLE_KEY, '{}'))
+
+    # Removals last, new arrays take their starting values from the scalars
+    for change in sorted(changes, key=lambda change: change.action == REMOVE):
+        if change.action == REMOVE:
+            del properties_bone[change.name]
+            continue
+
+        if change.action == INDEX:
+            stored_tables.update(tables(definitions))
+            properties_bone[TABLE_KEY] = json.dumps(stored_tables)
+            continue
+
+        definition = by_name[change.name]
+
+        if change.action in (ADD, RETYPE, RESIZE):
+            values = _array_values(properties_bone, definition, stored_tables) if definition.elements else None
+            if change.action != ADD:
+                del properties_bone[definition.name]
+            numeric = definition.type in ('FLOAT', 'INT', 'VECTOR') or definition.elements is not None
+            rna_idprop_ui_create(
+                properties_bone,
+                definition.name,
+                default=definition.default,
+                min=definition.min if numeric else 0.0,
+                max=definition.max if numeric else 1.0,
+                description=definition.description,
+                overridable=definition.overridable,
+            )
+            if values is not None and values != definition.default:
+                properties_bone[definition.name] = values
+            continue
+
+        detail = dict(change.detail)
+        overridable = detail.pop('overridable', None)
+        if detail:
+            properties_bone.id_properties_ui(definition.name).update(**detail)
+        if overridable is not None:
+            properties_bone.property_overridable_library_set(f'["{definition.name}"]', overridable)
+
+
+def report(changes, dry_run=False):
+    """One line per change plus a summary line"""
+    verb = "Would" if dry_run else "Did"
+    lines = [f"{change.action:<7} {change.name}  {change.detail}" for change in changes]
+    counts = {action: sum(1 for change in changes if change.action == action) for action in (ADD, RETYPE, RESIZE, UPDATE, REMOVE)}
+    lines.append(
+        f"{verb} add {counts[ADD]}, retype {counts[RETYPE]}, resize {counts[RESIZE]}, "
+        f"update {counts[UPDATE]}, remove {counts[REMOVE]}"
+    )
+    return lines
@@ -0,0 +1,295 @@
+"""
+Rig recipe: which generator ran on which ORG chains with which parameters, so a rebuild only redoes what changed
+
+Every generator run through generate() is recorded on the armature data (JSON under RECIPE_KEY), one step per chain:
+
+    {"generator": "cloth_chain", "chain": "hair.L", "bones": ["ORG_hair_01.L", ...], "params": {...}, "hash": "..."}
+
+The hash covers the chains ORG bones (rest head, tail, roll, parent and the parents rest matrix, the cloth mesh is
+bound to it) and the parameters, plus the armature objects world matrix for cloth steps, whose mesh is built in
+world space. rebuild() hashes every
+step again and only the chains whose hash changed get their generated bones, constraints and physics objects
+removed and the generator run again on them. Steps with the same generator and parameters are regenerated
+together in one call, so 3 changed strands out of 100 cost one generator run over 3 chains.
+
+Merged cloth chains share one physics object, they are recorded as a single step and rebuilt together.
+Chains whose ORG bones are gone are reported and left alone.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from . import chain_graph, naming
+
+RECIPE_KEY = '_rig_recipe'
+
+CLEAN = 'CLEAN'
+CHANGED = 'CHANGED'
+MISSING = 'MISSING'
+
+# Digits kept from rest positions, float noise from edit mode round trips shouldn't count as a change
+PRECISION = 5
+
+# prefixes: bone layers the generator makes from every ORG bone, org_constraints: constraints it adds to the ORG bones
+Generator = namedtuple('Generator', 'script function prefixes org_constraints')
+
+GENERATORS = {
+    'cloth_chain': Generator("Cloth chains from ORG.py", 'setup_cloth_chain', ('PHYS', 'FK'), ("Copy FK transform",)),
+    'fk_ik_switch': Generator("Create FK IK switch from ORG.py", 'create_fk_ik_switch', ('MCH_SWITCH', 'MCH_IK', 'MCH_FK'), ()),
+}
+
+
+def load(armature):
+    return json.loads(armature.data.get(RECIPE_KEY, '[]'))
+
+
+def save(armature, steps):
+    armature.data[RECIPE_KEY] = json.dumps(steps)
+
+
+def _rounded(matrix):
+    return [round(value, PRECISION) for row in matrix for value in row]
+
+
+def _bone_state(bone):
+    # matrix_local carries the roll along with the head / tail
+    parent = [bone.parent.name, _rounded(bone.parent.matrix_local)] if bone.parent else None
+    return [bone.name, parent, [round(value, PRECISION) for value in bone.tail_local], _rounded(bone.matrix_local)]
+
+
+def chain_hash(armature, generator, bone_names, params):
+    """Hash of the ORG bones rest data and the parameters, None if any of the bones are gone"""
+    bones = armature.data.bones
+    states = []
+    for name in sorted(bone_names):
+        bone = bones.get(name)
+        if bone is None:
+            return None
+        states.append(_bone_state(bone))
+    # The cloth mesh rows are placed in world space
+    world = _rounded(armature.matrix_world) if generator == 'cloth_chain' else None
+    data = json.dumps([generator, params, states, world], sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def _step_key(step):
+    return (step['generator'], step['chain'])
+
+
+def selected_chains(armature, bone_names, params):
+    """The ORG chains a generator would make out of bone_names, as (chain key, bone names) the way it groups them"""
+    bones = armature.data.bones
+    org_bones = []
+    for name in bone_names:
+        record = naming.parse(name)
+        if record is not None and record.prefix == 'ORG' and record.is_chain_bone and name in bones:
+            org_bones.append(bones[name])
+
+    if params.get('group_by') == 'CONNECTIVITY':
+        chains, _problems = chain_graph.chains_by_connectivity(org_bones)
+    else:
+        chains, _problems = chain_graph.chains_by_name(org_bones)
+    return [(chain.key, [bone.name for bone in chain.bones]) for chain in chains]
+
+
+def record(armature, generator, chains, params):
+    """Add or replace the steps for chains, a list of (chain key, ORG bone names)"""
+    steps = {_step_key(step): step for step in load(armature)}
+    for chain_key, bone_names in chains:
+        step = {
+            'generator': generator,
+            'chain': chain_key,
+            'bones': list(bone_names),
+            'params': params,
+            'hash': chain_hash(armature, generator, bone_names, params),
+        }
+        steps[_step_key(step)] = step
+    save(armature, list(steps.values()))
+
+
+def _org_chains(armature):
+    """chain key -> ORG bone names in the armature right now, by the _NN naming"""
+    chains = {}
+    for name in armature.data.bones.keys():
+        record = naming.parse(name)
+        if record is not None and record.prefix == 'ORG':
+            chains.setdefault(record.chain, []).append(name)
+    return chains
+
+
+def _current_bones(step, org_chains):
+    """The steps bones now, chains grouped by name pick up added and removed ORG bones"""
+    if step['params'].get('group_by') == 'CONNECTIVITY' or step['params'].get('merged'):
+        return step['bones']
+    return sorted(org_chains.get(step['chain'], step['bones']), key=lambda name: (naming.parse(name).index or 0, name))
+
+
+def plan(armature):
+    """(step, state, bones now) for every recorded step, state is CLEAN, CHANGED or MISSING"""
+    org_chains = _org_chains(armature)
+    result = []
+    for step in load(armature):
+        bones = _current_bones(step, org_chains)
+        new_hash = chain_hash(armature, step['generator'], bones, step['params'])
+        if new_hash is None:
+            state = MISSING
+        elif new_hash != step['hash'] or set(bones) != set(step['bones']):
+            state = CHANGED
+        else:
+            state = CLEAN
+        result.append((step, state, bones))
+    return result
+
+
+def _physics_objects(armature, step):
+    if step['generator'] != 'cloth_chain':
+        return []
+    if step['params'].get('merged'):
+        return [naming.merged_physics_object_name(armature.name)]
+    return [naming.physics_object_name(step['chain'])]
+
+
+def outputs(armature, steps):
+    """(bone names, {ORG bone: constraint names}, object names) the generators made for steps"""
+    bone_names = []
+    constraints = {}
+    objects = []
+    for step in steps:
+        generator = GENERATORS[step['generator']]
+        for org_name in step['bones']:
+            org_record = naming.parse(org_name)
+            bone_names.extend(org_record.with_prefix(prefix) for prefix in generator.prefixes)
+            if generator.org_constraints:
+                constraints.setdefault(org_name, []).extend(generator.org_constraints)
+        objects.extend(_physics_objects(armature, step))
+    return bone_names, constraints, objects
+
+
+def remove_outputs(armature, steps):
+    """Delete what the generators made for steps, one edit mode pass for all of them"""
+    import bpy
+    from . import instrument
+
+    bone_names, constraints, objects = outputs(armature, steps)
+
+    pose_bones = armature.pose.bones
+    for org_name, constraint_names in constraints.items():
+        pose_bone = pose_bones.get(org_name)
+        if pose_bone is None:
+            continue
+        for constraint in [c for c in pose_bone.constraints if c.name in constraint_names]:
+            pose_bone.constraints.remove(constraint)
+
+    for name in objects:
+        obj = bpy.data.objects.get(name)
+        if obj is None:
+            continue
+        mesh = obj.data if obj.type == 'MESH' else None
+        bpy.data.objects.remove(obj)
+        # Removing the object leaves its mesh behind as an orphan, unless something else still uses it
+        if mesh is not None and mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+    instrument.mode_set('EDIT')
+    edit_bones = armature.data.edit_bones
+    removed = 0
+    for name in bone_names:
+        edit_bone = edit_bones.get(name)
+        if edit_bone is not None:
+            edit_bones.remove(edit_bone)
+            removed += 1
+    instrument.mode_set('OBJECT')
+    return removed, len(objects)
+
+
+def select_bones(armature, bone_names):
+    """Select exactly bone_names, the generators read it back as the edit bone selection"""
+    wanted = set(bone_names)
+    for bone in armature.data.bones:
+        bone.select = bone.select_head = bone.select_tail = bone.name in wanted
+
+
+def run_generator(generator, params):
+    """Call the generator function from its script"""
+    from . import addon
+
+    func = getattr(addon.script(GENERATORS[generator].script), GENERATORS[generator].function)
+    return func(**params)
+
+
+def _current_selection(context, armature):
+    if context.mode == 'EDIT_ARMATURE':
+        return [bone.name for bone in armature.data.edit_bones if bone.select]
+    return [bone.name for bone in armature.data.bones if bone.select]
+
+
+def generate(context, generator, params, run=run_generator):
+    """Run generator on the selected ORG bones and record what it ran on"""
+    armature = context.active_object
+    bone_names = _current_selection(context, armature)
+    chains = selected_chains(armature, bone_names, params)
+
+    result = run(generator, params)
+
+    if chains:
+        if generator == 'cloth_chain' and params.get('merged'):
+            # One physics object for all of them, rebuilt as one
+            chains = [(naming.merged_physics_object_name(armature.name), [name for _key, names in chains for name in names])]
+        record(armature, generator, chains, params)
+    return result
+
+
+def rebuild(context, force=False, run=run_generator):
+    """
+    Regenerate the changed steps, every step with force
+    Returns {state: [chain keys]} with what was rebuilt under CHANGED
+    """
+    from . import instrument
+    from .instrument import log
+
+    armature = context.active_object
+    if context.mode != 'OBJECT':
+        instrument.mode_set('OBJECT')
+
+    with instrument.phase("hash"):
+        planned = plan(armature)
+
+    summary = {CLEAN: [], CHANGED: [], MISSING: []}
+    dirty = []
+    for step, state, bones in planned:
+        if force and state == CLEAN:
+            state = CHANGED
+        summary[state].append(step['chain'])
+        if state == CHANGED:
+            dirty.append((step, bones))
+
+    for chain_key in summary[MISSING]:
+        log.warning("Chain %s has ORG bones missing, skipped", chain_key)
+    if not dirty:
+        log.info("Nothing changed, %s chains up to date", len(summary[CLEAN]))
+        return summary
+
+    with instrument.phase("remove"):
+        # What was made from the bones the chain had last time, and any it has gained since
+        removed_bones, removed_objects = remove_outputs(
+            armature, [dict(step, bones=sorted(set(step['bones']) | set(bones))) for step, bones in dirty]
+        )
+    log.info("Removed %s bones and %s objects from %s changed chains", removed_bones, removed_objects, len(dirty))
+
+    # Same generator and parameters run once over all of their chains
+    groups = {}
+    for step, bones in dirty:
+        key = (step['generator'], json.dumps(step['params'], sort_keys=True))
+        groups.setdefault(key, []).append((step['chain'], bones))
+
+    with instrument.phase("generate"):
+        for (generator, params_key), chains in groups.items():
+            params = json.loads(params_key)
+            select_bones(armature, [name for _chain_key, bones in chains for name in bones])
+            run(generator, params)
+            if context.mode != 'OBJECT':
+                instrument.mode_set('OBJECT')
+            record(armature, generator, chains, params)
+            log.info("Regenerated %s: %s", generator, ", ".join(chain_key for chain_key, _bones in chains))
+
+    return summary
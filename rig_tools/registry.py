@@ -0,0 +1,202 @@
+"""
+Registration that remembers what it registered
+
+Every script that registers something does it through a named registry, which records the classes, app handlers
+and bpy.props properties it added:
+
+    with registry.session("pivot demo") as reg:
+        reg.register_class(A_rig_OT_reset_dynamic_pivot)
+        reg.add_handler('depsgraph_update_post', rig_ui.on_depsgraph_update)
+        reg.add_property(bpy.types.Scene, "a_rig_settings", PointerProperty(type=...))
+
+Running the script again first unregisters what the previous run of that session added, so the new classes replace
+the old ones in place instead of piling up or failing on "already registered". unregister_all() removes everything
+our scripts added and nothing else, it only touches our own classes instead of sweeping all of bpy.types.
+
+reload_changed() reloads the rig_tools modules whose source changed since they were imported. Reloading keeps the
+module objects, so `from rig_tools import pivot` in a script or operator still points at the new code.
+"""
+import importlib
+import os
+import sys
+from contextlib import contextmanager
+
+from .instrument import log
+
+# Survives re-running scripts from the text editor, this module stays imported
+_registries = {}
+_mtimes = {}
+
+
+class Registry:
+    def __init__(self, name):
+        self.name = name
+        self.classes = []
+        self.handlers = []
+        self.properties = []
+
+    def register_class(self, cls):
+        import bpy
+
+        # Same class from a run that never unregistered, in this session or another one
+        for registry in _registries.values():
+            for old in [old for old in registry.classes if old.__name__ == cls.__name__ and old is not cls]:
+                registry.unregister_class(old)
+        bpy.utils.register_class(cls)
+        self.classes.append(cls)
+        log.debug("[%s] registered %s", self.name, cls.__name__)
+        return cls
+
+    def unregister_class(self, cls):
+        import bpy
+
+        if cls in self.classes:
+            self.classes.remove(cls)
+        try:
+            bpy.utils.unregister_class(cls)
+        except RuntimeError as e:
+            log.warning("[%s] failed to unregister %s: %s", self.name, cls.__name__, e)
+        else:
+            log.debug("[%s] unregistered %s", self.name, cls.__name__)
+
+    def add_handler(self, handler_list, func):
+        import bpy
+
+        getattr(bpy.app.handlers, handler_list).append(func)
+        self.handlers.append((handler_list, func))
+        return func
+
+    def add_property(self, owner, name, prop):
+        setattr(owner, name, prop)
+        self.properties.append((owner, name))
+
+    def unregister(self):
+        """Undo everything, in reverse order"""
+        import bpy
+
+        for owner, name in reversed(self.properties):
+            if hasattr(owner, name):
+                delattr(owner, name)
+        for handler_list, func in reversed(self.handlers):
+            handlers = getattr(bpy.app.handlers, handler_list)
+            if func in handlers:
+                handlers.remove(func)
+        for cls in reversed(list(self.classes)):
+            self.unregister_class(cls)
+        self.properties.clear()
+        self.handlers.clear()
+
+    def __len__(self):
+        return len(self.classes) + len(self.handlers) + len(self.properties)
+
+
+def get(name):
+    """The registry of a session, made empty if there isnt one yet"""
+    if name not in _registries:
+        _registries[name] = Registry(name)
+    return _registries[name]
+
+
+@contextmanager
+def session(name, reload=True):
+    """
+    Fresh registry for a script run, whatever its previous run registered is removed first
+    With reload the changed rig_tools modules are reloaded before anything is registered
+    """
+    registry = get(name)
+    registry.unregister()
+    if reload:
+        reload_changed()
+    yield registry
+    log.info("[%s] %s registered", name, len(registry))
+
+
+def unregister_all():
+    """Remove everything every session registered, returns the number of things removed"""
+    removed = 0
+    for registry in reversed(list(_registries.values())):
+        removed += len(registry)
+        registry.unregister()
+    _registries.clear()
+    return removed
+
+
+def _source_mtime(module):
+    path = getattr(module, '__file__', None)
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def _package_modules():
+    """Imported modules of this package, except this one, reloading it would forget every registry"""
+    package = __name__.rpartition('.')[0]
+    return {
+        name: module for name, module in sys.modules.items()
+        if module is not None and name != __name__ and (name == package or name.startswith(package + '.'))
+    }
+
+
+def _imports(module, modules):
+    """
+    (modules it imported, modules it took names out of) within the package
+    Only the second kind needs reloading when the module it imported from changes
+    """
+    imported = set()
+    taken_from = set()
+    for value in vars(module).values():
+        if hasattr(value, '__file__'):
+            if value.__name__ in modules and value is not module:
+                imported.add(value.__name__)
+        elif getattr(value, '__module__', None) in modules and value.__module__ != module.__name__:
+            taken_from.add(value.__module__)
+    return imported, taken_from
+
+
+def reload_changed():
+    """
+    Reload the package modules whose files changed, dependencies first
+    Modules that took names out of a reloaded module (from .x import y) are reloaded too so they dont keep the old ones
+    Returns the reloaded module names
+    """
+    modules = _package_modules()
+    for name, module in modules.items():
+        _mtimes.setdefault(name, _source_mtime(module))
+
+    changed = {name for name, module in modules.items() if _source_mtime(module) != _mtimes[name]}
+    if not changed:
+        return []
+
+    imports = {name: _imports(module, modules) for name, module in modules.items()}
+    pending = list(changed)
+    while pending:
+        name = pending.pop()
+        for other, (_imported, taken_from) in imports.items():
+            if name in taken_from and other not in changed:
+                changed.add(other)
+                pending.append(other)
+
+    # Dependencies first, depth first over what each module imports
+    order = []
+    seen = set()
+    for start in sorted(changed):
+        stack = [(start, False)]
+        while stack:
+            name, done = stack.pop()
+            if done:
+                if name in changed:
+                    order.append(name)
+                continue
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.append((name, True))
+            imported, taken_from = imports[name]
+            stack.extend((dependency, False) for dependency in sorted(imported | taken_from) if dependency not in seen)
+
+    for name in order:
+        importlib.reload(modules[name])
+        _mtimes[name] = _source_mtime(modules[name])
+        log.info("Reloaded %s", name)
+    return order
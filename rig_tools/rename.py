@@ -0,0 +1,199 @@
+"""
+Batch bone renaming
+
+A rename is planned for the whole armature before anything is touched:
+
+    transform = rename.compose(rename.uppercase, rename.normalize_side)
+    bone_map, problems = rename.plan(armature.data.bones.keys(), transform)
+
+problems lists every collision (two bones ending up with the same name, or a bone renamed onto one that stays),
+so nothing silently turns into ARM.001. apply() then renames through Bone.name without going into edit mode.
+Blender fixes up constraints, drivers, child objects, vertex groups of bound meshes and the actions assigned
+to the armature on every rename. apply() also does the one thing Blender skips, the fcurves and groups of
+actions that arent assigned to anything, in a single pass over the whole map.
+"""
+import re
+
+# Blender cuts names off at 63 bytes
+MAX_NAME_BYTES = 63
+
+_side_pattern = re.compile(r'^(?P<base>.+?)[._\- ](?P<side>L|R|l|r|left|right|Left|Right|LEFT|RIGHT)$')
+
+
+def uppercase(name):
+    return name.upper()
+
+
+def prefix_swap(old, new):
+    """Transform renaming OLD_* to NEW_*, e.g. prefix_swap('DEF', 'ORG')"""
+    old_prefix = f'{old}_'
+
+    def transform(name):
+        return f'{new}_{name[len(old_prefix):]}' if name.startswith(old_prefix) else name
+    return transform
+
+
+def normalize_side(name):
+    """hand_L, hand-l, hand.left, hand Right... -> hand.L / hand.R"""
+    match = _side_pattern.match(name)
+    if match is None:
+        return name
+    return f"{match.group('base')}.{match.group('side')[0].upper()}"
+
+
+def compose(*transforms):
+    """Apply transforms left to right"""
+    def transform(name):
+        for step in transforms:
+            name = step(name)
+        return name
+    return transform
+
+
+def plan(names, transform):
+    """
+    Work out the whole rename before touching anything
+    Returns (bone_map, problems), bone_map only holds names that actually change,
+    colliding bones are reported in problems and left out of bone_map
+    transform returning None keeps the name, so a mapping works too: plan(names, {'A': 'B'}.get)
+    """
+    names = list(names)
+    bone_map = {}
+    for name in names:
+        new_name = transform(name)
+        if new_name is not None and new_name != name:
+            bone_map[name] = new_name
+
+    problems = []
+    targets = {}
+    for name, new_name in bone_map.items():
+        targets.setdefault(new_name, []).append(name)
+
+    bad = set()
+    for new_name, sources in targets.items():
+        if len(sources) > 1:
+            problems.append(f"{', '.join(sources)} would all become {new_name}")
+            bad.update(sources)
+        if len(new_name.encode('utf-8')) > MAX_NAME_BYTES:
+            problems.append(f"{new_name} is longer than {MAX_NAME_BYTES} bytes")
+            bad.update(sources)
+    for name in bad:
+        del bone_map[name]
+
+    # Every bone left out keeps its name, which can block another rename (A -> B when B -> C was dropped)
+    staying = set(names) - set(bone_map)
+    while True:
+        bad = [name for name, new_name in bone_map.items() if new_name in staying]
+        if not bad:
+            break
+        for name in bad:
+            problems.append(f"{name} would become {bone_map[name]}, which already exists and isnt renamed")
+            del bone_map[name]
+        staying.update(bad)
+    return bone_map, problems
+
+
+def _rename_order(bone_map):
+    """
+    (old, new) steps that never rename onto a name still in use
+    Chains (A -> B, B -> C) are ordered, cycles (L <-> R swaps) go through a temporary name
+    """
+    pending = dict(bone_map)
+    steps = []
+    while pending:
+        progressed = False
+        for old, new in list(pending.items()):
+            if new not in pending:
+                steps.append((old, new))
+                del pending[old]
+                progressed = True
+        if progressed:
+            continue
+
+        # Everything left is in a cycle, park one bone to break it
+        old, new = next(iter(pending.items()))
+        temp = f'__rename_{len(steps)}__'
+        steps.append((old, temp))
+        del pending[old]
+        pending[temp] = new
+    return steps
+
+
+def _escape(name):
+    return name.replace('\\', '\\\\').replace('"', '\\"')
+
+
+_path_pattern = re.compile(r'pose\.bones\["((?:[^"\\]|\\.)*)"\]')
+
+
+def rename_fcurves(actions, bone_map):
+    """Rename pose bone paths and groups in actions, all names at once. Returns how many fcurves changed"""
+    escaped = {_escape(old): _escape(new) for old, new in bone_map.items()}
+
+    def replace(match):
+        return f'pose.bones["{escaped.get(match.group(1), match.group(1))}"]'
+
+    changed = 0
+    for action in actions:
+        for fcurve in action.fcurves:
+            path = fcurve.data_path
+            if not path.startswith('pose.bones["'):
+                continue
+            new_path = _path_pattern.sub(replace, path)
+            if new_path != path:
+                fcurve.data_path = new_path
+                changed += 1
+        for group in action.groups:
+            if group.name in bone_map:
+                group.name = bone_map[group.name]
+    return changed
+
+
+def _animation_actions(id_block):
+    animation_data = getattr(id_block, 'animation_data', None)
+    if animation_data is None:
+        return set()
+    actions = {animation_data.action} if animation_data.action is not None else set()
+    for track in animation_data.nla_tracks:
+        actions.update(strip.action for strip in track.strips if strip.action is not None)
+    return actions
+
+
+def unassigned_actions(data):
+    """Actions no object uses, Blender doesnt fix bone paths in these when a bone is renamed"""
+    used = set()
+    for obj in data.objects:
+        used |= _animation_actions(obj)
+    return [action for action in data.actions if action not in used]
+
+
+def _keyed_bones(action):
+    names = set()
+    for fcurve in action.fcurves:
+        match = _path_pattern.match(fcurve.data_path)
+        if match:
+            names.add(match.group(1))
+    return names
+
+
+def apply(armature_data, bone_map, data, fix_unassigned_actions=True):
+    """
+    Rename bones of one armature data block according to a map from plan()
+    Works in object or pose mode. data is bpy.data, returns the number of fcurves fixed by hand
+    """
+    bones = armature_data.bones
+
+    # Unassigned actions that belong to this rig: every bone they key is one of its bones
+    actions = []
+    if fix_unassigned_actions and bone_map:
+        bone_paths = {_escape(name) for name in bones.keys()}
+        old_paths = {_escape(old) for old in bone_map}
+        for action in unassigned_actions(data):
+            keyed = _keyed_bones(action)
+            if keyed & old_paths and keyed <= bone_paths:
+                actions.append(action)
+
+    for old, new in _rename_order(bone_map):
+        bones[old].name = new
+
+    return rename_fcurves(actions, bone_map)
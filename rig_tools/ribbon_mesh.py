@@ -0,0 +1,178 @@
+"""
+Ribbon meshes for the cloth chains
+
+Each chain becomes a ribbon with a row of 3 vertices (left, center, right) per joint,
+the center vertex sits on the joint and the row is spread along the bones Z axis.
+The ribbon can also be resampled to any number of rows, the physics.NNN group of each joint
+then blends the two rows around it so the PHYS bones track an interpolated point.
+Positions, faces and vertex group weights are built as flat arrays and written with
+foreach_set / one vertex_group.add per group instead of vertex by vertex.
+"""
+from array import array
+
+import bpy
+
+from rig_tools import naming
+
+ROW_VERTS = 3
+DEFAULT_RIBBON_WIDTH = 0.1
+# Rows after the first also get a bit of the pin group for stability
+PIN_WEIGHT = 0.2
+
+
+def chain_rows(bone_chain, matrix_world):
+    """
+    World space rows for a sorted chain, one per bone head plus one for the last tail
+    Returns (centers, axes) as flat xyz float arrays, the tail row reuses the last bones axis
+    Needs edit bones so call it before leaving edit mode
+    """
+    centers = array('f')
+    axes = array('f')
+    rotation = matrix_world.to_3x3()
+
+    for bone in bone_chain:
+        z_axis = (rotation @ bone.z_axis).normalized()
+        centers.extend(matrix_world @ bone.head)
+        axes.extend(z_axis)
+
+    centers.extend(matrix_world @ bone_chain[-1].tail)
+    axes.extend(z_axis)
+    return centers, axes
+
+
+def resample_rows(centers, axes, row_count):
+    """
+    Resample joint rows to row_count rows spaced evenly along the chain
+    Returns (centers, axes, joint_weights) where joint_weights[j] is a list of (row, weight) pairs
+    giving the position of joint j on the new rows
+    row_count None keeps one row per joint
+    """
+    joint_count = len(centers) // 3
+    if row_count is None or row_count == joint_count:
+        return centers, axes, [[(joint, 1.0)] for joint in range(joint_count)]
+    row_count = max(row_count, 2)
+
+    joints = [tuple(centers[i:i + 3]) for i in range(0, len(centers), 3)]
+    joint_axes = [tuple(axes[i:i + 3]) for i in range(0, len(axes), 3)]
+
+    # Distance along the chain of every joint
+    lengths = [0.0]
+    for a, b in zip(joints, joints[1:]):
+        lengths.append(lengths[-1] + sum((q - p) ** 2 for p, q in zip(a, b)) ** 0.5)
+    total = lengths[-1] or 1.0
+
+    new_centers = array('f')
+    new_axes = array('f')
+    segment = 0
+    for row in range(row_count):
+        distance = total * row / (row_count - 1)
+        while segment < joint_count - 2 and lengths[segment + 1] < distance:
+            segment += 1
+        span = lengths[segment + 1] - lengths[segment]
+        t = (distance - lengths[segment]) / span if span else 0.0
+        t = min(max(t, 0.0), 1.0)
+
+        a, b = joints[segment], joints[segment + 1]
+        new_centers.extend(p + (q - p) * t for p, q in zip(a, b))
+        axis = [p + (q - p) * t for p, q in zip(joint_axes[segment], joint_axes[segment + 1])]
+        axis_length = sum(c * c for c in axis) ** 0.5 or 1.0
+        new_axes.extend(c / axis_length for c in axis)
+
+    # Where each joint lands between the new rows
+    row_spacing = total / (row_count - 1)
+    joint_weights = []
+    for distance in lengths:
+        position = min(distance / row_spacing, row_count - 1)
+        row = min(int(position), row_count - 2)
+        t = position - row
+        if t < 1e-6:
+            joint_weights.append([(row, 1.0)])
+        elif t > 1.0 - 1e-6:
+            joint_weights.append([(row + 1, 1.0)])
+        else:
+            joint_weights.append([(row, 1.0 - t), (row + 1, t)])
+
+    return new_centers, new_axes, joint_weights
+
+
+def ribbon_geometry(rows, ribbon_width=DEFAULT_RIBBON_WIDTH):
+    """
+    Vertex positions and quads for one or more ribbons
+    rows is a list of (centers, axes) from chain_rows, every entry becomes its own island
+    Returns (coords, loop_vertices, row_ranges) where row_ranges holds the first vertex of each island
+    """
+    coords = array('f')
+    loop_vertices = array('i')
+    row_ranges = []
+
+    for centers, axes in rows:
+        first_vertex = len(coords) // 3
+        row_ranges.append(first_vertex)
+        row_count = len(centers) // 3
+
+        for i in range(0, len(centers), 3):
+            cx, cy, cz = centers[i], centers[i + 1], centers[i + 2]
+            ox, oy, oz = axes[i] * ribbon_width, axes[i + 1] * ribbon_width, axes[i + 2] * ribbon_width
+            coords.extend((cx - ox, cy - oy, cz - oz, cx, cy, cz, cx + ox, cy + oy, cz + oz))
+
+        # Two quads per segment, left strip and right strip
+        for row in range(row_count - 1):
+            left = first_vertex + row * ROW_VERTS
+            next_left = left + ROW_VERTS
+            loop_vertices.extend((
+                left, next_left, next_left + 1, left + 1,
+                left + 1, next_left + 1, next_left + 2, left + 2,
+            ))
+
+    return coords, loop_vertices, row_ranges
+
+
+def fill_mesh(mesh, coords, loop_vertices):
+    """Write quads into an empty mesh in bulk"""
+    vertex_count = len(coords) // 3
+    face_count = len(loop_vertices) // 4
+
+    mesh.vertices.add(vertex_count)
+    mesh.vertices.foreach_set("co", coords)
+
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", array('i', range(0, len(loop_vertices), 4)))
+    # loop_total is derived from loop_start from 4.0 on
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", array('i', [4]) * face_count)
+
+    mesh.update(calc_edges=True)
+
+
+def assign_row_groups(obj, first_vertex, row_count, joint_weights=None, chain_key=None, pin_group=None):
+    """
+    One physics.NNN group per joint, namespaced by chain_key on merged objects
+    joint_weights from resample_rows says which rows each joint group covers, by default joint N is row N
+    The first row is pinned, every other row gets PIN_WEIGHT in the pin group so the ribbon doesnt flop around
+    Without a pin_group the chains own physics.000 is the pin group
+    Returns the pin group
+    """
+    if joint_weights is None:
+        joint_weights = [[(row, 1.0)] for row in range(row_count)]
+
+    for joint, weights in enumerate(joint_weights):
+        vertex_group = obj.vertex_groups.new(name=naming.physics_group_name(joint, chain_key))
+        for row, weight in weights:
+            start = first_vertex + row * ROW_VERTS
+            vertex_group.add(list(range(start, start + ROW_VERTS)), weight, 'REPLACE')
+        if joint == 0 and pin_group is None:
+            pin_group = vertex_group
+
+    # The first joint always sits on the first row
+    if pin_group is not None and pin_group.name != naming.physics_group_name(0, chain_key):
+        pin_group.add(list(range(first_vertex, first_vertex + ROW_VERTS)), 1.0, 'REPLACE')
+
+    #TODO: I kinda dont like how this behaves when gravity points in a different direction
+    if pin_group is not None and row_count > 1:
+        first_unpinned = first_vertex + ROW_VERTS
+        pin_group.add(list(range(first_unpinned, first_vertex + row_count * ROW_VERTS)), PIN_WEIGHT, 'ADD')
+
+    return pin_group
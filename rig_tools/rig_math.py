@@ -0,0 +1,25 @@
+"""
+Matrix helpers for the rig scripts
+
+Things that would otherwise need an operator call or a depsgraph update just to read a matrix back.
+"""
+
+
+def child_of_inverse(armature, bone_name):
+    """
+    Inverse matrix for a Child Of constraint targeting bone_name, from the bones rest matrix
+    Same thing childof_set_inverse gives you with the armature in rest pose, but without
+    the operator, a context override or a depsgraph evaluation
+    """
+    bone = armature.data.bones[bone_name]
+    return (armature.matrix_world @ bone.matrix_local).inverted()
+
+
+def add_child_of(obj, armature, bone_name, name="Child Of Parent Bone"):
+    """Add a Child Of constraint with the inverse already set so obj stays where it is at rest"""
+    constraint = obj.constraints.new('CHILD_OF')
+    constraint.name = name
+    constraint.target = armature
+    constraint.subtarget = bone_name
+    constraint.inverse_matrix = child_of_inverse(armature, bone_name)
+    return constraint
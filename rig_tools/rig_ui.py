@@ -0,0 +1,137 @@
+"""
+Cached model of what the rig panel shows, so draw() and poll() only read precomputed entries
+
+The sidebar redraws constantly during playback and while transforming, so looking up the rig id, the
+PROPERTIES bone and the bone collections on every redraw adds up as the panel grows. model(obj) builds
+everything once per armature object, objects sharing armature data still have their own pose bones and switches:
+
+    pivot        settings for the pivot operators (pivot_parent / pivot_child / pivot_affected / pivot_affected_collection
+                 custom properties on the armature data, PIVOT / MCH_PIVOT_CHILD / AFFECTED otherwise)
+    switches     (label, property, index) for every property on the PROPERTIES bone, one per array element
+    collections  (name, depth) for every bone collection in hierarchy order
+
+The cache is only thrown away by the HANDLERS, registered through registry: a depsgraph update that touches
+the armature data (renames, collections, edit mode) drops the model of every object using it, an object update
+drops the model when the object got other data or its PROPERTIES bone other properties, undo / redo and file loads
+drop everything. Plain pose changes only cost that key comparison.
+Scripts that add custom properties to pose bones call invalidate() themselves, that only tags the object.
+"""
+import bpy
+from bpy.app.handlers import persistent
+
+from . import property_spec
+
+RIG_ID = "Arig"
+PROPERTIES_BONE = 'PROPERTIES'
+
+PIVOT_DEFAULTS = {
+    'parent': ("pivot_parent", 'PIVOT'),
+    'child': ("pivot_child", 'MCH_PIVOT_CHILD'),
+    'affected': ("pivot_affected", 'AFFECTED'),
+    'affected_collection': ("pivot_affected_collection", ''),
+}
+
+# obj.as_pointer() -> (obj.data.as_pointer(), RigModel), the model is None for armatures that arent rigs
+_models = {}
+
+
+class RigModel:
+    """Everything the panel draws for one armature, built from the data once"""
+
+    def __init__(self, obj):
+        data = obj.data
+        self.switch_keys = _switch_keys(obj)
+        self.pivot = {key: str(data.get(prop, default)) for key, (prop, default) in PIVOT_DEFAULTS.items()}
+        self.switches = self._switches(obj.pose.bones.get(PROPERTIES_BONE))
+        self.collections = self._collections(data.collections)
+
+    @staticmethod
+    def _switches(properties_bone):
+        if properties_bone is None:
+            return []
+        index_map = property_spec.read_index_map(properties_bone)
+        arrays = {}
+        for element, (table, i) in index_map.items():
+            arrays.setdefault(table, []).append((i, element))
+
+        switches = []
+        for name in properties_bone.keys():
+            if name.startswith('_'):
+                continue
+            if name in arrays:
+                switches.extend((element, name, i) for i, element in sorted(arrays[name]))
+            else:
+                switches.append((name, name, -1))
+        return switches
+
+    @staticmethod
+    def _collections(roots):
+        collections = []
+        pending = [(collection, 0) for collection in reversed(roots)]
+        while pending:
+            collection, depth = pending.pop()
+            collections.append((collection.name, depth))
+            pending.extend((child, depth + 1) for child in reversed(collection.children))
+        return collections
+
+
+def _key(obj):
+    return obj.as_pointer()
+
+
+def _switch_keys(obj):
+    properties_bone = obj.pose.bones.get(PROPERTIES_BONE)
+    return tuple(properties_bone.keys()) if properties_bone is not None else None
+
+
+def model(obj):
+    """The cached RigModel of obj, None if obj isnt an armature with our rig id"""
+    if obj is None or obj.type != 'ARMATURE':
+        return None
+    key = _key(obj)
+    if key not in _models:
+        _models[key] = (obj.data.as_pointer(), RigModel(obj) if obj.data.get("rig_id") == RIG_ID else None)
+    return _models[key][1]
+
+
+def is_rig(obj):
+    return model(obj) is not None
+
+
+def invalidate(obj=None):
+    """Drop the model of obj, or every model"""
+    if obj is None:
+        _models.clear()
+    elif obj.type == 'ARMATURE':
+        _models.pop(_key(obj), None)
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    if not _models:
+        return
+    for update in depsgraph.updates:
+        id_block = update.id.original
+        if isinstance(id_block, bpy.types.Armature):
+            data_key = id_block.as_pointer()
+            for key in [key for key, (model_data_key, _model) in _models.items() if model_data_key == data_key]:
+                del _models[key]
+        elif isinstance(id_block, bpy.types.Object) and _key(id_block) in _models:
+            data_key, rig_model = _models[_key(id_block)]
+            if id_block.type != 'ARMATURE' or id_block.data.as_pointer() != data_key or (
+                    rig_model is not None and rig_model.switch_keys != _switch_keys(id_block)):
+                del _models[_key(id_block)]
+
+
+@persistent
+def on_reset(*args):
+    _models.clear()
+
+
+HANDLERS = (
+    ('depsgraph_update_post', on_depsgraph_update),
+    ('undo_post', on_reset),
+    ('redo_post', on_reset),
+    ('load_post', on_reset),
+)
+